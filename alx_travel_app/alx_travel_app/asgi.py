@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_travel_app.settings')
+# Under an ASGI server the payment endpoints use the async views, which wait
+# on Chapa without holding a thread (see PAYMENT_VIEWS_ASYNC)
+os.environ.setdefault('PAYMENT_VIEWS_ASYNC', 'True')
+# Persistent connections would pile up, one per request thread
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -1,6 +1,8 @@
 # celery.py
 import os
 from celery import Celery
+from celery.schedules import crontab
+from kombu import Queue
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "alx_travel_app.settings")
@@ -11,4 +13,34 @@ app = Celery("alx_travel_app")
 # Load task modules from all registered Django app configs.
 # This will automatically discover tasks in the 'tasks.py' files of each app.
 app.config_from_object("django.conf:settings", namespace="CELERY")
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+# Payment verification and email are I/O-bound and run on their own queues,
+# so a backlog in one can't delay the other and each can get a worker pool
+# suited to it (see README.md, "Celery workers"). A worker started without
+# -Q consumes all of them.
+app.conf.task_default_queue = "celery"
+app.conf.task_queues = (
+    Queue("celery"),
+    Queue("payments"),
+    Queue("notifications"),
+)
+app.conf.task_routes = {
+    "listings.tasks.verify_payment_task": {"queue": "payments"},
+    "listings.tasks.send_email_task": {"queue": "notifications"},
+    "listings.tasks.send_booking_confirmation_email": {"queue": "notifications"},
+    "listings.tasks.send_payment_confirmation_email": {"queue": "notifications"},
+    "listings.tasks.dispatch_pending_emails": {"queue": "notifications"},
+}
+
+app.conf.beat_schedule = {
+    # Hourly so each run only has an hour's worth of rows to delete
+    "prune-task-results": {
+        "task": "listings.tasks.prune_task_results",
+        "schedule": crontab(minute=17),
+    },
+    "prune-email-notifications": {
+        "task": "listings.tasks.prune_email_notifications",
+        "schedule": crontab(minute=47),
+    },
+}
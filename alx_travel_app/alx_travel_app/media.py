@@ -0,0 +1,157 @@
+# media.py
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+# Derivatives from listings/images.py: <stem>.<16 hex content hash>.<width>w.<ext>
+IMMUTABLE_NAME_RE = re.compile(r"(^|/)derivatives/.+\.[0-9a-f]{16}\.\d+w\.[a-z0-9]+$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+MODES = ("stream", "x-accel", "x-sendfile", "off")
+
+
+def cache_control(path):
+    if IMMUTABLE_NAME_RE.search(path):
+        # The content hash is in the name, so the bytes behind it never change
+        return "public, max-age=31536000, immutable"
+    return f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``bytes=`` header,
+    ``None`` to serve the whole file, or ``False`` when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None  # malformed or multi-range: ignoring it is allowed
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def file_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT according to MEDIA_SERVE_MODE:
+
+    - ``x-accel``: nginx sends the file from the internal location
+      MEDIA_ACCEL_REDIRECT_PREFIX (``X-Accel-Redirect``)
+    - ``x-sendfile``: Apache/lighttpd send it (``X-Sendfile``)
+    - ``stream``: stream it from Python in chunks, with single-range support
+
+    Every mode answers conditional requests (ETag / Last-Modified) itself
+    and sets Cache-Control; content-hashed derivatives are marked immutable.
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": cache_control(path),
+        "Accept-Ranges": "bytes",
+    }
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified.headers.setdefault(name, value)
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    mode = settings.MEDIA_SERVE_MODE
+
+    if mode == "x-accel":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + path)
+    elif mode == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = full_path
+    else:
+        response = _stream(request, full_path, stat.st_size, etag, content_type)
+    for name, value in headers.items():
+        response.headers.setdefault(name, value)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
+
+
+def _stream(request, full_path, size, etag, content_type):
+    byte_range = None
+    header = request.headers.get("Range")
+    # If-Range: only honour the range while the client's copy is still current
+    if header and request.headers.get("If-Range", etag) == etag:
+        byte_range = parse_range(header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = max(0, end - start + 1)
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type, status=206 if byte_range else 200)
+    else:
+        response = StreamingHttpResponse(
+            file_range(full_path, start, length), content_type=content_type,
+            status=206 if byte_range else 200,
+        )
+    response["Content-Length"] = str(length)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def media_urlpatterns():
+    if settings.MEDIA_SERVE_MODE not in MODES:
+        raise ImproperlyConfigured(f"MEDIA_SERVE_MODE must be one of {', '.join(MODES)}")
+    if settings.MEDIA_SERVE_MODE == "off":
+        return []
+    prefix = re.escape(settings.MEDIA_URL.lstrip("/"))
+    return [re_path(rf"^{prefix}(?P<path>.+)$", serve_media, name="media")]
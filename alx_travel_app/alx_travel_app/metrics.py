@@ -0,0 +1,131 @@
+# metrics.py
+import contextvars
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Wall time per request", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Database time per request", ["route"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries per request", ["route"], buckets=QUERY_BUCKETS,
+)
+EXTERNAL_SECONDS = Histogram(
+    "external_call_duration_seconds", "Outbound calls, per attempt", ["service", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Per-request accumulator; contextvars follow the request into sync_to_async
+# threads, so queries run from async views are counted too.
+_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stopped = None
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.external = {}  # service -> seconds
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.stopped or time.perf_counter()) - self.started
+
+    def server_timing(self):
+        parts = [
+            f"app;dur={self.elapsed * 1000:.1f}",
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+        ]
+        parts.extend(f"{service};dur={seconds * 1000:.1f}" for service, seconds in self.external.items())
+        return ", ".join(parts)
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _timings.set(timings)
+
+
+def end_request(token):
+    _timings.reset(token)
+
+
+def observe_external(service, operation, seconds, ok=True):
+    """Record one outbound call (e.g. a Chapa attempt) globally and on the current request."""
+    EXTERNAL_SECONDS.labels(service, operation, "ok" if ok else "error").observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings.external[service] = timings.external.get(service, 0.0) + seconds
+
+
+def _db_timer(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_seconds += time.perf_counter() - started
+        timings.queries += 1
+
+
+def install_db_timer(connection, **kwargs):
+    if _db_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_timer)
+
+
+def install_db_timers():
+    """Time queries on connections opened from now on, and on any already open."""
+    connection_created.connect(install_db_timer, dispatch_uid="alx_travel_app.metrics.db_timer")
+    for connection in connections.all(initialized_only=True):
+        install_db_timer(connection)
+
+
+def observe_request(request, response, timings):
+    match = getattr(request, "resolver_match", None)
+    # The URL pattern rather than the path, so ids don't explode the label set
+    route = (match.route or match.view_name) if match else "unmatched"
+    REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(timings.elapsed)
+    REQUEST_DB_SECONDS.labels(route).observe(timings.db_seconds)
+    REQUEST_DB_QUERIES.labels(route).observe(timings.queries)
+    return route
+
+
+def metrics_view(request):
+    """
+    Prometheus text format. With PROMETHEUS_MULTIPROC_DIR set (several
+    gunicorn workers), samples from every worker are merged.
+
+    Requires ``Authorization: Bearer <METRICS_TOKEN>``. Without a token the
+    endpoint only exists with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            raise Http404()
+    elif not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,114 @@
+# middleware.py
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+from .metrics import end_request, install_db_timers, observe_request, start_request
+
+request_logger = logging.getLogger("alx_travel_app.requests")
+
+
+def is_stateless_api_request(request):
+    """
+    A request under STATELESS_API_PREFIXES that carries a Bearer token. It is
+    authenticated by the token alone, so sessions, CSRF (which only guards
+    cookie authentication), request.user and messages have nothing to do.
+    """
+    if not request.META.get("HTTP_AUTHORIZATION", "").startswith("Bearer "):
+        return False
+    return request.path_info.startswith(tuple(settings.STATELESS_API_PREFIXES))
+
+
+class SkipForStatelessAPIMixin:
+    """
+    Pass stateless API requests straight through. Everything else (admin,
+    the browsable API, cookie sessions) gets the middleware unchanged.
+    """
+
+    def __call__(self, request):
+        if is_stateless_api_request(request):
+            # A coroutine under ASGI, which the caller awaits
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class StatelessSessionMiddleware(SkipForStatelessAPIMixin, SessionMiddleware):
+    pass
+
+
+class StatelessCsrfViewMiddleware(SkipForStatelessAPIMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # Called by the handler directly, not from __call__
+        if is_stateless_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class StatelessAuthenticationMiddleware(SkipForStatelessAPIMixin, AuthenticationMiddleware):
+    # Without request.user, DRF's SessionAuthentication returns at once and
+    # the token authenticator does the work.
+    pass
+
+
+class StatelessMessageMiddleware(SkipForStatelessAPIMixin, MessageMiddleware):
+    pass
+
+
+class RequestTimingMiddleware:
+    """
+    Time each request: wall time, database time and query count, and time
+    in outbound calls (see metrics.observe_external). The numbers go to
+    the Prometheus histograms, a ``Server-Timing`` header and one access
+    log record per request. Works under WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_db_timers()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        timings.stop()
+        route = observe_request(request, response, timings)
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timings.server_timing()
+        request_logger.info(
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={
+                "route": route,
+                "status": response.status_code,
+                "duration_ms": round(timings.elapsed * 1000, 1),
+                "db_ms": round(timings.db_seconds * 1000, 1),
+                "queries": timings.queries,
+                **{f"{service}_ms": round(seconds * 1000, 1) for service, seconds in timings.external.items()},
+            },
+        )
+        return response
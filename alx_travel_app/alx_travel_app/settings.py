@@ -62,17 +62,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the rest of the stack
+    "alx_travel_app.middleware.RequestTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    # Session, CSRF, auth and message middleware step aside for Bearer-token
+    # requests under STATELESS_API_PREFIXES (alx_travel_app/middleware.py)
+    "alx_travel_app.middleware.StatelessSessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "alx_travel_app.middleware.StatelessCsrfViewMiddleware",
+    "alx_travel_app.middleware.StatelessAuthenticationMiddleware",
+    "alx_travel_app.middleware.StatelessMessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Paths where Bearer-token requests skip the stateful middleware; [] disables it
+STATELESS_API_PREFIXES = env.list("STATELESS_API_PREFIXES", default=["/api/"])
+
 ROOT_URLCONF = "alx_travel_app.urls"
 
 # Configuring CORS
@@ -91,10 +98,27 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',  # for browsable API login
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # for API token auth
+        # API tokens; the user is built from the token's claims, no query
+        'listings.authentication.ClaimsJWTAuthentication',
     ),
+    # Keyset pagination: constant cost per page, never runs COUNT(*)
+    'DEFAULT_PAGINATION_CLASS': 'listings.pagination.KeysetPagination',
+    'PAGE_SIZE': env.int('API_PAGE_SIZE', default=20),
+}
+
+SIMPLE_JWT = {
+    # User's primary key is user_id; the simplejwt default ("id") can't be queried
+    "USER_ID_FIELD": "user_id",
+    "USER_ID_CLAIM": "user_id",
 }
 
+# Per-process cache of User rows for ClaimsUser.user (listings/authentication.py).
+AUTH_USER_CACHE_SIZE = env.int("AUTH_USER_CACHE_SIZE", default=1024)
+AUTH_USER_CACHE_TTL = env.int("AUTH_USER_CACHE_TTL", default=60)
+# Seconds a user's access state (active, role) is trusted from CACHES["auth"]
+# before it is read from the database again
+AUTH_USER_STATE_TTL = env.int("AUTH_USER_STATE_TTL", default=60)
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -132,9 +156,49 @@ DATABASES = {
         "PASSWORD": env("DB_PASSWORD"),
         "HOST": env("DB_HOST", default="localhost"),
         "PORT": env("DB_PORT", default="3306"),
+        # Keep connections across requests, so the ones gunicorn workers
+        # open at boot (gunicorn.conf.py) serve their first requests.
+        # asgi.py sets 0: ASGI runs requests on short-lived threads.
+        "CONN_MAX_AGE": env.int("DB_CONN_MAX_AGE", default=300),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Cache
+# Defaults to an in-process LRU; point CACHE_URL at redis://host:6379/1 to share
+# entries between workers (requires the redis package).
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://alx-travel?max_entries=10000"),
+    # Access state of token users, kept apart so response caching can't evict
+    # it. Set AUTH_CACHE_URL to a shared cache when running more than one
+    # process; otherwise a deactivation elsewhere shows after AUTH_USER_STATE_TTL.
+    "auth": env.cache("AUTH_CACHE_URL", default="locmemcache://alx-travel-auth?max_entries=100000"),
+}
+
+# Seconds an anonymous property list/detail response stays cached. Entries are
+# invalidated earlier by version bumps whenever the underlying data changes.
+PROPERTY_CACHE_TIMEOUT = env.int("PROPERTY_CACHE_TIMEOUT", default=300)
+
+# Longest stay, in nights, that can be booked, quoted or searched for
+MAX_STAY_NIGHTS = env.int("MAX_STAY_NIGHTS", default=365)
+
+# Largest list accepted by POST /api/bookings/batch/
+BOOKING_BATCH_MAX = env.int("BOOKING_BATCH_MAX", default=200)
+# ...and most nights across all of its bookings
+BOOKING_BATCH_MAX_NIGHTS = env.int("BOOKING_BATCH_MAX_NIGHTS", default=2000)
+
+# Booked-night bitmaps behind /api/properties/<id>/calendar/ (listings/calendar.py).
+# Updated in place when bookings change; the timeout only bounds memory.
+CALENDAR_CACHE_TIMEOUT = env.int("CALENDAR_CACHE_TIMEOUT", default=7 * 24 * 3600)
+CALENDAR_MAX_MONTHS = env.int("CALENDAR_MAX_MONTHS", default=24)
+
+# Most properties priced by one POST /api/properties/quotes/
+PRICING_QUOTE_BATCH_MAX = env.int("PRICING_QUOTE_BATCH_MAX", default=500)
+
+# Property radius search (?lat=&lng=&radius=, in km); see listings/geo.py
+GEO_DEFAULT_RADIUS_KM = env.float("GEO_DEFAULT_RADIUS_KM", default=25.0)
+GEO_MAX_RADIUS_KM = env.float("GEO_MAX_RADIUS_KM", default=500.0)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -186,16 +250,53 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# How MEDIA_URL is served (alx_travel_app/media.py):
+#   stream     - Python streams the file (Range/ETag aware)
+#   x-accel    - nginx sends it from the internal MEDIA_ACCEL_REDIRECT_PREFIX location
+#   x-sendfile - Apache/lighttpd send it via X-Sendfile
+#   off        - not routed; only the DEBUG static() helper serves media
+MEDIA_SERVE_MODE = env("MEDIA_SERVE_MODE", default="stream")
+MEDIA_ACCEL_REDIRECT_PREFIX = env("MEDIA_ACCEL_REDIRECT_PREFIX", default="/protected-media/")
+# Cache lifetime for originals; content-hashed derivatives are cached for a year
+MEDIA_CACHE_MAX_AGE = env.int("MEDIA_CACHE_MAX_AGE", default=3600)
+
+# Resized copies generated for Property.image and User.avatar
+IMAGE_VARIANT_WIDTHS = [int(w) for w in env.list("IMAGE_VARIANT_WIDTHS", default=["320", "640", "1280"])]
+IMAGE_VARIANT_FORMATS = env.list("IMAGE_VARIANT_FORMATS", default=["webp", "jpeg"])
+IMAGE_VARIANT_QUALITY = env.int("IMAGE_VARIANT_QUALITY", default=80)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CHAPA_SECRET_KEY = env('CHAPA_SECRET_KEY')
+# Secret used to validate the HMAC signature on incoming Chapa webhooks
+CHAPA_WEBHOOK_SECRET = env("CHAPA_WEBHOOK_SECRET", default="")
+CHAPA_BASE_URL = env("CHAPA_BASE_URL", default="https://api.chapa.co/v1")
+# HTTP client tuning (seconds); see listings/chapa.py
+CHAPA_CONNECT_TIMEOUT = env.float("CHAPA_CONNECT_TIMEOUT", default=3.05)
+CHAPA_READ_TIMEOUT = env.float("CHAPA_READ_TIMEOUT", default=10.0)
+CHAPA_MAX_RETRIES = env.int("CHAPA_MAX_RETRIES", default=2)
+CHAPA_POOL_SIZE = env.int("CHAPA_POOL_SIZE", default=10)
+# Connections of the async client (per ASGI worker), i.e. concurrent Chapa calls
+CHAPA_ASYNC_POOL_SIZE = env.int("CHAPA_ASYNC_POOL_SIZE", default=100)
+CHAPA_BREAKER_THRESHOLD = env.int("CHAPA_BREAKER_THRESHOLD", default=5)
+CHAPA_BREAKER_RESET_TIMEOUT = env.float("CHAPA_BREAKER_RESET_TIMEOUT", default=30.0)
 CHAPA_CALLBACK_URL = env("CHAPA_CALLBACK_URL")
 CHAPA_RETURN_URL = env("CHAPA_RETURN_URL")
+# Serve the async payment views at /api/payment/; asgi.py turns this on
+PAYMENT_VIEWS_ASYNC = env.bool("PAYMENT_VIEWS_ASYNC", default=False)
 DEFAULT_CURRENCY = env("DEFAULT_CURRENCY", default="ETB")
 
+# Background payment verification: first check after CHAPA_VERIFY_INITIAL_DELAY
+# seconds, then exponential backoff from CHAPA_VERIFY_BACKOFF up to
+# CHAPA_VERIFY_MAX_BACKOFF, for at most CHAPA_VERIFY_MAX_RETRIES retries.
+CHAPA_VERIFY_INITIAL_DELAY = env.int("CHAPA_VERIFY_INITIAL_DELAY", default=2)
+CHAPA_VERIFY_BACKOFF = env.int("CHAPA_VERIFY_BACKOFF", default=2)
+CHAPA_VERIFY_MAX_BACKOFF = env.int("CHAPA_VERIFY_MAX_BACKOFF", default=300)
+CHAPA_VERIFY_MAX_RETRIES = env.int("CHAPA_VERIFY_MAX_RETRIES", default=8)
+
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = env('EMAIL_HOST')
@@ -205,28 +306,77 @@ EMAIL_HOST_USER = env('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL')
 
+# Outgoing email is queued as EmailNotification rows and sent by the
+# dispatcher task in batches over one SMTP connection, at most
+# EMAIL_DISPATCH_RATE messages per second (0 = unlimited).
+EMAIL_DISPATCH_BATCH_SIZE = env.int("EMAIL_DISPATCH_BATCH_SIZE", default=50)
+EMAIL_DISPATCH_RATE = env.float("EMAIL_DISPATCH_RATE", default=10.0)
+EMAIL_DISPATCH_MAX_ATTEMPTS = env.int("EMAIL_DISPATCH_MAX_ATTEMPTS", default=5)
+EMAIL_DISPATCH_DELAY = env.int("EMAIL_DISPATCH_DELAY", default=1)
+EMAIL_DISPATCH_RETRY_DELAY = env.int("EMAIL_DISPATCH_RETRY_DELAY", default=60)
+# Rows a dispatcher claimed but never finished (it died) are retried after this
+EMAIL_DISPATCH_CLAIM_TIMEOUT = env.int("EMAIL_DISPATCH_CLAIM_TIMEOUT", default=10 * 60)
+# Emails queued without a source event are deduplicated on their text
+# within windows of this many seconds
+EMAIL_DEDUPE_WINDOW = env.int("EMAIL_DEDUPE_WINDOW", default=10 * 60)
+# Sent and failed notifications older than this are deleted by the hourly
+# prune_email_notifications job, in chunks of EMAIL_PRUNE_BATCH
+EMAIL_RETENTION = env.int("EMAIL_RETENTION", default=30 * 24 * 60 * 60)
+EMAIL_PRUNE_BATCH = env.int("EMAIL_PRUNE_BATCH", default=1000)
+
 # Celery Config
-CELERY_BROKER_URL = 'amqp://localhost'  # RabbitMQ URL
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default='amqp://localhost')  # RabbitMQ URL
+CELERY_BROKER_TRANSPORT_OPTIONS = env.json("CELERY_BROKER_TRANSPORT_OPTIONS", default={})
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
 # Optional: if using django-celery-results
 INSTALLED_APPS += ["django_celery_results"]
-CELERY_RESULT_BACKEND = 'django-db'
+CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default='django-db')
+
+# Stored task results older than this are deleted in chunks of
+# CELERY_RESULT_PRUNE_BATCH by the hourly prune_task_results job. Celery's
+# own result_expires cleanup is left off: it deletes everything in one
+# statement.
+CELERY_RESULT_RETENTION = env.int("CELERY_RESULT_RETENTION", default=24 * 60 * 60)
+CELERY_RESULT_PRUNE_BATCH = env.int("CELERY_RESULT_PRUNE_BATCH", default=1000)
+CELERY_RESULT_EXPIRES = None
 
 LOGGING = {
     'version': 1,
+    # Keep loggers configured before Django, e.g. gunicorn's with --preload
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'alx_travel_app.log.JSONFormatter',
+        },
+    },
     'handlers': {
+        # Records are formatted in the caller and written from a background
+        # thread, so logging never blocks a request on stderr
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': 'alx_travel_app.log.BackgroundHandler',
+            'formatter': 'json',
         },
     },
     'root': {
         'handlers': ['console'],
         'level': 'INFO',
     },
+    'loggers': {
+        # One record per request from RequestTimingMiddleware
+        'alx_travel_app.requests': {
+            'level': env('REQUEST_LOG_LEVEL', default='INFO'),
+        },
+    },
 }
 
+# Per-request app/db/chapa timings in a Server-Timing response header
+SERVER_TIMING_HEADER = env.bool("SERVER_TIMING_HEADER", default=True)
+# GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>". With no token
+# set it answers 404, unless DEBUG is on.
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
 # Swagger settings
 SWAGGER_SETTINGS = {
     "USE_SESSION_AUTH": False,
@@ -6,6 +6,8 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from django.conf import settings
 from django.conf.urls.static import static
+from .media import media_urlpatterns
+from .metrics import metrics_view
 
 # Schema view config
 schema_view = get_schema_view(
@@ -34,7 +36,10 @@ urlpatterns = [
     ),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
     path("api-auth/", include("rest_framework.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+urlpatterns += media_urlpatterns()
+
+if settings.DEBUG and settings.MEDIA_SERVE_MODE == "off":
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
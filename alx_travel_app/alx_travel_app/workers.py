@@ -0,0 +1,115 @@
+# workers.py
+# Warm-up and memory accounting for server workers; see gunicorn.conf.py
+import inspect
+import threading
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from django.utils import translation
+from rest_framework.serializers import BaseSerializer
+from rest_framework.settings import api_settings
+
+# Read lazily by DRF on first use; each import_string'd on first access
+DRF_SETTINGS = (
+    "DEFAULT_RENDERER_CLASSES", "DEFAULT_PARSER_CLASSES", "DEFAULT_AUTHENTICATION_CLASSES",
+    "DEFAULT_PERMISSION_CLASSES", "DEFAULT_THROTTLE_CLASSES", "DEFAULT_CONTENT_NEGOTIATION_CLASS",
+    "DEFAULT_METADATA_CLASS", "DEFAULT_VERSIONING_CLASS", "DEFAULT_PAGINATION_CLASS",
+    "DEFAULT_FILTER_BACKENDS", "EXCEPTION_HANDLER", "UNAUTHENTICATED_USER",
+)
+
+
+def _compile_patterns(patterns):
+    for pattern in patterns:
+        pattern.pattern.regex  # compiled and cached on first access
+        if hasattr(pattern, "url_patterns"):
+            _compile_patterns(pattern.url_patterns)
+
+
+def warm_url_resolvers():
+    resolver = get_resolver()
+    _compile_patterns(resolver.url_patterns)
+    # Builds the reverse/namespace maps, recursing into include()s
+    resolver.reverse_dict
+    resolver.namespace_dict
+
+
+def warm_serializers():
+    """
+    Instantiate every serializer and build its fields. This fills the model
+    _meta caches and DRF's lazily imported field mappings.
+    """
+    for model in apps.get_models():
+        model._meta.get_fields()
+    for app_config in apps.get_app_configs():
+        if not app_config.path.startswith(str(settings.BASE_DIR)):
+            continue
+        try:
+            module = import_module(f"{app_config.name}.serializers")
+        except ImportError:
+            continue
+        for _, serializer_class in inspect.getmembers(module, inspect.isclass):
+            if not issubclass(serializer_class, BaseSerializer) or serializer_class.__module__ != module.__name__:
+                continue
+            try:
+                serializer_class().fields
+            except Exception:
+                # Serializers that need context or arguments warm on first use
+                continue
+
+
+def warm_process():
+    """Everything that is the same in every worker; run once in the master when preloading."""
+    for name in DRF_SETTINGS:
+        getattr(api_settings, name)
+    translation.activate(settings.LANGUAGE_CODE)
+    warm_url_resolvers()
+    warm_serializers()
+    translation.deactivate()
+
+
+def warm_db_connections():
+    """Open the calling thread's connection to every database."""
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def warm_thread_pool(executor, threads, func):
+    """
+    Run ``func`` once on each of the ``threads`` threads of ``executor``.
+    Connections are per thread, so a gthread worker's request threads have
+    to open their own. The barrier keeps every task busy until all have
+    started, which makes the executor start a thread for each.
+    """
+    barrier = threading.Barrier(threads)
+
+    def task():
+        barrier.wait(timeout=30)
+        func()
+
+    for future in [executor.submit(task) for _ in range(threads)]:
+        future.result()
+
+
+def process_memory_kb(pid="self"):
+    """
+    RSS, PSS and USS of a process in kB (Linux). After a preloaded fork
+    most pages are shared: USS is what a worker adds, and the PSS of all
+    processes sums to the real total.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        return None
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
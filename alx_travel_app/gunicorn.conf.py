@@ -0,0 +1,171 @@
+# gunicorn.conf.py
+#
+# Production server profile, read by `gunicorn -c gunicorn.conf.py`. Tuned
+# through the environment:
+#
+#   GUNICORN_WORKLOAD  mixed (default): gthread workers, cores + 1 processes
+#                      cpu: sync workers, cores + 1 processes
+#                      asgi: uvicorn workers serving asgi.py, one per core
+#   WEB_CONCURRENCY    worker processes, overriding the count above
+#   GUNICORN_THREADS   threads per gthread worker (default 4)
+#   GUNICORN_PRELOAD   load the app in the master and fork (default true)
+#   GUNICORN_WARMUP    warm caches and DB connections before serving (default true)
+#   GUNICORN_BIND      default 0.0.0.0:8000
+#
+# Each worker logs its memory and warm-up time once booted, and the time
+# its first request took (not for asgi workers, which bypass the hooks).
+import gc
+import glob
+import math
+import os
+import tempfile
+import time
+
+
+def cpu_count():
+    """CPUs this process may use: its affinity mask, capped by a cgroup v2 quota."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+cores = cpu_count()
+workload = os.environ.get("GUNICORN_WORKLOAD", "mixed")
+
+if workload == "cpu":
+    # One request per process; the extra worker covers one blocked on I/O
+    worker_class = "sync"
+    default_workers = cores + 1
+elif workload == "asgi":
+    # One event loop per core; concurrency comes from the loop, not threads
+    worker_class = "uvicorn_worker.UvicornWorker"
+    default_workers = cores
+elif workload == "mixed":
+    # Threads overlap DB and Chapa waits; the GIL bounds CPU work per process
+    worker_class = "gthread"
+    default_workers = cores + 1
+else:
+    raise ValueError(f"GUNICORN_WORKLOAD must be mixed, cpu or asgi, not {workload!r}")
+
+wsgi_app = "alx_travel_app.asgi:application" if workload == "asgi" else "alx_travel_app.wsgi:application"
+workers = int(os.environ.get("WEB_CONCURRENCY") or default_workers)
+threads = int(os.environ.get("GUNICORN_THREADS", 4)) if worker_class == "gthread" else 1
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+preload_app = env_bool("GUNICORN_PRELOAD", True)
+warmup = env_bool("GUNICORN_WARMUP", True)
+
+# Worker heartbeat files on tmpfs; a slow overlay filesystem can stall them
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+# With several processes, Prometheus samples go through files that /metrics
+# merges (alx_travel_app/metrics.py). The variable has to be set before
+# prometheus_client is imported, i.e. before the app loads.
+if workers > 1:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+        for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+            os.remove(path)  # left over from the previous run
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+if preload_app:
+    # Collections in the master would leave holes in pages the workers
+    # share; gc.freeze() before each fork keeps the children from touching
+    # the parent's objects' GC headers.
+    gc.disable()
+
+
+def _memory(pid="self"):
+    from alx_travel_app.workers import process_memory_kb
+
+    memory = process_memory_kb(pid)
+    if memory is None:
+        return "n/a"
+    return " ".join(f"{name}_mb={kb / 1024:.1f}" for name, kb in memory.items())
+
+
+# The hooks read server/worker.cfg, which includes command-line overrides
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from django.db import connections
+        from alx_travel_app.workers import warm_process
+
+        if warmup:
+            started = time.perf_counter()
+            warm_process()
+            server.log.info("master warm-up took %.1f ms", (time.perf_counter() - started) * 1000)
+        # Sockets opened while loading must not be shared with the workers
+        connections.close_all()
+    server.log.info(
+        "master ready: workload=%s worker_class=%s workers=%s threads=%s preload=%s cores=%s %s",
+        workload, server.cfg.worker_class_str, server.cfg.workers, server.cfg.threads,
+        server.cfg.preload_app, cores, _memory(),
+    )
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        gc.enable()
+    worker.first_request_logged = False
+
+
+def post_worker_init(worker):
+    started = time.perf_counter()
+    if warmup:
+        from alx_travel_app.workers import warm_db_connections, warm_process, warm_thread_pool
+
+        if not worker.cfg.preload_app:
+            warm_process()
+        if hasattr(worker, "tpool"):
+            # gthread: requests run on the pool's threads, each with its own connection
+            warm_thread_pool(worker.tpool, worker.cfg.threads, warm_db_connections)
+        elif worker.cfg.worker_class_str == "sync":
+            warm_db_connections()
+        # asgi: connections belong to per-request threads and aren't kept
+    worker.log.info(
+        "worker ready pid=%s warmup_ms=%.1f %s", worker.pid, (time.perf_counter() - started) * 1000, _memory(),
+    )
+
+
+def pre_request(worker, req):
+    req.started = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    if worker.first_request_logged:
+        return
+    worker.first_request_logged = True
+    worker.log.info(
+        "first request pid=%s path=%s status=%s ms=%.1f",
+        worker.pid, req.path, resp.status_code, (time.perf_counter() - req.started) * 1000,
+    )
+
+
+def child_exit(server, worker):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
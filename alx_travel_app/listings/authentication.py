@@ -0,0 +1,184 @@
+# listings/authentication.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+# Added to access tokens by CustomTokenObtainPairSerializer.get_token
+CLAIM_FIELDS = ("email", "first_name", "last_name", "role")
+
+
+class UserCache:
+    """
+    Per-process LRU of User rows that also expires entries after
+    AUTH_USER_CACHE_TTL seconds. Saves in this process evict at once (see
+    signals.py); the TTL bounds how stale another process's copy can be.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pk):
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is None:
+                return None
+            user, expires = entry
+            if time.monotonic() >= expires:
+                del self._entries[pk]
+                return None
+            self._entries.move_to_end(pk)
+            return user
+
+    def set(self, pk, user):
+        with self._lock:
+            self._entries[pk] = (user, time.monotonic() + settings.AUTH_USER_CACHE_TTL)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > settings.AUTH_USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def load_user(pk):
+    user = user_cache.get(pk)
+    if user is None:
+        user = get_user_model().objects.get(pk=pk)
+        user_cache.set(pk, user)
+    return user
+
+
+# Whether each user may authenticate, and with which role; see CACHES["auth"]
+auth_cache = ConnectionProxy(caches, "auth")
+# Cached state of a user who is inactive or deleted
+NO_ACCESS = ""
+
+
+def _state_key(pk):
+    return f"auth:state:{pk}"
+
+
+def user_state(pk):
+    """
+    The role a token for ``pk`` acts with, or NO_ACCESS. Read from the auth
+    cache; on a miss, one indexed query on the User row refills it for
+    AUTH_USER_STATE_TTL seconds. The TTL bounds how long a change that
+    skipped the signals (a queryset .update()) goes unnoticed.
+    """
+    key = _state_key(pk)
+    role = auth_cache.get(key)
+    if role is None:
+        role = (
+            get_user_model().objects.filter(pk=pk, is_active=True).values_list("role", flat=True).first()
+            or NO_ACCESS
+        )
+        # add, not set: a save that committed meanwhile has the newer state
+        auth_cache.add(key, role, settings.AUTH_USER_STATE_TTL)
+    return role
+
+
+def user_changed(user, deleted=False):
+    """
+    Drop the cached row and record what the user's tokens may still do.
+    Access tokens outlive a deactivation or a change of role, so the state
+    is checked on every request. Changes that take rights away apply at
+    once; ones that grant them wait for the commit.
+    """
+    pk = user.pk
+    user_cache.discard(pk)
+    role = user.role if user.is_active and not deleted else NO_ACCESS
+
+    def publish():
+        user_cache.discard(pk)  # again, in case a request re-read the old row meanwhile
+        auth_cache.set(_state_key(pk), role, settings.AUTH_USER_STATE_TTL)
+
+    if role in (NO_ACCESS, "guest"):
+        # Fail closed: refuse the old rights straight away
+        auth_cache.set(_state_key(pk), role, settings.AUTH_USER_STATE_TTL)
+    transaction.on_commit(publish)
+
+
+class ClaimsUser(TokenUser):
+    """
+    The user an access token describes. ``pk``, email and names come from
+    the token's claims and ``role`` from the user's current state (see
+    ClaimsJWTAuthentication); anything else (and ``.user``, the model
+    instance) loads the User row on first use through ``user_cache``.
+    """
+
+    @cached_property
+    def id(self):
+        return uuid.UUID(str(self.token[api_settings.USER_ID_CLAIM]))
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def user_id(self):
+        return self.id
+
+    @cached_property
+    def user(self):
+        return load_user(self.id)
+
+    def __str__(self):
+        return self.token.get("email") or str(self.id)
+
+    def __getattr__(self, attr):
+        if attr == "token" or attr.startswith("_"):
+            raise AttributeError(attr)
+        # Tokens issued before a claim was added fall back to the database
+        if attr in CLAIM_FIELDS and attr in self.token:
+            return self.token[attr]
+        return getattr(self.user, attr)
+
+    def __eq__(self, other):
+        if isinstance(other, (TokenUser, AbstractBaseUser)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request User query: the request user
+    is a ClaimsUser built from the validated token. Deactivated or deleted
+    users are turned away, and demoted ones lose their old role, through the
+    state kept in the auth cache rather than by reading their row.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        user = ClaimsUser(validated_token)
+        role = user_state(user.pk)
+        if role == NO_ACCESS:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        # The token's role claim may predate a promotion or demotion
+        user.role = role
+        return user
@@ -0,0 +1,133 @@
+# listings/availability.py
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from rest_framework import serializers
+
+from .calendar import calendar_changed
+
+# Bookings in these states hold their nights in the occupancy index.
+ACTIVE_BOOKING_STATUSES = ("pending", "confirmed")
+
+
+class BookingUnavailable(ValidationError):
+    """The requested nights overlap an active booking on the same property."""
+
+    def __init__(self, message="Property is not available for the selected dates."):
+        super().__init__(message)
+
+
+def stay_length_error(start_date, end_date):
+    """
+    The error for a stay longer than MAX_STAY_NIGHTS, or None. Every night
+    of a booking is a BookedNight row written under the property's lock,
+    so the length has to be bounded before anything is saved.
+    """
+    if (end_date - start_date).days > settings.MAX_STAY_NIGHTS:
+        return f"Stays are limited to {settings.MAX_STAY_NIGHTS} nights."
+    return None
+
+
+def stay_nights(start_date, end_date):
+    """Return every night of a stay (check-out day excluded)."""
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days)]
+
+
+def sync_booked_nights(booking):
+    """
+    Bring the occupancy index in line with a saved booking.
+
+    Only the nights that changed are touched, so re-saving a booking
+    without moving its dates costs a single read.
+    """
+    from .models import BookedNight
+
+    current = set(
+        BookedNight.objects.filter(booking=booking).values_list("property_id", "night")
+    )
+    wanted = set()
+    if booking.status in ACTIVE_BOOKING_STATUSES:
+        wanted = {
+            (booking.property_id, night)
+            for night in stay_nights(booking.start_date, booking.end_date)
+        }
+
+    stale = current - wanted
+    if stale:
+        BookedNight.objects.filter(
+            booking=booking, night__in=[night for _, night in stale]
+        ).delete()
+
+    missing = wanted - current
+    if missing:
+        BookedNight.objects.bulk_create([
+            BookedNight(property_id=property_id, booking=booking, night=night)
+            for property_id, night in sorted(missing)
+        ], batch_size=500)
+
+    # A booking moved to another property frees nights on the old one
+    for property_id in {property_id for property_id, _ in stale | missing}:
+        calendar_changed(
+            property_id,
+            booked=[night for pid, night in missing if pid == property_id],
+            freed=[night for pid, night in stale if pid == property_id],
+        )
+
+
+def is_available(property_id, start_date, end_date, exclude_booking=None):
+    from .models import BookedNight
+
+    nights = BookedNight.objects.filter(
+        property_id=property_id, night__gte=start_date, night__lt=end_date
+    )
+    if exclude_booking is not None:
+        nights = nights.exclude(booking_id=exclude_booking)
+    return not nights.exists()
+
+
+def filter_available(queryset, check_in, check_out):
+    """
+    Restrict a Property queryset to listings free for the whole stay.
+
+    The occupied set is resolved as a subquery on the (night, property)
+    index, so the database answers it in a single statement.
+    """
+    from .models import BookedNight
+
+    occupied = BookedNight.objects.filter(
+        night__gte=check_in, night__lt=check_out
+    ).values("property_id")
+    return queryset.exclude(property_id__in=occupied)
+
+
+def parse_stay(params):
+    """
+    Read ``check_in``/``check_out`` from query params.
+
+    Returns ``None`` when neither is given, otherwise a ``(check_in, check_out)``
+    tuple of dates. Raises a DRF ValidationError on bad input.
+    """
+    raw_in = params.get("check_in")
+    raw_out = params.get("check_out")
+    if not raw_in and not raw_out:
+        return None
+    if not raw_in or not raw_out:
+        raise serializers.ValidationError(
+            {"detail": "Both check_in and check_out are required."}
+        )
+
+    try:
+        check_in = date.fromisoformat(raw_in)
+        check_out = date.fromisoformat(raw_out)
+    except ValueError:
+        raise serializers.ValidationError(
+            {"detail": "check_in and check_out must be dates in YYYY-MM-DD format."}
+        )
+
+    if check_in >= check_out:
+        raise serializers.ValidationError({"detail": "check_out must be after check_in."})
+    error = stay_length_error(check_in, check_out)
+    if error:
+        raise serializers.ValidationError({"detail": error})
+    return check_in, check_out
@@ -0,0 +1,102 @@
+# listings/bookings.py
+from django.db import transaction
+
+from .availability import stay_nights
+from .cache import invalidate_property
+from .calendar import calendar_changed
+from .models import BookedNight, Booking, Property
+from .pricing import quote_stay
+
+BATCH_CREATED = "created"
+BATCH_CONFLICT = "conflict"
+BATCH_INVALID = "invalid"
+# Valid, but not created because another item of the batch failed
+BATCH_SKIPPED = "skipped"
+
+
+def create_bookings_batch(user, items, partial=False):
+    """
+    Create many bookings for ``user`` in one transaction.
+
+    By default the batch is all-or-nothing: if any item conflicts or names
+    a missing property, nothing is written and the other items come back
+    as skipped. With ``partial=True`` the items that can be booked are
+    created and only the failing ones are left out.
+
+    ``items`` are dicts with ``property`` (UUID), ``start_date`` and
+    ``end_date`` that already passed field validation. All referenced
+    properties are loaded and row-locked with one query (in primary-key
+    order, so concurrent batches can't deadlock), availability for the whole
+    batch is checked with one query on the occupancy index, and the valid
+    bookings plus their nights are written with ``bulk_create``.
+
+    Returns ``(results, bookings)``: one ``{"index", "status", ...}`` dict
+    per item and the created Booking instances.
+    """
+    results = [None] * len(items)
+    property_ids = {item["property"] for item in items}
+
+    with transaction.atomic():
+        properties = {
+            prop.pk: prop
+            for prop in Property.objects.select_for_update()
+            .filter(pk__in=property_ids)
+            .order_by("pk")
+            .only("pk", "name", "pricepernight", "discount")
+        }
+
+        taken = set()
+        if properties:
+            window_start = min(item["start_date"] for item in items)
+            window_end = max(item["end_date"] for item in items)
+            taken = set(
+                BookedNight.objects.filter(
+                    property_id__in=properties.keys(),
+                    night__gte=window_start,
+                    night__lt=window_end,
+                ).values_list("property_id", "night")
+            )
+
+        bookings = []
+        nights = []
+        for index, item in enumerate(items):
+            prop = properties.get(item["property"])
+            if prop is None:
+                results[index] = {"index": index, "status": BATCH_INVALID,
+                                  "errors": {"property": ["Property not found."]}}
+                continue
+
+            stay = [(prop.pk, night) for night in stay_nights(item["start_date"], item["end_date"])]
+            if taken.intersection(stay):
+                results[index] = {"index": index, "status": BATCH_CONFLICT,
+                                  "errors": {"non_field_errors": ["Property is not available for the selected dates."]}}
+                continue
+            # Later items in the same batch see this one's nights as taken
+            taken.update(stay)
+
+            booking = Booking(
+                property=prop,
+                user_id=user.pk,
+                start_date=item["start_date"],
+                end_date=item["end_date"],
+                total_price=quote_stay(prop, item["start_date"], item["end_date"])["total"],
+            )
+            bookings.append((index, booking))
+            nights.extend(BookedNight(property=prop, booking=booking, night=night) for _, night in stay)
+
+        if not partial and len(bookings) < len(items):
+            for index, _ in bookings:
+                results[index] = {"index": index, "status": BATCH_SKIPPED}
+            return results, []
+
+        Booking.objects.bulk_create([booking for _, booking in bookings])
+        BookedNight.objects.bulk_create(nights, batch_size=1000)
+
+        # bulk_create skips post_save, so invalidate cached responses here
+        for property_id in {booking.property_id for _, booking in bookings}:
+            invalidate_property(property_id)
+            calendar_changed(property_id, booked=[n.night for n in nights if n.property_id == property_id])
+
+    for index, booking in bookings:
+        results[index] = {"index": index, "status": BATCH_CREATED, "booking": booking}
+    return results, [booking for _, booking in bookings]
@@ -0,0 +1,117 @@
+# listings/cache.py
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+CATALOG_GENERATION_KEY = "properties:generation"
+
+
+def _property_version_key(property_id):
+    return f"properties:{property_id}:version"
+
+
+def _read_counter(key):
+    value = cache.get(key)
+    if value is None:
+        # Seed from the clock rather than 1: if the counter was evicted while
+        # old entries survived, a fresh counter must not collide with them.
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def _bump_counter(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def catalog_generation():
+    return _read_counter(CATALOG_GENERATION_KEY)
+
+
+def property_version(property_id):
+    return _read_counter(_property_version_key(property_id))
+
+
+def invalidate_property(property_id):
+    """
+    Invalidate cached responses touching a property once the current
+    transaction commits: its detail (per-property version) and every list
+    page (global catalog generation).
+    """
+    def bump():
+        if property_id is not None:
+            _bump_counter(_property_version_key(property_id))
+        _bump_counter(CATALOG_GENERATION_KEY)
+
+    transaction.on_commit(bump)
+
+
+def normalized_params(query_params):
+    """Stable text form of query params: sorted keys and values, blanks dropped."""
+    parts = []
+    for key in sorted(query_params.keys()):
+        values = sorted(v for v in query_params.getlist(key) if v != "")
+        for value in values:
+            parts.append(f"{key}={value}")
+    return "&".join(parts)
+
+
+def is_anonymous_request(request):
+    # Decided from the raw request so the cache lookup never triggers authentication
+    return (
+        "HTTP_AUTHORIZATION" not in request.META
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+class CachedPropertyReadMixin:
+    """
+    Serve anonymous list/retrieve responses for PropertyViewSet from the cache.
+
+    List pages are keyed by the catalog generation and the normalized query
+    string; a detail is keyed by the property's own version. Signal handlers
+    bump both counters so stale entries are simply never read again.
+    """
+
+    cache_timeout = settings.PROPERTY_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        if not is_anonymous_request(request):
+            return super().list(request, *args, **kwargs)
+        digest = hashlib.sha1(
+            f"{request.get_host()}{request.path}?{normalized_params(request.query_params)}".encode()
+        ).hexdigest()
+        key = f"properties:list:{catalog_generation()}:{digest}"
+        return self._cached_response(key, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not is_anonymous_request(request):
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            lookup = uuid.UUID(str(kwargs.get(self.lookup_url_kwarg or self.lookup_field)))
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        digest = hashlib.sha1(f"{request.get_host()}{request.path}".encode()).hexdigest()
+        key = f"properties:detail:{lookup}:{property_version(lookup)}:{digest}"
+        return self._cached_response(key, super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, key, view, request, *args, **kwargs):
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,180 @@
+# listings/calendar.py
+import time
+from calendar import monthrange
+from collections import defaultdict
+from datetime import MAXYEAR, date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import _bump_counter, _read_counter
+
+# Per-property, per-year bitmaps of booked nights: bit n is day n of the year
+# (1 January is bit 0), so a year is 46 bytes.
+BITMAP_BYTES = 46
+CALENDAR_GENERATION_KEY = "calendar:generation"
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 1.0
+
+
+def _epoch_key(property_id):
+    return f"calendar:{property_id}:epoch"
+
+
+def _bitmap_key(property_id, year, epoch, generation):
+    return f"calendar:{generation}:{property_id}:{epoch}:{year}"
+
+
+def _writes_key(property_id, year):
+    return f"calendar:{property_id}:{year}:writes"
+
+
+def _bit(night):
+    return night.timetuple().tm_yday - 1
+
+
+def build_bitmap(property_id, year):
+    """Read one year of the occupancy index into a bitmap."""
+    from .models import BookedNight
+
+    bitmap = bytearray(BITMAP_BYTES)
+    nights = BookedNight.objects.filter(
+        property_id=property_id, night__gte=date(year, 1, 1), night__lte=date(year, 12, 31)
+    ).values_list("night", flat=True)
+    for night in nights:
+        index = _bit(night)
+        bitmap[index // 8] |= 1 << (index % 8)
+    return bytes(bitmap)
+
+
+def booked_bitmaps(property_id, years):
+    """
+    ``{year: bitmap}`` for a property, from the cache where possible.
+
+    A bitmap built from the database is only cached when no booking change
+    for that year was applied meanwhile; otherwise the change could be lost
+    under a snapshot taken before it committed.
+    """
+    epoch = _read_counter(_epoch_key(property_id))
+    generation = _read_counter(CALENDAR_GENERATION_KEY)
+    keys = {year: _bitmap_key(property_id, year, epoch, generation) for year in years}
+    cached = cache.get_many(list(keys.values()))
+    bitmaps = {}
+    for year, key in keys.items():
+        if key in cached:
+            bitmaps[year] = cached[key]
+            continue
+        writes = cache.get(_writes_key(property_id, year))
+        bitmaps[year] = build_bitmap(property_id, year)
+        if cache.get(_writes_key(property_id, year)) == writes:
+            cache.add(key, bitmaps[year], settings.CALENDAR_CACHE_TIMEOUT)
+    return bitmaps
+
+
+def _acquire(lock_key):
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def apply_changes(property_id, booked=(), freed=()):
+    """Set and clear nights in the cached bitmaps of one property."""
+    changes = defaultdict(lambda: ([], []))
+    for night in booked:
+        changes[night.year][0].append(_bit(night))
+    for night in freed:
+        changes[night.year][1].append(_bit(night))
+    if not changes:
+        return
+
+    for year in changes:
+        try:
+            cache.incr(_writes_key(property_id, year))
+        except ValueError:
+            cache.set(_writes_key(property_id, year), 1, settings.CALENDAR_CACHE_TIMEOUT)
+
+    lock_key = f"calendar:{property_id}:lock"
+    if not _acquire(lock_key):
+        # Can't update in place safely: move readers to fresh bitmaps instead
+        _bump_counter(_epoch_key(property_id))
+        return
+    try:
+        epoch = _read_counter(_epoch_key(property_id))
+        generation = _read_counter(CALENDAR_GENERATION_KEY)
+        for year, (set_bits, clear_bits) in changes.items():
+            key = _bitmap_key(property_id, year, epoch, generation)
+            bitmap = cache.get(key)
+            if bitmap is None:
+                continue  # not cached: the next read builds it
+            bitmap = bytearray(bitmap)
+            for index in set_bits:
+                bitmap[index // 8] |= 1 << (index % 8)
+            for index in clear_bits:
+                bitmap[index // 8] &= ~(1 << (index % 8))
+            cache.set(key, bytes(bitmap), settings.CALENDAR_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+
+
+def calendar_changed(property_id, booked=(), freed=()):
+    """Apply night changes to the cached calendar once the transaction commits."""
+    booked, freed = list(booked), list(freed)
+    if booked or freed:
+        transaction.on_commit(lambda: apply_changes(property_id, booked, freed))
+
+
+def invalidate_calendars():
+    """Drop every cached calendar; for writers that bypass the hooks (seed)."""
+    _bump_counter(CALENDAR_GENERATION_KEY)
+
+
+def parse_calendar_range(params):
+    """
+    ``from`` (YYYY-MM or YYYY-MM-DD, default this month) and ``months``,
+    cut short so the range doesn't run past the last month ``date`` has.
+    """
+    raw = params.get("from")
+    if raw:
+        try:
+            start = date.fromisoformat(raw if len(raw) > 7 else f"{raw}-01")
+        except ValueError:
+            raise serializers.ValidationError({"from": "Must be a month (YYYY-MM) or a date (YYYY-MM-DD)."})
+    else:
+        start = timezone.localdate()
+    raw = params.get("months") or "12"
+    try:
+        months = int(raw)
+    except ValueError:
+        raise serializers.ValidationError({"months": "Must be an integer."})
+    if not 1 <= months <= settings.CALENDAR_MAX_MONTHS:
+        raise serializers.ValidationError({"months": f"Must be between 1 and {settings.CALENDAR_MAX_MONTHS}."})
+    return start.replace(day=1), min(months, (MAXYEAR - start.year) * 12 + 13 - start.month)
+
+
+def month_calendar(property_id, start, months):
+    """
+    Nights of ``months`` whole months from ``start``, one list entry per
+    month with a ``nights`` string per day: ``1`` booked, ``0`` free.
+    """
+    firsts = [start]
+    while len(firsts) < months:
+        last = firsts[-1]
+        firsts.append(date(last.year + last.month // 12, last.month % 12 + 1, 1))
+    bitmaps = booked_bitmaps(property_id, sorted({first.year for first in firsts}))
+
+    result = []
+    for first in firsts:
+        bitmap = bitmaps[first.year]
+        offset = _bit(first)
+        days = monthrange(first.year, first.month)[1]
+        nights = "".join(
+            "1" if bitmap[(offset + day) // 8] >> ((offset + day) % 8) & 1 else "0" for day in range(days)
+        )
+        result.append({"month": first.strftime("%Y-%m"), "booked": nights.count("1"), "nights": nights})
+    return result
@@ -1,21 +1,335 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+import httpx
 import requests
+from alx_travel_app.metrics import observe_external
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
-CHAPA_SECRET_KEY = settings.CHAPA_SECRET_KEY
-CHAPA_BASE_URL = "https://api.chapa.co/v1"
+logger = logging.getLogger(__name__)
 
-def initiate_payment(data):
-    url = f"{CHAPA_BASE_URL}/transaction/initialize"
-    headers = {
-        "Authorization": f"Bearer {CHAPA_SECRET_KEY}",
+
+class ChapaError(Exception):
+    """Chapa returned something we can't use (bad JSON, unexpected 4xx/5xx)."""
+
+
+class ChapaUnavailable(ChapaError):
+    """Chapa could not be reached in time, or the circuit breaker is open."""
+
+
+def webhook_signature(body, secret):
+    """Hex HMAC-SHA256 of the raw webhook body, as Chapa signs it."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def is_valid_webhook_signature(body, signature, secret):
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(webhook_signature(body, secret), signature.strip().lower())
+
+
+class CircuitBreaker:
+    """
+    Trip after ``failure_threshold`` consecutive failures and reject calls
+    for ``reset_timeout`` seconds. The first call after that is let through
+    as a probe: success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Let one probe through and hold the rest until it reports back
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Chapa circuit breaker opened after %s failures", self._failures)
+                self._opened_at = time.monotonic()
+
+
+class BaseChapaClient:
+    """
+    What the sync and async clients share: timeouts, retry policy, the
+    circuit breaker and per-operation latency in ``stats``.
+    """
+
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=10.0, max_retries=2,
+                 backoff=0.25, breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _retry_delay(self, attempt):
+        delay = self.backoff * (2 ** attempt)
+        return delay + random.uniform(0, delay)
+
+    def _server_error(self, operation, status_code):
+        if status_code >= 500:
+            return ChapaUnavailable(f"Chapa {operation} returned HTTP {status_code}")
+        return None
+
+    def _record(self, operation, elapsed, ok):
+        with self._stats_lock:
+            stats = self._stats.setdefault(
+                operation, {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            stats["calls"] += 1
+            stats["errors"] += 0 if ok else 1
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+        logger.debug("Chapa %s took %.1fms (ok=%s)", operation, elapsed * 1000, ok)
+        # Histogram and the current request's Server-Timing "chapa" entry
+        observe_external("chapa", operation, elapsed, ok=ok)
+
+    @property
+    def stats(self):
+        with self._stats_lock:
+            return {op: dict(values) for op, values in self._stats.items()}
+
+
+class ChapaClient(BaseChapaClient):
+    """
+    Chapa API client over a pooled keep-alive session.
+
+    Every call has connect/read timeouts and goes through a circuit breaker.
+    Idempotent calls (verify) are retried with exponential backoff and
+    jitter; initialize is sent once. Per-operation latency is kept in
+    ``stats``.
+    """
+
+    def __init__(self, secret_key, base_url, pool_size=10, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.timeout = (self.connect_timeout, self.read_timeout)
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {secret_key}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def initiate_payment(self, data):
+        return self._request("initialize", "POST", "/transaction/initialize", retries=0, json=data)
+
+    def verify_payment(self, transaction_id):
+        return self._request(
+            "verify", "GET", f"/transaction/verify/{transaction_id}", retries=self.max_retries
+        )
+
+    def _request(self, operation, method, path, retries, **kwargs):
+        if not self.breaker.allow():
+            self._record(operation, 0.0, ok=False)
+            raise ChapaUnavailable("Chapa circuit breaker is open")
+
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                error = self._server_error(operation, response.status_code)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response = None
+                error = ChapaUnavailable(f"Chapa {operation} failed: {e}")
+            elapsed = time.perf_counter() - started
+            self._record(operation, elapsed, ok=error is None)
+
+            if error is None:
+                self.breaker.record_success()
+                try:
+                    return response.json()
+                except ValueError:
+                    raise ChapaError(f"Chapa {operation} returned a non-JSON body")
+
+            self.breaker.record_failure()
+            if attempt >= retries or not self.breaker.allow():
+                raise error
+
+            time.sleep(self._retry_delay(attempt))
+            attempt += 1
+            logger.info("Retrying Chapa %s (attempt %s): %s", operation, attempt + 1, error)
+
+
+class AsyncChapaClient(BaseChapaClient):
+    """
+    ChapaClient for async views, over an ``httpx.AsyncClient``. A call
+    waiting on Chapa holds a connection from the pool but no thread, so
+    one worker can have ``pool_size`` payments in flight at once.
+
+    Bound to the event loop it is first used on; see ``get_async_client``.
+    """
+
+    def __init__(self, secret_key, base_url, pool_size=100, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {secret_key}"},
+            # Waiting for a free pooled connection counts against the read timeout
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def initiate_payment(self, data):
+        return await self._request("initialize", "POST", "/transaction/initialize", retries=0, json=data)
+
+    async def verify_payment(self, transaction_id):
+        return await self._request(
+            "verify", "GET", f"/transaction/verify/{transaction_id}", retries=self.max_retries
+        )
+
+    async def _request(self, operation, method, path, retries, **kwargs):
+        if not self.breaker.allow():
+            self._record(operation, 0.0, ok=False)
+            raise ChapaUnavailable("Chapa circuit breaker is open")
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.http.request(method, path, **kwargs)
+                error = self._server_error(operation, response.status_code)
+            except httpx.TransportError as e:
+                response = None
+                error = ChapaUnavailable(f"Chapa {operation} failed: {e!r}")
+            elapsed = time.perf_counter() - started
+            self._record(operation, elapsed, ok=error is None)
+
+            if error is None:
+                self.breaker.record_success()
+                try:
+                    return response.json()
+                except ValueError:
+                    raise ChapaError(f"Chapa {operation} returned a non-JSON body")
+
+            self.breaker.record_failure()
+            if attempt >= retries or not self.breaker.allow():
+                raise error
+
+            await asyncio.sleep(self._retry_delay(attempt))
+            attempt += 1
+            logger.info("Retrying Chapa %s (attempt %s): %s", operation, attempt + 1, error)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+_client = None
+_breaker = None
+_client_lock = threading.Lock()
+# One async client per event loop: httpx connections can't be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _client_options():
+    return {
+        "secret_key": settings.CHAPA_SECRET_KEY,
+        "base_url": settings.CHAPA_BASE_URL,
+        "connect_timeout": settings.CHAPA_CONNECT_TIMEOUT,
+        "read_timeout": settings.CHAPA_READ_TIMEOUT,
+        "max_retries": settings.CHAPA_MAX_RETRIES,
+        "breaker": get_breaker(),
     }
-    response = requests.post(url, headers=headers, json=data)
-    return response.json()
+
+
+def get_breaker():
+    """Process-wide breaker, shared by the sync and async clients."""
+    global _breaker
+    if _breaker is None:
+        with _client_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    failure_threshold=settings.CHAPA_BREAKER_THRESHOLD,
+                    reset_timeout=settings.CHAPA_BREAKER_RESET_TIMEOUT,
+                )
+    return _breaker
+
+
+def get_client():
+    """Process-wide client, created on first use so forked workers don't share sockets."""
+    global _client
+    if _client is None:
+        options = _client_options()
+        with _client_lock:
+            if _client is None:
+                _client = ChapaClient(pool_size=settings.CHAPA_POOL_SIZE, **options)
+    return _client
+
+
+def get_async_client():
+    """
+    Async client for the running event loop. An ASGI worker runs a single
+    loop, so this is one pool per process, as with ``get_client``.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncChapaClient(pool_size=settings.CHAPA_ASYNC_POOL_SIZE, **_client_options())
+        _async_clients[loop] = client
+    return client
+
+
+def _reset_client():
+    global _client, _breaker
+    _client = None
+    _breaker = None
+    _async_clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client)
+
+
+def initiate_payment(data):
+    return get_client().initiate_payment(data)
+
 
 def verify_payment(transaction_id):
-    url = f"{CHAPA_BASE_URL}/transaction/verify/{transaction_id}"
-    headers = {
-        "Authorization": f"Bearer {CHAPA_SECRET_KEY}",
-    }
-    response = requests.get(url, headers=headers)
-    return response.json()
+    return get_client().verify_payment(transaction_id)
+
+
+async def ainitiate_payment(data):
+    return await get_async_client().initiate_payment(data)
+
+
+async def averify_payment(transaction_id):
+    return await get_async_client().verify_payment(transaction_id)
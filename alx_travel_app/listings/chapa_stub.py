@@ -0,0 +1,127 @@
+# listings/chapa_stub.py
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections when benchmarks open many at once
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up waiting (timeouts under test) hang up mid-reply
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class ChapaStubServer:
+    """
+    Minimal local stand-in for the Chapa API, for tests and benchmarks.
+
+    Serves ``POST /transaction/initialize`` and
+    ``GET /transaction/verify/<tx_ref>`` on 127.0.0.1. Behaviour is tuned
+    through attributes that can be changed while it runs:
+
+    - ``delay``: seconds to wait before answering
+    - ``verify_status``: ``data.status`` returned by verify
+    - ``fail_next``: answer this many upcoming requests with HTTP 500
+
+    Usage::
+
+        with ChapaStubServer(delay=0.2) as stub:
+            client = ChapaClient("key", stub.base_url)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, verify_status="success"):
+        self.delay = delay
+        self.verify_status = verify_status
+        self.fail_next = 0
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_fail(self):
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+            return False
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; with Nagle on, a
+            # keep-alive client waits ~40 ms for the delayed ACK in between
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with stub._lock:
+                    stub.requests.append((self.command, self.path))
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if stub._should_fail():
+                    return self._reply(500, {"message": "stub failure", "status": "failed"})
+
+                if self.command == "POST" and self.path.endswith("/transaction/initialize"):
+                    data = json.loads(body or b"{}")
+                    return self._reply(200, {
+                        "message": "Hosted Link",
+                        "status": "success",
+                        "data": {
+                            "checkout_url": f"{stub.base_url}/checkout/{data.get('tx_ref') or uuid.uuid4()}",
+                        },
+                    })
+                if self.command == "GET" and "/transaction/verify/" in self.path:
+                    tx_ref = self.path.rsplit("/", 1)[-1]
+                    return self._reply(200, {
+                        "message": "Payment details",
+                        "status": "success",
+                        "data": {"tx_ref": tx_ref, "status": stub.verify_status},
+                    })
+                return self._reply(404, {"message": "Not found", "status": "failed"})
+
+            do_GET = _handle
+            do_POST = _handle
+
+        return Handler
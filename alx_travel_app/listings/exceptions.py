@@ -0,0 +1,9 @@
+# listings/exceptions.py
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class BookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Property is not available for the selected dates."
+    default_code = "booking_conflict"
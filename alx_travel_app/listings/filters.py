@@ -0,0 +1,98 @@
+# listings/filters.py
+from decimal import Decimal, InvalidOperation
+
+from rest_framework import serializers
+
+from .availability import filter_available, parse_stay
+from .geo import filter_bbox, filter_radius, parse_bbox, parse_center
+from .search import filter_text, normalize
+
+
+def _decimal_param(params, name):
+    raw = params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise serializers.ValidationError({name: "Must be a number."})
+    if not value.is_finite() or value < 0:
+        raise serializers.ValidationError({name: "Must be a non-negative number."})
+    return value
+
+
+def _int_param(params, name):
+    raw = params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise serializers.ValidationError({name: "Must be an integer."})
+    if value < 0:
+        raise serializers.ValidationError({name: "Must be a non-negative integer."})
+    return value
+
+
+def filter_properties(queryset, params):
+    """
+    Apply the property list query parameters:
+
+    - ``city``, ``state``, ``country``: exact match
+    - ``min_price``, ``max_price``: range on pricepernight
+    - ``min_bed``, ``min_shower``: minimum counts
+    - ``category``: comma separated; a property must have all of them
+    - ``q``: full-text search over name and description
+    - ``check_in``, ``check_out``: only properties free for the whole stay
+    - ``bbox``: ``west,south,east,north`` map viewport in degrees
+    - ``lat``, ``lng``, ``radius``: within ``radius`` km of a point (default
+      GEO_DEFAULT_RADIUS_KM); adds ``distance`` for ``?ordering=distance``
+    """
+    for field in ("city", "state", "country"):
+        value = params.get(field)
+        if value:
+            queryset = queryset.filter(**{field: value})
+
+    min_price = _decimal_param(params, "min_price")
+    max_price = _decimal_param(params, "max_price")
+    if min_price is not None:
+        queryset = queryset.filter(pricepernight__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(pricepernight__lte=max_price)
+
+    min_bed = _int_param(params, "min_bed")
+    min_shower = _int_param(params, "min_shower")
+    if min_bed is not None:
+        queryset = queryset.filter(bed__gte=min_bed)
+    if min_shower is not None:
+        queryset = queryset.filter(shower__gte=min_shower)
+
+    categories = {normalize(c).strip() for c in params.get("category", "").split(",") if c.strip()}
+    if categories:
+        from .models import PropertyCategory
+
+        for name in sorted(categories):
+            queryset = queryset.filter(
+                property_id__in=PropertyCategory.objects.filter(name=name).values("property_id")
+            )
+
+    query = params.get("q")
+    if query:
+        queryset = filter_text(queryset, query)
+
+    stay = parse_stay(params)
+    if stay:
+        queryset = filter_available(queryset, *stay)
+
+    bbox = parse_bbox(params)
+    if bbox:
+        queryset = filter_bbox(queryset, *bbox)
+
+    # Last, so the other filters have already narrowed the distance candidates
+    center = parse_center(params)
+    if center:
+        queryset = filter_radius(queryset, *center)
+    elif params.get("ordering") == "distance":
+        raise serializers.ValidationError({"ordering": "Ordering by distance needs lat and lng."})
+
+    return queryset
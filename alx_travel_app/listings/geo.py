@@ -0,0 +1,202 @@
+# listings/geo.py
+import math
+
+from django.conf import settings
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Round, Sin, Sqrt
+from rest_framework import serializers
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_LENGTH = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Coarsest acceptable cover: more cells than this and a shorter prefix is used
+MAX_COVER_CELLS = 32
+
+
+def _bits(precision):
+    """Longitude and latitude bits in a geohash of ``precision`` characters."""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def _cell(value, low, high, bits):
+    return min((1 << bits) - 1, max(0, int((value - low) / (high - low) * (1 << bits))))
+
+
+def _interleave(lon_index, lat_index, lon_bits, lat_bits):
+    # Geohash bits alternate longitude, latitude, starting with longitude
+    z = 0
+    for i in range(lon_bits + lat_bits):
+        if i % 2 == 0:
+            bit = (lon_index >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_index >> (lat_bits - 1 - i // 2)) & 1
+        z = (z << 1) | bit
+    return z
+
+
+def _to_string(z, precision):
+    return "".join(BASE32[(z >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+
+
+def encode(latitude, longitude, precision=GEOHASH_LENGTH):
+    lon_bits, lat_bits = _bits(precision)
+    z = _interleave(
+        _cell(longitude, -180.0, 180.0, lon_bits), _cell(latitude, -90.0, 90.0, lat_bits), lon_bits, lat_bits
+    )
+    return _to_string(z, precision)
+
+
+def cover(south, west, north, east):
+    """
+    Geohash prefix ranges ``[(start, stop), ...]`` covering a bounding box.
+
+    Picks the longest prefix for which the box spans at most
+    MAX_COVER_CELLS cells, then merges cells that are adjacent in geohash
+    order so each range is one index range scan. ``stop`` is exclusive and
+    ``None`` means "to the end". A box with ``west > east`` crosses the
+    antimeridian. Returns None when even one-character cells are too many.
+    """
+    for precision in range(GEOHASH_LENGTH, 0, -1):
+        lon_bits, lat_bits = _bits(precision)
+        lat_range = range(_cell(south, -90.0, 90.0, lat_bits), _cell(north, -90.0, 90.0, lat_bits) + 1)
+        first, last = _cell(west, -180.0, 180.0, lon_bits), _cell(east, -180.0, 180.0, lon_bits)
+        if west <= east:
+            lon_count = last - first + 1
+        else:
+            lon_count = (1 << lon_bits) - first + last + 1
+        if len(lat_range) * lon_count <= MAX_COVER_CELLS:
+            break
+    else:
+        return None
+
+    if west <= east:
+        lon_range = list(range(first, last + 1))
+    else:
+        lon_range = list(range(first, 1 << lon_bits)) + list(range(0, last + 1))
+
+    cells = sorted(_interleave(x, y, lon_bits, lat_bits) for y in lat_range for x in lon_range)
+    runs = []
+    for z in cells:
+        if runs and runs[-1][1] == z - 1:
+            runs[-1][1] = z
+        else:
+            runs.append([z, z])
+    end = 1 << (5 * precision)
+    return [
+        (_to_string(start, precision), _to_string(stop + 1, precision) if stop + 1 < end else None)
+        for start, stop in runs
+    ]
+
+
+def cover_filter(ranges, field="geohash"):
+    condition = Q()
+    for start, stop in ranges:
+        bounds = {f"{field}__gte": start}
+        if stop is not None:
+            bounds[f"{field}__lt"] = stop
+        condition |= Q(**bounds)
+    return condition
+
+
+def radius_box(latitude, longitude, radius_km):
+    """The (south, west, north, east) box enclosing a circle."""
+    delta_lat = radius_km / KM_PER_DEGREE
+    south, north = latitude - delta_lat, latitude + delta_lat
+    if south <= -90 or north >= 90:
+        # The circle contains a pole: every longitude is in range
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    delta_lon = math.degrees(
+        math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))))
+    )
+    if delta_lon >= 180:
+        return south, -180.0, north, 180.0
+    west, east = longitude - delta_lon, longitude + delta_lon
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def distance_km(latitude, longitude):
+    """
+    Haversine distance in kilometres from a point to each row's latitude and
+    longitude, as a database expression. Rounded to the metre so cursor
+    values survive the JSON round trip exactly.
+    """
+    lat1 = math.radians(latitude)
+    lat2 = Radians(F("latitude"))
+    half_dlat = (lat2 - Value(lat1)) / 2
+    half_dlon = (Radians(F("longitude")) - Value(math.radians(longitude))) / 2
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin(half_dlon), 2)
+    # Rounding can push a just past 1, outside ASIN's domain
+    return Round(Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(a, Value(1.0)))), 3, output_field=FloatField())
+
+
+def _float_param(params, name, low, high):
+    raw = params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        raise serializers.ValidationError({name: "Must be a number."})
+    if not low <= value <= high:
+        raise serializers.ValidationError({name: f"Must be between {low:g} and {high:g}."})
+    return value
+
+
+def parse_bbox(params):
+    raw = params.get("bbox")
+    if not raw:
+        return None
+    try:
+        west, south, east, north = (float(part) for part in raw.split(","))
+    except ValueError:
+        raise serializers.ValidationError({"bbox": "Expected west,south,east,north in degrees."})
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90):
+        raise serializers.ValidationError({"bbox": "Expected west,south,east,north in degrees."})
+    return south, west, north, east
+
+
+def parse_center(params):
+    latitude = _float_param(params, "lat", -90, 90)
+    longitude = _float_param(params, "lng", -180, 180)
+    if (latitude is None) != (longitude is None):
+        raise serializers.ValidationError({"lat": "lat and lng must be given together."})
+    if latitude is None:
+        if params.get("radius"):
+            raise serializers.ValidationError({"radius": "radius needs lat and lng."})
+        return None
+    radius = _float_param(params, "radius", 0, settings.GEO_MAX_RADIUS_KM)
+    return latitude, longitude, settings.GEO_DEFAULT_RADIUS_KM if radius is None else radius
+
+
+def filter_bbox(queryset, south, west, north, east):
+    """Properties inside a box: geohash ranges for the index, exact bounds for the edges."""
+    ranges = cover(south, west, north, east)
+    if ranges is not None:
+        queryset = queryset.filter(cover_filter(ranges))
+    queryset = queryset.filter(latitude__gte=south, latitude__lte=north)
+    if west <= east:
+        return queryset.filter(longitude__gte=west, longitude__lte=east)
+    return queryset.filter(Q(longitude__gte=west) | Q(longitude__lte=east))
+
+
+def filter_radius(queryset, latitude, longitude, radius_km):
+    """
+    Properties within ``radius_km`` of a point, annotated with ``distance``
+    in kilometres.
+
+    The geohash cover of the enclosing box selects candidates through the
+    index; the database measures only those, so ``distance`` can be
+    filtered, ordered and keyset-paged on ``(distance, pk)`` like a column.
+    """
+    south, west, north, east = radius_box(latitude, longitude, radius_km)
+    return (
+        filter_bbox(queryset, south, west, north, east)
+        .annotate(distance=distance_km(latitude, longitude))
+        .filter(distance__lte=radius_km)
+    )
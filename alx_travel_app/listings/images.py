@@ -0,0 +1,169 @@
+# listings/images.py
+import hashlib
+import io
+import logging
+import posixpath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Model field -> JSON field holding its derivatives
+VARIANT_FIELDS = {
+    ("listings.Property", "image"): "image_variants",
+    ("listings.User", "avatar"): "avatar_variants",
+}
+
+FORMATS = {
+    # format -> (Pillow format, extension, save options)
+    "webp": ("WEBP", "webp", {"method": 4}),
+    "jpeg": ("JPEG", "jpg", {"optimize": True, "progressive": True}),
+}
+
+
+def variant_name(source_name, digest, width, extension):
+    """
+    Derivatives are named after the source file's content hash, so a name
+    never changes meaning and can be cached forever (see media.py).
+    """
+    stem = posixpath.splitext(posixpath.basename(source_name))[0]
+    folder = posixpath.dirname(source_name)
+    return posixpath.join("derivatives", folder, f"{stem}.{digest}.{width}w.{extension}")
+
+
+def build_variants(source_name, widths=None, formats=None, storage=None):
+    """
+    Render resized copies of a stored image and save them next to each other
+    under ``derivatives/``. Widths above the original are skipped (the
+    original width is used instead when every width is too large). Returns
+    the variants map stored on the model::
+
+        {"source": "properties/01.jpg", "digest": "...", "width": 1600,
+         "webp": {"320": "derivatives/...", ...}, "jpeg": {...}}
+    """
+    storage = storage or default_storage
+    widths = sorted(widths or settings.IMAGE_VARIANT_WIDTHS)
+    formats = formats or settings.IMAGE_VARIANT_FORMATS
+    quality = settings.IMAGE_VARIANT_QUALITY
+
+    with storage.open(source_name, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+
+    with Image.open(io.BytesIO(data)) as original:
+        orientation = original.getexif().get(0x0112, 1)
+        # Orientations 5-8 are rotated a quarter turn
+        source_width = original.height if orientation in (5, 6, 7, 8) else original.width
+        targets = [w for w in widths if w <= source_width] or [source_width]
+        variants = {"source": source_name, "digest": digest, "width": source_width}
+        names = {
+            (fmt, width): variant_name(source_name, digest, width, FORMATS[fmt][1])
+            for fmt in formats for width in targets
+        }
+        for (fmt, width), name in names.items():
+            variants.setdefault(fmt, {})[str(width)] = name
+
+        missing = [key for key, name in names.items() if not storage.exists(name)]
+        if not missing:
+            return variants
+
+        # Let the JPEG decoder downscale by a power of two while it decodes;
+        # much cheaper than decoding a camera-sized original in full.
+        largest = max(targets)
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    for fmt, width in missing:
+        pil_format, _, options = FORMATS[fmt]
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        if pil_format == "JPEG" and resized.mode not in ("RGB", "L"):
+            resized = resized.convert("RGB")
+        elif resized.mode not in ("RGB", "RGBA", "L"):
+            resized = resized.convert("RGBA")
+        buffer = io.BytesIO()
+        resized.save(buffer, pil_format, quality=quality, **options)
+        name = names[(fmt, width)]
+        saved = storage.save(name, ContentFile(buffer.getvalue()))
+        if saved != name:
+            # Another worker wrote the same derivative first; keep theirs
+            storage.delete(saved)
+    return variants
+
+
+def variant_files(variants):
+    return {
+        name for fmt in FORMATS for name in (variants or {}).get(fmt, {}).values()
+    }
+
+
+def needs_variants(field_file, variants):
+    return bool(field_file) and (variants or {}).get("source") != field_file.name
+
+
+def srcset(variants, storage=None):
+    """``{"webp": {"320w": url, ...}, "jpeg": {...}}`` for a stored variants map."""
+    storage = storage or default_storage
+    return {
+        fmt: {f"{width}w": storage.url(name) for width, name in sorted(names.items(), key=lambda i: int(i[0]))}
+        for fmt, names in (variants or {}).items()
+        if fmt in FORMATS
+    }
+
+
+def save_variants(model_label, pk, field, variants):
+    """
+    Store a variants map unless the image was replaced while it was being
+    built. Uses a queryset update so model save hooks don't run again.
+    Returns True when stored.
+    """
+    model = apps.get_model(model_label)
+    variants_field = VARIANT_FIELDS[(model_label, field)]
+    with transaction.atomic():
+        row = model.objects.select_for_update().filter(pk=pk).values(field, variants_field).first()
+        if row is None or row[field] != variants["source"]:
+            return False
+        model.objects.filter(pk=pk).update(**{variants_field: variants})
+        stale = variant_files(row[variants_field]) - variant_files(variants)
+
+    for name in stale:
+        default_storage.delete(name)
+    if model_label == "listings.Property":
+        from .cache import invalidate_property
+
+        invalidate_property(pk)
+    return True
+
+
+def schedule_variants(instance, field):
+    """Queue derivative generation after commit if the image changed."""
+    from .tasks import generate_image_variants
+
+    model_label = instance._meta.label
+    variants_field = VARIANT_FIELDS[(model_label, field)]
+    field_file = getattr(instance, field)
+    variants = getattr(instance, variants_field)
+    pk = instance.pk
+
+    if not field_file and variants:
+        # Image removed: drop the derivatives with it
+        type(instance).objects.filter(pk=pk).update(**{variants_field: {}})
+        setattr(instance, variants_field, {})
+        transaction.on_commit(lambda: [default_storage.delete(name) for name in variant_files(variants)])
+        return
+    if not needs_variants(field_file, variants):
+        return
+
+    def enqueue():
+        try:
+            generate_image_variants.delay(model_label, str(pk), field)
+        except Exception:
+            logger.exception("Failed to queue image variants for %s %s", model_label, pk)
+
+    transaction.on_commit(enqueue)
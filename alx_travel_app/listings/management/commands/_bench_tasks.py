@@ -0,0 +1,11 @@
+# Tasks that exist only for bench_celery_pools. The leading underscore keeps
+# Django from listing this module as a command, and autodiscovery doesn't
+# import it: the bench passes it to its workers with --include.
+import requests
+from celery import shared_task
+
+
+@shared_task
+def io_probe(url, timeout=30):
+    """Fetch ``url`` and return the HTTP status."""
+    return requests.get(url, timeout=timeout).status_code
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from listings.chapa_stub import ChapaStubServer
+from listings.management.commands.bench_bookings import percentile, request_host
+from listings.models import Booking, Property, User
+
+SERVERS = {
+    # Sync views on gunicorn's threaded workers: one thread per in-flight Chapa call
+    "wsgi": lambda port, options: [
+        sys.executable, "-m", "gunicorn", "alx_travel_app.wsgi:application",
+        "--bind", f"127.0.0.1:{port}", "--workers", str(options['workers']),
+        "--worker-class", "gthread", "--threads", str(options['threads']), "--log-level", "warning",
+    ],
+    # Async views on uvicorn: in-flight calls are bounded by CHAPA_ASYNC_POOL_SIZE
+    "asgi": lambda port, options: [
+        sys.executable, "-m", "uvicorn", "alx_travel_app.asgi:application",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(options['workers']),
+        "--log-level", "warning", "--no-access-log",
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Start the app under a WSGI server (sync payment views) and an ASGI server (async '
+        'payment views) in turn, and compare how many concurrent POST /api/payment/initiate/ '
+        'requests each completes per second against a slow local Chapa stub.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default='wsgi,asgi')
+        parser.add_argument('--requests', type=int, default=500, help='Payment initiations per server')
+        parser.add_argument('--concurrency', type=int, default=100, help='Requests in flight at once')
+        parser.add_argument('--delay', type=float, default=0.5, help='Seconds the Chapa stub takes per call')
+        parser.add_argument('--workers', type=int, default=1, help='Server processes')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per WSGI worker')
+        parser.add_argument('--port', type=int, default=8097)
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON only')
+
+    def handle(self, *args, **options):
+        servers = [s.strip() for s in options['servers'].split(',') if s.strip()]
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown server(s) {', '.join(sorted(unknown))}. Choose from: {', '.join(SERVERS)}")
+
+        tag = f"bench-{uuid.uuid4().hex[:8]}"
+        host = User.objects.create_user(f"{tag}-host@example.com", "Bench", "Host", None, role="host")
+        guest = User.objects.create_user(f"{tag}@example.com", "Bench", "Guest", None)
+        try:
+            prop = Property.objects.create(
+                host=host, name=f"Bench {tag}", description="Benchmark", pricepernight=Decimal("100.00")
+            )
+            # Each booking is paid for once. They are only initiated, never
+            # confirmed, so bypass Booking.save and its availability checks.
+            start = date.today() + timedelta(days=1000)
+            bookings = Booking.objects.bulk_create([
+                Booking(property=prop, user=guest, start_date=start, end_date=start + timedelta(days=1),
+                        total_price=Decimal("100.00"))
+                for _ in range(options['requests'] * len(servers))
+            ])
+            booking_ids = [str(b.booking_id) for b in bookings]
+
+            report = {
+                "requests": options['requests'],
+                "concurrency": options['concurrency'],
+                "stub_delay_s": options['delay'],
+                "workers": options['workers'],
+                "wsgi_threads": options['threads'],
+                "async_pool_size": settings.CHAPA_ASYNC_POOL_SIZE,
+                "servers": {},
+            }
+            with ChapaStubServer(delay=options['delay']) as stub:
+                for server in servers:
+                    batch = booking_ids[:options['requests']]
+                    del booking_ids[:options['requests']]
+                    report["servers"][server] = self._run_server(server, stub, batch, options)
+        finally:
+            # Cascades to the property, bookings and payments
+            User.objects.filter(pk__in=[host.pk, guest.pk]).delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        self.stdout.write(json.dumps(report, indent=2))
+        for server, result in report["servers"].items():
+            self.stdout.write(f"{server}: {result.get('requests_per_second', result.get('error'))} req/s")
+
+    def _run_server(self, server, stub, booking_ids, options):
+        env = dict(os.environ)
+        env.update({
+            "CHAPA_BASE_URL": stub.base_url,
+            "PAYMENT_VIEWS_ASYNC": str(server == "asgi"),
+            "REQUEST_LOG_LEVEL": "WARNING",
+        })
+        command = SERVERS[server](options['port'], options)
+        base_url = f"http://127.0.0.1:{options['port']}"
+
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=log)
+            try:
+                if not self._wait_until_ready(process, base_url, options['timeout']):
+                    log.seek(0)
+                    output = log.read().decode(errors="replace")[-2000:]
+                    return {"error": f"{server} server did not start:\n{output}"}
+                calls_before = len(stub.requests)
+                result = asyncio.run(self._load(base_url, booking_ids, options))
+                result["chapa_calls"] = len(stub.requests) - calls_before
+                return result
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+
+    def _wait_until_ready(self, process, base_url, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                return False
+            try:
+                # Without tx_ref this answers 400 without touching the database
+                httpx.get(f"{base_url}/api/payment/success/", headers={"Host": request_host()}, timeout=1)
+                return True
+            except httpx.TransportError:
+                time.sleep(0.2)
+        return False
+
+    async def _load(self, base_url, booking_ids, options):
+        pending = list(booking_ids)
+        latencies = []
+        statuses = {}
+
+        async def user(client):
+            while pending:
+                booking_id = pending.pop()
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/api/payment/initiate/", json={"booking_id": booking_id})
+                    code = str(response.status_code)
+                except httpx.HTTPError as e:
+                    code = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[code] = statuses.get(code, 0) + 1
+
+        limits = httpx.Limits(max_connections=options['concurrency'], max_keepalive_connections=options['concurrency'])
+        async with httpx.AsyncClient(base_url=base_url, headers={"Host": request_host()}, limits=limits,
+                                     timeout=options['timeout']) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(user(client) for _ in range(options['concurrency'])))
+            elapsed = time.perf_counter() - started
+
+        return {
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+            "status": statuses,
+            "errors": sum(count for code, count in statuses.items() if code != "200"),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 1),
+                "p95": round(percentile(latencies, 95) * 1000, 1),
+                "p99": round(percentile(latencies, 99) * 1000, 1),
+                "mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else None,
+            },
+        }
@@ -0,0 +1,161 @@
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+from listings.models import Property, User
+
+
+def request_host():
+    """A host name the API will accept, for the in-process test client."""
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != "*" and not host.startswith("."):
+            return host
+    return "localhost"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent POST /api/bookings/ requests at a few hot properties and report '
+        'throughput and conflict rate. Creates its own properties; run against a dev database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=1000, help='Total booking attempts')
+        parser.add_argument('--properties', type=int, default=4, help='Number of hot properties')
+        parser.add_argument('--horizon', type=int, default=60, help='Days ahead bookings may start')
+        parser.add_argument('--max-nights', type=int, default=4)
+        parser.add_argument('--batch', type=int, default=1,
+                            help='Send bookings N at a time through /api/bookings/batch/ (1 = one POST each)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON only')
+
+    def handle(self, *args, **options):
+        tag = f"bench-{uuid.uuid4().hex[:8]}"
+        host = User.objects.create_user(f"{tag}-host@example.com", "Bench", "Host", None, role="host")
+        guest = User.objects.create_user(f"{tag}-guest@example.com", "Bench", "Guest", None)
+        properties = [
+            Property.objects.create(host=host, name=f"{tag} property {i}", description="Benchmark",
+                                    pricepernight=Decimal("100.00"))
+            for i in range(options['properties'])
+        ]
+
+        rng = random.Random(options['seed'])
+        first_night = date.today() + timedelta(days=1)
+        jobs = []
+        for _ in range(options['requests']):
+            start = first_night + timedelta(days=rng.randrange(options['horizon']))
+            jobs.append({
+                "property": str(rng.choice(properties).pk),
+                "start_date": start.isoformat(),
+                "end_date": (start + timedelta(days=rng.randint(1, options['max_nights']))).isoformat(),
+            })
+
+        lock = threading.Lock()
+        outcomes = {}
+        latencies = []
+        server_name = request_host()
+
+        def worker(chunk):
+            client = APIClient(SERVER_NAME=server_name)
+            client.raise_request_exception = False  # count 5xx instead of killing the thread
+            client.force_authenticate(user=guest)
+            local = []
+            timings = []
+            batch = options['batch']
+            try:
+                if batch <= 1:
+                    for payload in chunk:
+                        started = time.perf_counter()
+                        response = client.post("/api/bookings/", payload, format="json")
+                        timings.append(time.perf_counter() - started)
+                        local.append(response.status_code)
+                else:
+                    for i in range(0, len(chunk), batch):
+                        started = time.perf_counter()
+                        # partial: each item succeeds or conflicts on its own, as single POSTs do
+                        payload = {"bookings": chunk[i:i + batch], "partial": True}
+                        response = client.post("/api/bookings/batch/", payload, format="json")
+                        timings.append(time.perf_counter() - started)
+                        if isinstance(getattr(response, "data", None), dict) and "results" in response.data:
+                            # Map per-item outcomes onto the single-POST status codes
+                            codes = {"created": 201, "conflict": 409, "invalid": 400}
+                            local.extend(codes[item["status"]] for item in response.data["results"])
+                        else:
+                            local.extend([response.status_code] * len(chunk[i:i + batch]))
+            finally:
+                connection.close()
+            with lock:
+                for code in local:
+                    outcomes[code] = outcomes.get(code, 0) + 1
+                latencies.extend(timings)
+
+        threads = [
+            threading.Thread(target=worker, args=(jobs[i::options['threads']],))
+            for i in range(options['threads'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        # Overlaps must never get through, whatever the interleaving
+        double_booked = 0
+        for prop in properties:
+            nights = list(prop.booked_nights.values_list('night', flat=True))
+            double_booked += len(nights) - len(set(nights))
+
+        total = sum(outcomes.values())
+        report = {
+            "threads": options['threads'],
+            "batch": options['batch'],
+            "hot_properties": options['properties'],
+            "requests": total,
+            "seconds": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+            "created": outcomes.get(201, 0),
+            "conflicts": outcomes.get(409, 0),
+            "conflict_rate": round(outcomes.get(409, 0) / total, 4) if total else 0.0,
+            "other_status": {str(k): v for k, v in outcomes.items() if k not in (201, 409)},
+            "double_booked_nights": double_booked,
+            # per HTTP request, so a batch request covers --batch bookings
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 2),
+                "p95": round(percentile(latencies, 95) * 1000, 2),
+                "p99": round(percentile(latencies, 99) * 1000, 2),
+                "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            },
+        }
+
+        if not options['keep']:
+            Property.objects.filter(pk__in=[p.pk for p in properties]).delete()
+            User.objects.filter(pk__in=[host.pk, guest.pk]).delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(
+                f"{report['created']} booked, {report['conflicts']} conflicts, "
+                f"{report['throughput_rps']} req/s"
+            ))
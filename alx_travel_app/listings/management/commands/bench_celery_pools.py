@@ -0,0 +1,148 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from alx_travel_app.celery import app
+from listings.chapa_stub import ChapaStubServer
+from listings.management.commands._bench_tasks import io_probe
+
+
+def process_tree_rss_kb(pid):
+    """Resident memory of a process and its children, from /proc (Linux only)."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total or None
+
+
+class Command(BaseCommand):
+    help = (
+        'Start a Celery worker per pool type (prefork, threads, gevent) and time how fast each '
+        'drains a batch of I/O-bound tasks that call a slow local HTTP stub.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pools', default='prefork,threads,gevent')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--tasks', type=int, default=200)
+        parser.add_argument('--delay', type=float, default=0.2, help='Seconds the stub takes per request')
+        parser.add_argument('--broker', default='',
+                            help="Broker URL; 'filesystem' uses a throwaway local broker (default: CELERY_BROKER_URL)")
+        parser.add_argument('--timeout', type=float, default=300)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON only')
+
+    def handle(self, *args, **options):
+        if app.conf.task_always_eager:
+            raise CommandError("CELERY_TASK_ALWAYS_EAGER is on; tasks would run in this process.")
+
+        tag = f"bench-{uuid.uuid4().hex[:8]}"
+        queue = tag
+        overrides = {}
+        tmpdir = None
+        if options['broker'] == 'filesystem':
+            tmpdir = tempfile.TemporaryDirectory(prefix="celery-bench-")
+            overrides = {
+                "CELERY_BROKER_URL": "filesystem://",
+                "CELERY_BROKER_TRANSPORT_OPTIONS": json.dumps(
+                    {"data_folder_in": tmpdir.name, "data_folder_out": tmpdir.name,
+                     "control_folder": os.path.join(tmpdir.name, "control")}
+                ),
+                "CELERY_RESULT_BACKEND": f"file://{tmpdir.name}",
+            }
+        elif options['broker']:
+            overrides = {"CELERY_BROKER_URL": options['broker']}
+        # Celery reads the broker and backend URLs from the environment ahead
+        # of settings, so this redirects both this process and the workers.
+        os.environ.update(overrides)
+        if "CELERY_BROKER_TRANSPORT_OPTIONS" in overrides:
+            app.conf.update(CELERY_BROKER_TRANSPORT_OPTIONS=json.loads(overrides["CELERY_BROKER_TRANSPORT_OPTIONS"]))
+        worker_env = dict(os.environ)
+
+        report = {
+            "tasks": options['tasks'],
+            "concurrency": options['concurrency'],
+            "stub_delay_s": options['delay'],
+            # What a perfectly parallel pool would take
+            "ideal_seconds": round(options['tasks'] * options['delay'] / options['concurrency'], 3),
+            "pools": {},
+        }
+
+        try:
+            with ChapaStubServer(delay=options['delay']) as stub:
+                url = f"{stub.base_url}/transaction/verify/{tag}"
+                for pool in [p.strip() for p in options['pools'].split(',') if p.strip()]:
+                    report["pools"][pool] = self._run_pool(pool, queue, url, worker_env, options)
+        finally:
+            if tmpdir is not None:
+                tmpdir.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+            for pool, result in report["pools"].items():
+                self.stdout.write(f"{pool}: {result.get('tasks_per_second', result.get('error'))}")
+
+    def _run_pool(self, pool, queue, url, env, options):
+        if pool == 'gevent':
+            try:
+                import gevent  # noqa: F401
+            except ImportError:
+                return {"error": "gevent is not installed"}
+
+        command = [
+            sys.executable, "-m", "celery", "-A", "alx_travel_app", "worker",
+            "-P", pool, "-c", str(options['concurrency']), "-Q", queue,
+            "-n", f"{queue}-{pool}@%h", "-l", "WARNING",
+            # io_probe isn't in a production tasks module; only bench workers load it
+            "--include", "listings.management.commands._bench_tasks",
+            "--without-gossip", "--without-mingle", "--without-heartbeat",
+        ]
+        started = time.perf_counter()
+        worker = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        try:
+            # First task doubles as the readiness check
+            io_probe.apply_async((url,), queue=queue).get(timeout=options['timeout'])
+            startup = time.perf_counter() - started
+
+            started = time.perf_counter()
+            results = [io_probe.apply_async((url,), queue=queue) for _ in range(options['tasks'])]
+            errors = 0
+            for result in results:
+                try:
+                    result.get(timeout=options['timeout'], propagate=True)
+                except Exception:
+                    errors += 1
+            elapsed = time.perf_counter() - started
+            rss = process_tree_rss_kb(worker.pid)
+        finally:
+            worker.terminate()
+            try:
+                worker.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+                worker.wait()
+
+        return {
+            "startup_seconds": round(startup, 3),
+            "seconds": round(elapsed, 3),
+            "tasks_per_second": round(options['tasks'] / elapsed, 1) if elapsed else None,
+            "errors": errors,
+            "worker_rss_mb": round(rss / 1024, 1) if rss else None,
+        }
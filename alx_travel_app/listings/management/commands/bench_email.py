@@ -0,0 +1,89 @@
+import json
+import time
+import uuid
+
+from django.core.mail import get_connection, send_mail
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from listings.models import EmailNotification
+from listings.notifications import dedupe_key, dispatch_pending
+from listings.smtp_stub import SMTPStubServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare one send_mail() per message against the batched dispatcher, '
+        'both talking to a local SMTP stub that simulates handshake and per-message latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--connect-delay', type=float, default=0.05,
+                            help='Seconds the stub spends on each new connection (stands in for TLS setup)')
+        parser.add_argument('--message-delay', type=float, default=0.0)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--rate', type=float, default=0, help='Dispatcher messages/second (0 = unlimited)')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON only')
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        tag = f"bench-{uuid.uuid4().hex[:8]}"
+        recipients = [f"{tag}-{i}@example.com" for i in range(count)]
+        report = {"messages": count}
+
+        with SMTPStubServer(connect_delay=options['connect_delay'],
+                            message_delay=options['message_delay']) as stub:
+            smtp = {
+                "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+                "EMAIL_HOST": stub.host,
+                "EMAIL_PORT": stub.port,
+                "EMAIL_USE_TLS": False,
+                "EMAIL_USE_SSL": False,
+                "EMAIL_HOST_USER": "",
+                "EMAIL_HOST_PASSWORD": "",
+            }
+            with override_settings(**smtp):
+                started = time.perf_counter()
+                for recipient in recipients:
+                    send_mail("Benchmark", "Per-message send", None, [recipient])
+                report["send_mail"] = self._result(stub, time.perf_counter() - started, count)
+
+                stub.connections = 0
+                stub.messages.clear()
+                # Written directly rather than through queue_email() so no
+                # dispatcher task gets scheduled behind the benchmark's back
+                EmailNotification.objects.bulk_create([
+                    EmailNotification(
+                        recipient=recipient, kind=tag, subject="Benchmark", body="Dispatched send",
+                        dedupe_key=dedupe_key(recipient, tag, tag),
+                    )
+                    for recipient in recipients
+                ])
+                started = time.perf_counter()
+                sent = dispatch_pending(batch_size=options['batch_size'], rate=options['rate'],
+                                        connection=get_connection())
+                report["dispatcher"] = self._result(stub, time.perf_counter() - started, sent)
+                report["dispatcher"]["batch_size"] = options['batch_size']
+
+        EmailNotification.objects.filter(kind=tag).delete()
+
+        if report["dispatcher"]["seconds"]:
+            report["speedup"] = round(report["send_mail"]["seconds"] / report["dispatcher"]["seconds"], 2)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(
+                f"send_mail: {report['send_mail']['messages_per_second']} msg/s, "
+                f"dispatcher: {report['dispatcher']['messages_per_second']} msg/s"
+            ))
+
+    def _result(self, stub, elapsed, sent):
+        return {
+            "sent": sent,
+            "delivered": len(stub.messages),
+            "smtp_connections": stub.connections,
+            "seconds": round(elapsed, 3),
+            "messages_per_second": round(sent / elapsed, 1) if elapsed else None,
+        }
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from alx_travel_app.workers import process_memory_kb
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from listings.management.commands.bench_bookings import percentile, request_host
+
+PROFILES = {
+    # gunicorn defaults: every worker imports and warms up on its own
+    "cold": {"GUNICORN_PRELOAD": "false", "GUNICORN_WARMUP": "false"},
+    # App loaded once in the master, pages shared copy-on-write
+    "preload": {"GUNICORN_PRELOAD": "true", "GUNICORN_WARMUP": "false"},
+    # Preload plus warm caches in the master and DB connections per worker
+    "tuned": {"GUNICORN_PRELOAD": "true", "GUNICORN_WARMUP": "true"},
+}
+
+# Lines logged by the hooks in gunicorn.conf.py
+READY_RE = re.compile(r"worker ready pid=(\d+)")
+FIRST_REQUEST_RE = re.compile(r"first request pid=(\d+) .* ms=([\d.]+)")
+
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+class Command(BaseCommand):
+    help = (
+        'Start gunicorn with gunicorn.conf.py under each profile (cold, preload, tuned) and '
+        'report boot time, memory per worker and the latency of each worker\'s first request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default=','.join(PROFILES))
+        parser.add_argument('--workload', default='mixed', help='GUNICORN_WORKLOAD: mixed or cpu')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--path', default='/api/properties/', help='Endpoint the first requests hit')
+        parser.add_argument('--requests', type=int, default=200, help='Warm requests timed after the first ones')
+        parser.add_argument('--port', type=int, default=8098)
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON only')
+
+    def handle(self, *args, **options):
+        if options['workload'] not in ('mixed', 'cpu'):
+            raise CommandError("--workload must be mixed or cpu; asgi workers don't run the request hooks")
+        profiles = [p.strip() for p in options['profiles'].split(',') if p.strip()]
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s) {', '.join(sorted(unknown))}. Choose from: {', '.join(PROFILES)}")
+
+        report = {
+            "workload": options['workload'],
+            "workers": options['workers'],
+            "path": options['path'],
+            "profiles": {profile: self._run_profile(profile, options) for profile in profiles},
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        self.stdout.write(json.dumps(report, indent=2))
+        for profile, result in report["profiles"].items():
+            if "error" in result:
+                self.stdout.write(f"{profile}: {result['error']}")
+                continue
+            self.stdout.write(
+                f"{profile}: first request {result['first_request_ms']['mean']} ms, "
+                f"warm {result['warm_request_ms']['p50']} ms, "
+                f"{result['memory_mb']['worker_uss_mean']} MB private per worker"
+            )
+
+    def _run_profile(self, profile, options):
+        env = dict(os.environ)
+        env.update(PROFILES[profile])
+        env.update({
+            "GUNICORN_WORKLOAD": options['workload'],
+            "WEB_CONCURRENCY": str(options['workers']),
+            "GUNICORN_BIND": f"127.0.0.1:{options['port']}",
+            "REQUEST_LOG_LEVEL": "WARNING",
+        })
+        command = [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py"]
+        url = f"http://127.0.0.1:{options['port']}{options['path']}"
+        headers = {"Host": request_host()}
+
+        with tempfile.NamedTemporaryFile(mode="w+", suffix=".log") as log:
+            started = time.perf_counter()
+            server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=log)
+            try:
+                if not self._wait_for(log, READY_RE, options['workers'], server, options['timeout']):
+                    return {"error": f"workers did not boot:\n{self._read(log)[-2000:]}"}
+                boot = time.perf_counter() - started
+
+                # Concurrent waves on fresh connections until every worker has
+                # served its first request
+                with ThreadPoolExecutor(options['workers']) as pool:
+                    for _ in range(50):
+                        list(pool.map(lambda _: requests.get(url, headers=headers, timeout=options['timeout']),
+                                      range(options['workers'])))
+                        if len(FIRST_REQUEST_RE.findall(self._read(log))) >= options['workers']:
+                            break
+                first = [float(ms) for _, ms in FIRST_REQUEST_RE.findall(self._read(log))]
+
+                warm = []
+                with requests.Session() as session:
+                    for _ in range(options['requests']):
+                        request_started = time.perf_counter()
+                        session.get(url, headers=headers, timeout=options['timeout'])
+                        warm.append(time.perf_counter() - request_started)
+
+                master = process_memory_kb(server.pid) or {}
+                workers = [m for m in (process_memory_kb(pid) for pid in child_pids(server.pid)) if m]
+            finally:
+                server.terminate()
+                try:
+                    server.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+                    server.wait()
+
+        return {
+            "boot_seconds": round(boot, 3),
+            "first_request_ms": {
+                "workers_seen": len(first),
+                "mean": round(statistics.fmean(first), 1) if first else None,
+                "max": round(max(first), 1) if first else None,
+            },
+            "warm_request_ms": {
+                "p50": round(percentile(warm, 50) * 1000, 2),
+                "p95": round(percentile(warm, 95) * 1000, 2),
+            },
+            "memory_mb": {
+                "master_rss": round(master.get("rss", 0) / 1024, 1),
+                "worker_rss_mean": round(statistics.fmean(m["rss"] for m in workers) / 1024, 1) if workers else None,
+                "worker_uss_mean": round(statistics.fmean(m["uss"] for m in workers) / 1024, 1) if workers else None,
+                # What the server really costs: shared pages split between processes
+                "total_pss": round((master.get("pss", 0) + sum(m["pss"] for m in workers)) / 1024, 1),
+            },
+        }
+
+    def _read(self, log):
+        log.seek(0)
+        return log.read()
+
+    def _wait_for(self, log, pattern, count, server, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                return False
+            if len(pattern.findall(self._read(log))) >= count:
+                return True
+            time.sleep(0.1)
+        return False
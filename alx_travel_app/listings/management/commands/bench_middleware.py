@@ -0,0 +1,95 @@
+import json
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from listings.management.commands.bench_bookings import percentile, request_host
+from listings.models import User
+from listings.views import CustomTokenObtainPairSerializer
+
+MODES = {
+    # Every request runs the whole MIDDLEWARE chain
+    "full": {"STATELESS_API_PREFIXES": []},
+    # Bearer-token /api/ requests skip session, CSRF, auth and messages
+    "stateless": {"STATELESS_API_PREFIXES": ["/api/"]},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-request overhead of the full middleware stack with the stateless API path, '
+        'for Bearer-token requests through the in-process WSGI handler.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mode')
+        parser.add_argument('--rounds', type=int, default=4, help='Alternate the modes this many times')
+        parser.add_argument('--path', default='/api/bookings/', help='A cheap authenticated endpoint')
+        parser.add_argument('--no-cookie', action='store_true',
+                            help="Don't send a session cookie (browsers and many clients do)")
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON only')
+
+    def handle(self, *args, **options):
+        tag = f"bench-{uuid.uuid4().hex[:8]}"
+        user = User.objects.create_user(f"{tag}@example.com", "Bench", "User", None)
+        token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+        try:
+            report = self._run(user, token, options)
+        finally:
+            User.objects.filter(pk=user.pk).delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        self.stdout.write(json.dumps(report, indent=2))
+        full, lean = report["modes"]["full"], report["modes"]["stateless"]
+        self.stdout.write(self.style.SUCCESS(
+            f"stateless saves {full['mean_us'] - lean['mean_us']:.0f} us and "
+            f"{full['queries_per_request'] - lean['queries_per_request']} queries per request"
+        ))
+
+    def _run(self, user, token, options):
+        client = Client(SERVER_NAME=request_host(), HTTP_AUTHORIZATION=f"Bearer {token}")
+        client.raise_request_exception = False
+        if not options['no_cookie']:
+            # A logged-in browser sends its session cookie along with the token
+            client.force_login(user)
+
+        timings = {mode: [] for mode in MODES}
+        queries = {}
+        for mode, overrides in MODES.items():
+            with override_settings(**overrides):
+                response = client.get(options['path'])
+                with CaptureQueriesContext(connection) as captured:
+                    client.get(options['path'])
+            queries[mode] = len(captured)
+            if response.status_code != 200:
+                self.stderr.write(f"{mode}: {options['path']} returned {response.status_code}")
+
+        per_round = max(1, options['requests'] // options['rounds'])
+        for _ in range(options['rounds']):
+            for mode, overrides in MODES.items():
+                with override_settings(**overrides):
+                    for _ in range(per_round):
+                        started = time.perf_counter()
+                        client.get(options['path'])
+                        timings[mode].append(time.perf_counter() - started)
+
+        return {
+            "path": options['path'],
+            "session_cookie": not options['no_cookie'],
+            "requests_per_mode": per_round * options['rounds'],
+            "modes": {
+                mode: {
+                    "queries_per_request": queries[mode],
+                    "mean_us": round(statistics.fmean(values) * 1e6, 1),
+                    "p50_us": round(percentile(values, 50) * 1e6, 1),
+                    "p95_us": round(percentile(values, 95) * 1e6, 1),
+                }
+                for mode, values in timings.items()
+            },
+        }
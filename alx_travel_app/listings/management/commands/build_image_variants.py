@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from listings.images import VARIANT_FIELDS, build_variants, needs_variants, save_variants
+from listings.models import Property, User
+
+
+def _build(job):
+    """Worker-side: render one image's derivatives. No database access here."""
+    model_label, pk, field, name = job
+    try:
+        return model_label, pk, field, build_variants(name), None
+    except (OSError, ValueError) as e:
+        return model_label, pk, field, None, f"{name}: {e}"
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate resized WebP/JPEG derivatives for existing Property images and User avatars, '
+        'rendering in a process pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=200, help='Rows read per query')
+        parser.add_argument('--force', action='store_true', help='Rebuild even when derivatives are current')
+
+    def handle(self, *args, **options):
+        if options['workers'] > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("--workers needs the 'fork' start method; use --workers 1 on this platform")
+
+        started = time.perf_counter()
+        built = failed = 0
+        # Workers only render files; rows are read and written here
+        connections.close_all()
+        context = multiprocessing.get_context('fork') if options['workers'] > 1 else None
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            for model, field in ((Property, 'image'), (User, 'avatar')):
+                model_label = model._meta.label
+                for jobs in self._pending(model, field, options):
+                    for label, pk, field_name, variants, error in pool.map(_build, jobs):
+                        if error:
+                            failed += 1
+                            self.stderr.write(f"{label} {pk}: {error}")
+                        elif save_variants(label, pk, field_name, variants):
+                            built += 1
+                self.stdout.write(f"{model_label}.{field}: done")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Built derivatives for {built} images ({failed} failed) in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def _pending(self, model, field, options):
+        """Yield lists of jobs, one primary-key chunk at a time."""
+        model_label = model._meta.label
+        variants_field = VARIANT_FIELDS[(model_label, field)]
+        last_pk = None
+        while True:
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f"{field}__isnull": True})
+            if last_pk is not None:
+                rows = rows.filter(pk__gt=last_pk)
+            chunk = list(rows.order_by('pk').only(field, variants_field)[:options['chunk_size']])
+            if not chunk:
+                return
+            last_pk = chunk[-1].pk
+
+            jobs = [
+                (model_label, str(obj.pk), field, getattr(obj, field).name)
+                for obj in chunk
+                if options['force'] or needs_variants(getattr(obj, field), getattr(obj, variants_field))
+            ]
+            if jobs:
+                yield jobs
@@ -0,0 +1,338 @@
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from listings.chapa_stub import ChapaStubServer
+from listings.management.commands.bench_bookings import percentile
+
+DEFAULT_MIX = (
+    "properties_list=35,property_detail=20,property_search=10,property_reviews=5,"
+    "bookings_list=10,booking_create=8,signin=5,payment_initiate=4,payment_status=3"
+)
+
+# Status codes that count as a successful outcome for each endpoint
+EXPECTED_STATUS = {
+    "properties_list": {200},
+    "property_detail": {200},
+    "property_search": {200},
+    "property_reviews": {200},
+    "bookings_list": {200},
+    "booking_create": {201, 409},  # a conflict is a correct answer under load
+    "signin": {200},
+    "payment_initiate": {200},
+    "payment_status": {200, 202},
+    "payment_verify": {202},
+}
+
+SEARCH_TERMS = ["apartment", "villa", "cozy", "ocean", "garden", "pool", "wifi", "nairobi", "mombasa", "studio"]
+CITIES = ["Nairobi", "Mombasa", "Kisumu", "Diani", "Naivasha", "Kigali"]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in EXPECTED_STATUS:
+            raise CommandError(f"Unknown endpoint '{name}'. Choose from: {', '.join(EXPECTED_STATUS)}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Bad weight for '{name}': {weight!r}")
+    if not any(mix.values()):
+        raise CommandError("--mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+class VirtualUser:
+    """One signed-in client looping over the endpoint mix on its own keep-alive session."""
+
+    def __init__(self, test, email, password, rng):
+        self.test = test
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.session = requests.Session()
+        self.token = None
+        self.last_elapsed = 0.0
+        self.unpaid_bookings = []
+        self.tx_refs = []
+
+    def url(self, path):
+        return f"{self.test.base_url}{path}"
+
+    def request(self, method, path, auth=True, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        started = time.perf_counter()
+        try:
+            return self.session.request(method, self.url(path), headers=headers, timeout=self.test.timeout, **kwargs)
+        finally:
+            # Only the endpoint's own request is timed, not set-up calls made before it
+            self.last_elapsed = time.perf_counter() - started
+
+    def signin(self):
+        response = self.request("POST", "/api/signin/", auth=False,
+                                json={"email": self.email, "password": self.password})
+        if response.status_code == 200:
+            self.token = response.json()["access"]
+        return response
+
+    def booking_dates(self):
+        # Far enough ahead to stay clear of seeded bookings
+        start = date.today() + timedelta(days=400 + self.rng.randrange(self.test.horizon))
+        return start, start + timedelta(days=self.rng.randint(1, 5))
+
+    # One method per endpoint in EXPECTED_STATUS; each returns the response
+
+    def properties_list(self):
+        params = {"page_size": self.rng.choice([10, 20, 50])}
+        if self.rng.random() < 0.4:
+            params["city"] = self.rng.choice(CITIES)
+        if self.rng.random() < 0.3:
+            params["ordering"] = self.rng.choice(["-rating", "-review_count"])
+        return self.request("GET", "/api/properties/", auth=False, params=params)
+
+    def property_detail(self):
+        return self.request("GET", f"/api/properties/{self.rng.choice(self.test.property_ids)}/", auth=False)
+
+    def property_search(self):
+        start, end = self.booking_dates()
+        params = {"q": self.rng.choice(SEARCH_TERMS), "check_in": start.isoformat(), "check_out": end.isoformat()}
+        if self.rng.random() < 0.5:
+            params["max_price"] = self.rng.choice([5000, 10000, 20000])
+        return self.request("GET", "/api/properties/", auth=False, params=params)
+
+    def property_reviews(self):
+        return self.request("GET", f"/api/properties/{self.rng.choice(self.test.property_ids)}/reviews/", auth=False)
+
+    def bookings_list(self):
+        return self.request("GET", "/api/bookings/")
+
+    def booking_create(self):
+        start, end = self.booking_dates()
+        response = self.request("POST", "/api/bookings/", json={
+            "property": self.rng.choice(self.test.property_ids),
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+        })
+        if response.status_code == 201:
+            self.unpaid_bookings.append(response.json()["booking_id"])
+        return response
+
+    def payment_initiate(self):
+        # Each booking is paid for once, as in real checkouts
+        for _ in range(5):
+            if self.unpaid_bookings:
+                break
+            self.test.timed(self, "booking_create")
+        else:
+            return None
+        response = self.request("POST", "/api/payment/initiate/",
+                                json={"booking_id": self.unpaid_bookings.pop()})
+        if response.status_code == 200:
+            self.tx_refs.append(response.json()["transaction_id"])
+        return response
+
+    def payment_status(self):
+        if not self.tx_refs:
+            self.test.timed(self, "payment_initiate")
+        if not self.tx_refs:
+            return None
+        return self.request("GET", "/api/payment/success/", auth=False,
+                            params={"tx_ref": self.rng.choice(self.tx_refs)})
+
+    def payment_verify(self):
+        if not self.tx_refs:
+            self.test.timed(self, "payment_initiate")
+        if not self.tx_refs:
+            return None
+        return self.request("GET", "/api/payment/verify/", auth=False,
+                            params={"tx_ref": self.rng.choice(self.tx_refs)})
+
+
+class LoadTest:
+    def __init__(self, base_url, mix, timeout, horizon):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.timeout = timeout
+        self.horizon = horizon
+        self.property_ids = []
+        self.recording = False
+        self._lock = threading.Lock()
+        self.latencies = {name: [] for name in mix}
+        self.statuses = {name: {} for name in mix}
+        self.errors = {name: 0 for name in mix}
+
+    def timed(self, user, endpoint):
+        try:
+            response = getattr(user, endpoint)()
+            code = response.status_code if response is not None else None
+        except requests.RequestException as e:
+            code = type(e).__name__
+        elapsed = user.last_elapsed
+        if code is None or not self.recording:
+            return
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed)
+            statuses = self.statuses.setdefault(endpoint, {})
+            statuses[str(code)] = statuses.get(str(code), 0) + 1
+            if code not in EXPECTED_STATUS[endpoint]:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        total = 0
+        errors = 0
+        for name, values in sorted(self.latencies.items()):
+            if not values:
+                continue
+            total += len(values)
+            errors += self.errors.get(name, 0)
+            endpoints[name] = {
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "throughput_rps": round(len(values) / elapsed, 1),
+                "status": self.statuses[name],
+                "latency_ms": {
+                    "p50": round(percentile(values, 50) * 1000, 2),
+                    "p95": round(percentile(values, 95) * 1000, 2),
+                    "p99": round(percentile(values, 99) * 1000, 2),
+                    "max": round(max(values) * 1000, 2),
+                    "mean": round(statistics.fmean(values) * 1000, 2),
+                },
+            }
+        return {
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+            "endpoints": endpoints,
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive a weighted mix of API endpoints against a running server at a fixed concurrency '
+        'and report throughput and p50/p95/p99 latency per endpoint as JSON. Start the server '
+        'with CHAPA_BASE_URL pointing at the stub this command runs (--chapa-port).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--concurrency', type=int, default=16, help='Virtual users running in parallel')
+        parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+        parser.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before the run')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help='Comma-separated endpoint=weight pairs')
+        parser.add_argument('--seed-users', type=int, default=None, metavar='SEED',
+                            help='Sign in as users made by `seed --seed SEED` instead of signing up new ones')
+        parser.add_argument('--password', default='password', help='Password of the --seed-users accounts')
+        parser.add_argument('--properties', type=int, default=500, help='Property ids sampled for detail/booking requests')
+        parser.add_argument('--horizon', type=int, default=365, help='Days across which test bookings are spread')
+        parser.add_argument('--chapa-port', type=int, default=8099,
+                            help='Port for the local Chapa stub (0 = do not start one)')
+        parser.add_argument('--chapa-delay', type=float, default=0.1, help='Seconds the Chapa stub takes per call')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--label', default='', help='Free-form tag stored in the report, e.g. a release')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+        parser.add_argument('--random-seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        test = LoadTest(options['url'], mix, options['timeout'], options['horizon'])
+        rng = random.Random(options['random_seed'])
+
+        stub = None
+        if options['chapa_port']:
+            stub = ChapaStubServer(port=options['chapa_port'], delay=options['chapa_delay']).start()
+            self.stderr.write(f"Chapa stub listening on {stub.base_url}")
+        try:
+            users = self._setup(test, options, rng)
+            report = self._run(test, users, mix, options)
+        finally:
+            if stub is not None:
+                stub.stop()
+
+        report = {
+            "label": options['label'],
+            "target": test.base_url,
+            "concurrency": options['concurrency'],
+            "duration_s": options['duration'],
+            "mix": mix,
+            "chapa_calls": len(stub.requests) if stub is not None else None,
+            **report,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+    def _setup(self, test, options, rng):
+        session = requests.Session()
+        next_url = f"{test.base_url}/api/properties/?page_size=100"
+        while next_url and len(test.property_ids) < options['properties']:
+            try:
+                response = session.get(next_url, timeout=options['timeout'])
+            except requests.RequestException as e:
+                raise CommandError(f"Cannot reach {test.base_url}: {e}")
+            if response.status_code != 200:
+                raise CommandError(f"GET /api/properties/ returned {response.status_code}")
+            page = response.json()
+            test.property_ids.extend(item["property_id"] for item in page["results"])
+            next_url = page.get("next")
+        if not test.property_ids:
+            raise CommandError("No properties on the target; run `manage.py seed` against it first")
+
+        tag = uuid.uuid4().hex[:8]
+        users = []
+        for i in range(options['concurrency']):
+            if options['seed_users'] is not None:
+                email = f"seed{options['seed_users']}.user{i}@example.com"
+                password = options['password']
+            else:
+                email = f"loadtest-{tag}-{i}@example.com"
+                password = uuid.uuid4().hex
+                response = session.post(f"{test.base_url}/api/signup/", json={
+                    "email": email, "password": password, "first_name": "Load", "last_name": f"Test {i}",
+                }, timeout=options['timeout'])
+                if response.status_code != 201:
+                    raise CommandError(f"Signup failed ({response.status_code}): {response.text[:200]}")
+            user = VirtualUser(test, email, password, random.Random(rng.random()))
+            if user.signin().status_code != 200:
+                raise CommandError(f"Could not sign in as {email}")
+            users.append(user)
+        return users
+
+    def _run(self, test, users, mix, options):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        stop = threading.Event()
+
+        def loop(user):
+            while not stop.is_set():
+                test.timed(user, user.rng.choices(names, weights=weights)[0])
+
+        threads = [threading.Thread(target=loop, args=(user,), daemon=True) for user in users]
+        for thread in threads:
+            thread.start()
+
+        time.sleep(options['warmup'])
+        test.recording = True
+        started = time.perf_counter()
+        time.sleep(options['duration'])
+        test.recording = False
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=options['timeout'])
+        return test.report(elapsed)
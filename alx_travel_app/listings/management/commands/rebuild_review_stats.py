@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from listings.models import Property, Review
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized review aggregates on every property from the Review table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Properties recomputed and written per batch')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = None
+        updated = 0
+
+        # Walk properties in primary-key chunks so memory stays flat on large catalogs
+        while True:
+            properties = Property.objects.only(*Property.REVIEW_STATS_FIELDS).order_by('pk')
+            if last_pk is not None:
+                properties = properties.filter(pk__gt=last_pk)
+            chunk = list(properties[:chunk_size])
+            if not chunk:
+                break
+
+            histograms = {}
+            rows = (
+                Review.objects.filter(property_id__in=[p.pk for p in chunk], rating__range=(1, 5))
+                .values('property_id', 'rating')
+                .annotate(n=Count('review_id'))
+                .order_by()
+            )
+            for row in rows:
+                histograms.setdefault(row['property_id'], {})[row['rating']] = row['n']
+
+            for prop in chunk:
+                prop.set_review_stats(histograms.get(prop.pk, {}))
+
+            with transaction.atomic():
+                Property.objects.bulk_update(chunk, Property.REVIEW_STATS_FIELDS)
+
+            updated += len(chunk)
+            last_pk = chunk[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt review stats for {updated} properties."))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from listings.models import Property, PropertyCategory, SearchTerm
+from listings.search import normalize_categories, tokenize
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the property search term and category indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Properties reindexed per transaction')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = None
+        indexed = 0
+
+        while True:
+            properties = Property.objects.only('name', 'description', 'category').order_by('pk')
+            if last_pk is not None:
+                properties = properties.filter(pk__gt=last_pk)
+            chunk = list(properties[:chunk_size])
+            if not chunk:
+                break
+
+            terms = []
+            categories = []
+            for prop in chunk:
+                terms.extend(
+                    SearchTerm(property=prop, term=term)
+                    for term in tokenize(f"{prop.name} {prop.description}")
+                )
+                categories.extend(
+                    PropertyCategory(property=prop, name=name)
+                    for name in sorted(normalize_categories(prop.category))
+                )
+
+            pks = [prop.pk for prop in chunk]
+            with transaction.atomic():
+                SearchTerm.objects.filter(property_id__in=pks).delete()
+                PropertyCategory.objects.filter(property_id__in=pks).delete()
+                SearchTerm.objects.bulk_create(terms, batch_size=5000)
+                PropertyCategory.objects.bulk_create(categories, batch_size=5000)
+
+            indexed += len(chunk)
+            last_pk = chunk[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {indexed} properties."))
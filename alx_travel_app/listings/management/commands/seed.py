@@ -1,32 +1,410 @@
-from django.core.management.base import BaseCommand
-from listings.models import Property, User
-from django.utils import timezone
-from decimal import Decimal
+import hashlib
+import multiprocessing
+import random
+import time
 import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 
-class Command(BaseCommand):
-    help = 'Seed the database with sample property data'
-
-    def handle(self, *args, **kwargs):
-        # Create or get host user
-        host, created = User.objects.get_or_create(
-            email='host@example.com',
-            defaults={
-                'first_name': 'Host',
-                'last_name': 'User',
-                'role': 'host',
-                'password_hash': 'dummyhashed',
-            }
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+from listings.cache import invalidate_property
+from listings.calendar import invalidate_calendars
+from listings.geo import encode as geohash_encode
+from listings.models import BookedNight, Booking, Payment, Property, Review, User
+
+# (city, state, country, weight, median nightly price in KES, latitude, longitude)
+CITIES = [
+    ("Nairobi", "Nairobi", "Kenya", 30, 8000, -1.2864, 36.8172),
+    ("Mombasa", "Mombasa", "Kenya", 15, 9000, -4.0435, 39.6682),
+    ("Kisumu", "Kisumu", "Kenya", 6, 5000, -0.0917, 34.7680),
+    ("Nakuru", "Nakuru", "Kenya", 5, 4500, -0.3031, 36.0800),
+    ("Diani", "Kwale", "Kenya", 6, 12000, -4.2797, 39.5947),
+    ("Malindi", "Kilifi", "Kenya", 4, 10000, -3.2192, 40.1169),
+    ("Naivasha", "Nakuru", "Kenya", 4, 9000, -0.7167, 36.4333),
+    ("Nanyuki", "Laikipia", "Kenya", 3, 7000, 0.0167, 37.0667),
+    ("Eldoret", "Uasin Gishu", "Kenya", 3, 4000, 0.5143, 35.2698),
+    ("Lamu", "Lamu", "Kenya", 2, 15000, -2.2717, 40.9020),
+    ("Kampala", "Central", "Uganda", 4, 6000, 0.3476, 32.5825),
+    ("Dar es Salaam", "Dar es Salaam", "Tanzania", 4, 7000, -6.7924, 39.2083),
+    ("Zanzibar City", "Zanzibar", "Tanzania", 3, 14000, -6.1659, 39.2026),
+    ("Kigali", "Kigali", "Rwanda", 3, 8000, -1.9441, 30.0619),
+    ("Addis Ababa", "Addis Ababa", "Ethiopia", 4, 7000, 9.0054, 38.7636),
+    ("Cape Town", "Western Cape", "South Africa", 3, 15000, -33.9249, 18.4241),
+]
+CITY_WEIGHTS = [c[3] for c in CITIES]
+
+ADJECTIVES = ["Cozy", "Modern", "Spacious", "Charming", "Sunny", "Quiet", "Elegant", "Rustic", "Bright", "Hidden"]
+PROPERTY_TYPES = ["Apartment", "Studio", "Cottage", "Villa", "Bungalow", "Loft", "Guesthouse", "Cabin"]
+FEATURES = [
+    "a private balcony", "fast wifi", "a garden", "ocean views", "a rooftop terrace", "a fireplace",
+    "a fully equipped kitchen", "secure parking", "a swimming pool", "a dedicated workspace",
+    "mountain views", "a hot tub",
+]
+CATEGORIES = [
+    "Beachfront", "City", "Countryside", "Luxury", "Budget", "Family", "Pet Friendly",
+    "Pool", "Wifi", "Workspace", "Safari", "Lakefront",
+]
+FIRST_NAMES = ["Amina", "Brian", "Cynthia", "David", "Esther", "Faith", "George", "Halima", "Ian", "Joy",
+               "Kevin", "Lilian", "Moses", "Njeri", "Otieno", "Purity", "Samuel", "Wanjiru", "Yusuf", "Zawadi"]
+LAST_NAMES = ["Achieng", "Baraka", "Chebet", "Kamau", "Kariuki", "Mohamed", "Mutua", "Njoroge",
+              "Odhiambo", "Omondi", "Otieno", "Wafula", "Wambui", "Wanjiku"]
+
+BEDS = [1, 2, 3, 4, 5]
+BED_WEIGHTS = [30, 35, 20, 10, 5]
+# Nights per stay: mostly short, with a weekly and fortnightly tail
+STAY_LENGTHS = [1, 2, 3, 4, 5, 6, 7, 10, 14]
+STAY_WEIGHTS = [20, 25, 20, 10, 7, 5, 8, 2, 3]
+# J-shaped, like real review sites; shifted per property by its "quality"
+RATING_WEIGHTS = {1: 8, 2: 5, 3: 10, 4: 27, 5: 50}
+REVIEW_COMMENTS = {
+    1: ["Not as described.", "Would not stay again.", "Dirty and noisy."],
+    2: ["Below expectations.", "The host was hard to reach."],
+    3: ["It was okay for the price.", "Decent stay, nothing special."],
+    4: ["Nice place, good location.", "Comfortable and clean.", "Would book again."],
+    5: ["Absolutely loved it!", "Perfect stay, amazing host.", "Exceeded every expectation."],
+}
+
+# Models whose timestamps the generator sets itself instead of "now"
+TIMESTAMP_FIELDS = [
+    (User, "created_at"), (Property, "created_at"), (Property, "updated_at"),
+    (Booking, "created_at"), (Payment, "payment_date"), (Review, "created_at"),
+]
+
+
+def seeded_uuid(seed, kind, key):
+    """Stable UUID for the ``key``-th ``kind`` of a dataset, so chunks can be generated independently."""
+    digest = hashlib.blake2b(f"{seed}:{kind}:{key}".encode(), digest_size=16).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+def seeded_rng(seed, kind, key):
+    return random.Random(f"{seed}:{kind}:{key}")
+
+
+@contextmanager
+def explicit_timestamps():
+    """Let bulk_create keep the generated created_at values instead of auto_now(_add)."""
+    fields = [model._meta.get_field(name) for model, name in TIMESTAMP_FIELDS]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def aware(day, rng):
+    moment = datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Dataset:
+    """
+    Everything about the generated data is a pure function of the seed and an
+    entity's index, so any chunk can be built in any process, in any order,
+    and reruns produce the same rows.
+    """
+
+    def __init__(self, seed, users, hosts, properties, bookings, reviews, anchor, history_days,
+                 future_days, password_hash):
+        self.seed = seed
+        self.users = users
+        self.hosts = hosts
+        self.properties = properties
+        self.bookings = bookings
+        self.reviews = reviews
+        self.anchor = anchor
+        self.history_days = history_days
+        self.future_days = future_days
+        self.password_hash = password_hash
+
+    def user_id(self, index):
+        return seeded_uuid(self.seed, "user", index)
+
+    def property_id(self, index):
+        return seeded_uuid(self.seed, "property", index)
+
+    def user(self, index):
+        rng = seeded_rng(self.seed, "user", index)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        return User(
+            user_id=self.user_id(index),
+            first_name=first,
+            last_name=last,
+            email=f"seed{self.seed}.user{index}@example.com",
+            phone_number=f"+2547{rng.randrange(10 ** 8):08d}",
+            role="host" if index < self.hosts else "guest",
+            password=self.password_hash,
+            created_at=aware(self.anchor - timedelta(days=rng.randrange(2 * self.history_days)), rng),
         )
 
-        # Create sample properties
-        for i in range(5):
-            Property.objects.create(
-                host=host,
-                name=f"Sample Property {i+1}",
-                description="A lovely place to stay.",
-                location="Nairobi",
-                pricepernight=Decimal("99.99"),
+    def property_attrs(self, index):
+        """Generated attributes of a property; also used when building its bookings."""
+        rng = seeded_rng(self.seed, "property", index)
+        city, state, country, _, median, latitude, longitude = rng.choices(CITIES, weights=CITY_WEIGHTS)[0]
+        bed = rng.choices(BEDS, weights=BED_WEIGHTS)[0]
+        price = median * (0.6 + 0.3 * bed) * rng.lognormvariate(0, 0.35)
+        kind = rng.choice(PROPERTY_TYPES)
+        adjective = rng.choice(ADJECTIVES)
+        features = rng.sample(FEATURES, 2)
+        return {
+            "rng": rng,
+            "city": city, "state": state, "country": country,
+            "bed": bed,
+            "shower": max(1, bed - rng.randrange(2)),
+            "pricepernight": Decimal(max(500, round(price / 50) * 50)),
+            "name": f"{adjective} {kind} in {city}",
+            "description": (
+                f"{adjective} {kind.lower()} in {city}, {country} with {features[0]} and {features[1]}. "
+                f"Sleeps up to {bed * 2}."
+            ),
+            "category": sorted(rng.sample(CATEGORIES, rng.randint(1, 4))),
+            # Few hosts own many listings
+            "host": int(self.hosts * rng.random() ** 2),
+            # Popularity drives booking volume; quality skews ratings
+            "popularity": rng.lognormvariate(0, 0.8),
+            "quality": rng.gauss(0, 1),
+            # Scattered a few kilometres around the city centre
+            "latitude": round(latitude + rng.gauss(0, 0.03), 6),
+            "longitude": round(longitude + rng.gauss(0, 0.03), 6),
+        }
+
+    def property(self, index):
+        attrs = self.property_attrs(index)
+        rng = attrs["rng"]
+        created = aware(self.anchor - timedelta(days=self.history_days + rng.randrange(self.history_days)), rng)
+        return Property(
+            property_id=self.property_id(index),
+            host_id=self.user_id(attrs["host"]),
+            name=attrs["name"],
+            description=attrs["description"],
+            city=attrs["city"], state=attrs["state"], country=attrs["country"],
+            # bulk_create skips Property.save, which normally fills in geohash
+            latitude=attrs["latitude"], longitude=attrs["longitude"],
+            geohash=geohash_encode(attrs["latitude"], attrs["longitude"]),
+            category=attrs["category"],
+            pricepernight=attrs["pricepernight"],
+            bed=attrs["bed"],
+            shower=attrs["shower"],
+            occupants=f"1-{attrs['bed'] * 2}",
+            created_at=created,
+            updated_at=created,
+        )
+
+    def stays(self, index):
+        """
+        Bookings, booked nights, payments and reviews for one property.
+        Stays walk forward through the calendar, so they never overlap.
+        """
+        attrs = self.property_attrs(index)
+        rng = seeded_rng(self.seed, "bookings", index)
+        property_id = self.property_id(index)
+        price = attrs["pricepernight"]
+
+        window_start = self.anchor - timedelta(days=self.history_days)
+        window_days = self.history_days + self.future_days
+        # lognormvariate(0, 0.8) averages e^0.32, so this keeps the mean at --bookings
+        wanted = max(0, round(self.bookings * attrs["popularity"] / 1.377))
+        mean_gap = max(0.0, window_days / max(wanted, 1) - 3.5)
+
+        bookings, nights, payments, reviews = [], [], [], []
+        day = window_start + timedelta(days=int(rng.expovariate(1 / (mean_gap + 1))))
+        for n in range(wanted):
+            length = rng.choices(STAY_LENGTHS, weights=STAY_WEIGHTS)[0]
+            start, end = day, day + timedelta(days=length)
+            if end > self.anchor + timedelta(days=self.future_days):
+                break
+            day = end + timedelta(days=int(rng.expovariate(1 / (mean_gap + 1))) if mean_gap else 0)
+
+            if end <= self.anchor:
+                status = "canceled" if rng.random() < 0.1 else "confirmed"
+            elif start > self.anchor:
+                status = rng.choices(["pending", "confirmed", "canceled"], weights=[40, 50, 10])[0]
+            else:
+                status = "confirmed"
+
+            key = f"{index}:{n}"
+            booking = Booking(
+                booking_id=seeded_uuid(self.seed, "booking", key),
+                property_id=property_id,
+                user_id=self.user_id(int(self.users * rng.random() ** 1.5)),
+                start_date=start,
+                end_date=end,
+                total_price=price * length,
+                status=status,
+                created_at=aware(min(start - timedelta(days=int(rng.expovariate(1 / 21))), self.anchor), rng),
             )
+            bookings.append(booking)
+
+            if status != "canceled":
+                nights.extend(
+                    BookedNight(property_id=property_id, booking_id=booking.booking_id,
+                                night=start + timedelta(days=i))
+                    for i in range(length)
+                )
+
+            payment_status = {"confirmed": "Completed", "pending": "Pending", "canceled": "Failed"}[status]
+            if status == "confirmed" or rng.random() < 0.5:
+                payments.append(Payment(
+                    payment_id=seeded_uuid(self.seed, "payment", key),
+                    booking_id=booking.booking_id,
+                    amount=booking.total_price,
+                    transaction_id=f"chapa-{booking.booking_id}",
+                    status=payment_status,
+                    payment_date=booking.created_at + timedelta(minutes=rng.randrange(1, 120)),
+                ))
+
+            if status == "confirmed" and end <= self.anchor and rng.random() < self.reviews:
+                weights = [w * 1.6 ** (attrs["quality"] * (star - 3)) for star, w in RATING_WEIGHTS.items()]
+                rating = rng.choices(list(RATING_WEIGHTS), weights=weights)[0]
+                reviews.append(Review(
+                    review_id=seeded_uuid(self.seed, "review", key),
+                    property_id=property_id,
+                    user_id=booking.user_id,
+                    rating=rating,
+                    comment=rng.choice(REVIEW_COMMENTS[rating]),
+                    created_at=aware(end + timedelta(days=rng.randrange(14)), rng),
+                ))
+
+        return bookings, nights, payments, reviews
+
+
+def write_chunk(dataset, phase, start, stop, batch_size):
+    """Generate and insert one chunk; returns {model name: rows}."""
+    counts = {}
+
+    def insert(model, rows):
+        # ignore_conflicts makes an interrupted run resumable with the same seed
+        model.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+        counts[model.__name__] = counts.get(model.__name__, 0) + len(rows)
+
+    with explicit_timestamps(), transaction.atomic():
+        if phase == "users":
+            insert(User, [dataset.user(i) for i in range(start, stop)])
+        elif phase == "properties":
+            insert(Property, [dataset.property(i) for i in range(start, stop)])
+        else:
+            bookings, nights, payments, reviews = [], [], [], []
+            for i in range(start, stop):
+                b, n, p, r = dataset.stays(i)
+                bookings.extend(b)
+                nights.extend(n)
+                payments.extend(p)
+                reviews.extend(r)
+            insert(Booking, bookings)
+            insert(BookedNight, nights)
+            insert(Payment, payments)
+            insert(Review, reviews)
+    return counts
+
+
+def _init_worker():
+    # Connections are opened fresh in each worker, never inherited
+    connections.close_all()
+
+
+def _run_chunk(job):
+    return write_chunk(*job)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic synthetic dataset (users, properties, bookings, payments, reviews) '
+        'with chunked bulk inserts. The same --seed always produces the same rows, and reruns '
+        'skip rows that already exist.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--hosts', type=float, default=0.1, help='Fraction of users who are hosts')
+        parser.add_argument('--properties', type=int, default=20)
+        parser.add_argument('--bookings', type=float, default=8, help='Average bookings per property')
+        parser.add_argument('--reviews', type=float, default=0.35,
+                            help='Share of completed stays that get a review')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--anchor', type=date.fromisoformat, default=None,
+                            help="'Today' for the generated calendar, YYYY-MM-DD (default: today)")
+        parser.add_argument('--history-days', type=int, default=365)
+        parser.add_argument('--future-days', type=int, default=180)
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows generated per chunk')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT')
+        parser.add_argument('--workers', type=int, default=1, help='Processes inserting chunks in parallel')
+        parser.add_argument('--password', default='password', help='Password set on every generated user')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help="Don't rebuild review stats and the search index afterwards")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError("--users must be at least 1")
+        if options['workers'] > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("--workers needs the 'fork' start method; use --workers 1 on this platform")
+
+        dataset = Dataset(
+            seed=options['seed'],
+            users=options['users'],
+            hosts=max(1, int(options['users'] * options['hosts'])),
+            properties=options['properties'],
+            bookings=options['bookings'],
+            reviews=options['reviews'],
+            anchor=options['anchor'] or date.today(),
+            history_days=options['history_days'],
+            future_days=options['future_days'],
+            # One hash for everyone: hashing per user would dominate the run
+            password_hash=make_password(options['password']),
+        )
+
+        chunk_size = options['chunk_size']
+        # Size booking chunks by the rows they produce, not by property count
+        stay_chunk = max(1, int(chunk_size / max(options['bookings'], 1)))
+        phases = [
+            ("users", options['users'], chunk_size),
+            ("properties", options['properties'], chunk_size),
+            ("bookings", options['properties'], stay_chunk),
+        ]
+
+        started = time.perf_counter()
+        totals = {}
+        for phase, count, size in phases:
+            jobs = [
+                (dataset, phase, start, min(start + size, count), options['batch_size'])
+                for start in range(0, count, size)
+            ]
+            phase_started = time.perf_counter()
+            for counts in self._run(jobs, options['workers']):
+                for name, rows in counts.items():
+                    totals[name] = totals.get(name, 0) + rows
+            self.stdout.write(f"{phase}: {len(jobs)} chunks in {time.perf_counter() - phase_started:.1f}s")
+
+        for name, rows in totals.items():
+            self.stdout.write(f"  {name}: {rows}")
+
+        if not options['skip_rebuild']:
+            # bulk_create bypasses Review.save and Property.save, so derive both here
+            call_command('rebuild_review_stats', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+        invalidate_property(None)
+        invalidate_calendars()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {sum(totals.values())} rows in {time.perf_counter() - started:.1f}s "
+            f"(seed {options['seed']}; users log in with --password)."
+        ))
+
+    def _run(self, jobs, workers):
+        if workers <= 1:
+            for job in jobs:
+                yield write_chunk(*job)
+            return
 
-        self.stdout.write(self.style.SUCCESS("Database seeded with sample listings."))
+        # Children must open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers, initializer=_init_worker) as pool:
+            yield from pool.imap_unordered(_run_chunk, jobs)
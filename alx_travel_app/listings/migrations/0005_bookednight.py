@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:06
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_booked_nights(apps, schema_editor):
+    Booking = apps.get_model('listings', 'Booking')
+    BookedNight = apps.get_model('listings', 'BookedNight')
+
+    batch = []
+    bookings = Booking.objects.filter(status__in=['pending', 'confirmed']).values_list(
+        'booking_id', 'property_id', 'start_date', 'end_date'
+    )
+    for booking_id, property_id, start_date, end_date in bookings.iterator():
+        for i in range((end_date - start_date).days):
+            batch.append(BookedNight(
+                booking_id=booking_id,
+                property_id=property_id,
+                night=start_date + timedelta(days=i),
+            ))
+        if len(batch) >= 1000:
+            BookedNight.objects.bulk_create(batch)
+            batch = []
+    BookedNight.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0004_user_avatar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookedNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_nights', to='listings.booking')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_nights', to='listings.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['night', 'property'], name='bookednight_night_prop_idx'), models.Index(fields=['property', 'night'], name='bookednight_prop_night_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_booked_nights, migrations.RunPython.noop),
+    ]
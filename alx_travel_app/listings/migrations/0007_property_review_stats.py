@@ -0,0 +1,81 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:08
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_review_stats(apps, schema_editor):
+    Property = apps.get_model('listings', 'Property')
+    Review = apps.get_model('listings', 'Review')
+
+    histograms = {}
+    rows = Review.objects.values('property_id', 'rating').annotate(n=Count('review_id')).order_by()
+    for row in rows:
+        if 1 <= row['rating'] <= 5:
+            histograms.setdefault(row['property_id'], {})[row['rating']] = row['n']
+
+    for property_id, histogram in histograms.items():
+        count = sum(histogram.values())
+        total = sum(star * n for star, n in histogram.items())
+        Property.objects.filter(pk=property_id).update(
+            review_count=count,
+            rating_sum=total,
+            rating=(Decimal(total) / count).quantize(Decimal('0.01')),
+            **{f'rating_{star}_count': histogram.get(star, 0) for star in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['rating', 'created_at', 'property_id'], name='property_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['review_count', 'created_at', 'property_id'], name='property_review_count_idx'),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_property_review_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['country', 'city', 'pricepernight'], name='property_location_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['city', 'pricepernight'], name='property_city_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['state', 'pricepernight'], name='property_state_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['pricepernight'], name='property_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['bed', 'shower'], name='property_bed_shower_idx'),
+        ),
+        migrations.AddField(
+            model_name='propertycategory',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_index', to='listings.property'),
+        ),
+        migrations.AddField(
+            model_name='searchterm',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='listings.property'),
+        ),
+        migrations.AddIndex(
+            model_name='propertycategory',
+            index=models.Index(fields=['name', 'property'], name='propertycategory_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='propertycategory',
+            constraint=models.UniqueConstraint(fields=('property', 'name'), name='unique_property_category'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'property'], name='searchterm_term_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('property', 'term'), name='unique_property_term'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:14
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_nights(apps, schema_editor):
+    # Overlaps accepted before Booking.save checked availability: keep the
+    # night with the earliest index row so the constraint can be created.
+    BookedNight = apps.get_model('listings', 'BookedNight')
+    duplicates = (
+        BookedNight.objects.values('property_id', 'night')
+        .annotate(n=Count('id'), keep=Min('id'))
+        .filter(n__gt=1)
+        .order_by()
+    )
+    for row in duplicates.iterator():
+        BookedNight.objects.filter(property_id=row['property_id'], night=row['night']).exclude(
+            id=row['keep']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0009_payment_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_nights, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='bookednight',
+            name='bookednight_prop_night_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='bookednight',
+            constraint=models.UniqueConstraint(fields=('property', 'night'), name='unique_property_night'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:20
+
+from django.db import migrations
+
+from listings.search import normalize_categories, tokenize
+
+
+def backfill_search_index(apps, schema_editor):
+    """
+    Index the properties that existed before 0008: Property.save keeps the
+    index current from then on, but older rows had no SearchTerm or
+    PropertyCategory rows and so never matched ?q= or ?category=.
+    """
+    Property = apps.get_model('listings', 'Property')
+    PropertyCategory = apps.get_model('listings', 'PropertyCategory')
+    SearchTerm = apps.get_model('listings', 'SearchTerm')
+
+    properties = Property.objects.only('name', 'description', 'category').order_by('pk')
+    last_pk = None
+    while True:
+        chunk = list((properties.filter(pk__gt=last_pk) if last_pk else properties)[:1000])
+        if not chunk:
+            break
+        pks = [prop.pk for prop in chunk]
+        SearchTerm.objects.filter(property_id__in=pks).delete()
+        PropertyCategory.objects.filter(property_id__in=pks).delete()
+        SearchTerm.objects.bulk_create([
+            SearchTerm(property_id=prop.pk, term=term)
+            for prop in chunk
+            for term in tokenize(f"{prop.name} {prop.description}")
+        ], batch_size=5000)
+        PropertyCategory.objects.bulk_create([
+            PropertyCategory(property_id=prop.pk, name=name)
+            for prop in chunk
+            for name in sorted(normalize_categories(prop.category))
+        ], batch_size=5000)
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_property_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,15 @@
 # listings/models.py
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from datetime import timedelta
+from decimal import Decimal
+from .availability import ACTIVE_BOOKING_STATUSES, BookingUnavailable, is_available, sync_booked_nights
+from .geo import encode as geohash_encode
+from .pricing import quote_stay
+from .search import index_property
 
 # Role and status enums
 USER_ROLES = [('guest', 'Guest'), ('host', 'Host'), ('admin', 'Admin')]
@@ -35,6 +41,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     role = models.CharField(max_length=10, choices=USER_ROLES, default='guest')
     created_at = models.DateTimeField(auto_now_add=True)
     avatar = models.ImageField(upload_to="avatars/", null=True, blank=True)
+    # Resized copies of avatar, filled in by the generate_image_variants task
+    avatar_variants = models.JSONField(default=dict, blank=True)
 
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
@@ -73,8 +81,17 @@ class Property(models.Model):
     state = models.CharField(max_length=100, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
     country = models.CharField(max_length=100, blank=True, null=True)
+    latitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Derived from latitude/longitude on save; empty when either is missing
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
 
     # extra fields
+    # Live average, kept in step with the review aggregates below
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     category = models.JSONField(default=list)  # store as list
     pricepernight = models.DecimalField(max_digits=10, decimal_places=2)
@@ -82,14 +99,95 @@ class Property(models.Model):
     shower = models.PositiveSmallIntegerField(default=1)
     occupants = models.CharField(max_length=50, default='1-2')
     image = models.ImageField(upload_to='properties/', blank=True, null=True)
+    # Resized copies of image, filled in by the generate_image_variants task
+    image_variants = models.JSONField(default=dict, blank=True)
+    # Pricing rules such as "10% weekly; 20% off weekends" (see pricing.Discount)
     discount = models.CharField(max_length=50, blank=True, null=True)
 
+    # denormalized review aggregates, updated by Review.save and the review_deleted signal
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    REVIEW_STATS_FIELDS = [
+        'rating', 'review_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    ]
+
+    class Meta:
+        indexes = [
+            # Keyset pagination orders
+            models.Index(fields=['created_at', 'property_id'], name='property_created_idx'),
+            models.Index(fields=['rating', 'created_at', 'property_id'], name='property_rating_idx'),
+            models.Index(fields=['review_count', 'created_at', 'property_id'], name='property_review_count_idx'),
+            # Search filters
+            models.Index(fields=['country', 'city', 'pricepernight'], name='property_location_price_idx'),
+            models.Index(fields=['city', 'pricepernight'], name='property_city_price_idx'),
+            models.Index(fields=['state', 'pricepernight'], name='property_state_price_idx'),
+            models.Index(fields=['pricepernight'], name='property_price_idx'),
+            models.Index(fields=['bed', 'shower'], name='property_bed_shower_idx'),
+            # Geohash prefix ranges; carries the coordinates so the box
+            # bounds and distance are checked from the index alone
+            models.Index(fields=['geohash', 'latitude', 'longitude'], name='property_geohash_idx'),
+        ]
+
+    SEARCH_FIELDS = {'name', 'description', 'category'}
+
     def __str__(self):
         return f"{self.name} in {self.city } ({self.country})"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # Partial saves that leave the coordinates alone don't touch them,
+        # so instances loaded with .only() don't fetch them just for this
+        if update_fields is None or {'latitude', 'longitude'}.intersection(update_fields):
+            if self.latitude is not None and self.longitude is not None:
+                self.geohash = geohash_encode(self.latitude, self.longitude)
+            else:
+                self.geohash = ''
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'geohash'}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Keep the search and category indexes in step with the text fields
+            if update_fields is None or self.SEARCH_FIELDS.intersection(update_fields):
+                index_property(self)
+
+    @property
+    def rating_histogram(self):
+        return {str(star): getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+
+    def set_review_stats(self, histogram):
+        """Overwrite the aggregates from a {star: count} mapping."""
+        self.review_count = 0
+        self.rating_sum = 0
+        for star in range(1, 6):
+            count = histogram.get(star, 0)
+            setattr(self, f'rating_{star}_count', count)
+            self.review_count += count
+            self.rating_sum += star * count
+        self._refresh_rating()
+
+    def add_review_rating(self, rating, delta=1):
+        field = f'rating_{rating}_count'
+        setattr(self, field, getattr(self, field) + delta)
+        self.review_count += delta
+        self.rating_sum += rating * delta
+        self._refresh_rating()
+
+    def _refresh_rating(self):
+        if self.review_count:
+            self.rating = (Decimal(self.rating_sum) / self.review_count).quantize(Decimal('0.01'))
+        else:
+            self.rating = Decimal('0.00')
+
 
 class Booking(models.Model):
     booking_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_index=True)
@@ -101,23 +199,100 @@ class Booking(models.Model):
     status = models.CharField(max_length=10, choices=BOOKING_STATUS, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Per-user listing in keyset pagination order
+            models.Index(fields=['user', 'created_at', 'booking_id'], name='booking_user_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.start_date >= self.end_date:
             raise ValidationError("End date must be after start date.")
 
-        num_days = (self.end_date - self.start_date).days
-        self.total_price = num_days * self.property.pricepernight
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # Lock only this property's row: concurrent bookings for the same
+            # property queue here, bookings for other properties don't wait.
+            prop = Property.objects.select_for_update().only('pricepernight', 'discount').get(pk=self.property_id)
+            self.total_price = quote_stay(prop, self.start_date, self.end_date)["total"]
+
+            if self.status in ACTIVE_BOOKING_STATUSES and not is_available(
+                self.property_id, self.start_date, self.end_date, exclude_booking=self.pk
+            ):
+                raise BookingUnavailable()
+            try:
+                # The unique (property, night) constraint is the backstop for
+                # writers that bypass the lock (e.g. raw bulk inserts).
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                    sync_booked_nights(self)
+            except IntegrityError:
+                raise BookingUnavailable()
 
     def __str__(self):
         return f"Booking {self.booking_id} by {self.user.email} for {self.property.name} ({self.status}) total Ksh {self.total_price}"
 
+
+class PropertyCategory(models.Model):
+    """Normalized copy of Property.category, one row per category, for indexed filtering."""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='category_index')
+    name = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'name'], name='unique_property_category'),
+        ]
+        indexes = [
+            models.Index(fields=['name', 'property'], name='propertycategory_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id}: {self.name}"
+
+
+class SearchTerm(models.Model):
+    """Inverted index over Property.name and Property.description."""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'term'], name='unique_property_term'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'property'], name='searchterm_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.property_id}"
+
+
+class BookedNight(models.Model):
+    """
+    Occupancy index: one row per night a property is held by an active booking.
+    Maintained by Booking.save and removed with the booking.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='booked_nights')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='booked_nights')
+    night = models.DateField()
+
+    class Meta:
+        constraints = [
+            # A night can be held by one booking only; also serves (property, night) lookups
+            models.UniqueConstraint(fields=['property', 'night'], name='unique_property_night'),
+        ]
+        indexes = [
+            models.Index(fields=['night', 'property'], name='bookednight_night_prop_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} booked on {self.night}"
+
 class Payment(models.Model):
     payment_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_index=True)
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_date = models.DateTimeField(auto_now_add=True)
-    transaction_id = models.CharField(max_length=100, blank=True, null=True)
+    transaction_id = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     status = models.CharField(max_length=20, default='Pending')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='credit_card')
 
@@ -130,6 +305,21 @@ class Payment(models.Model):
     def __str__(self):
         return f"{self.booking.booking_id} - {self.status} - (Ksh {self.amount})"
 
+class PaymentEvent(models.Model):
+    """
+    A Chapa webhook delivery, stored once per event_key so redeliveries
+    are recognised with a single unique-index lookup.
+    """
+    event_key = models.CharField(max_length=150, unique=True)
+    tx_ref = models.CharField(max_length=100, db_index=True)
+    event = models.CharField(max_length=50, blank=True)
+    status = models.CharField(max_length=20, blank=True)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_key} ({self.status})"
+
 class Review(models.Model):
     review_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_index=True)
     property = models.ForeignKey(Property, on_delete=models.CASCADE)
@@ -138,11 +328,71 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Per-property listing in keyset pagination order
+            models.Index(fields=['property', 'created_at', 'review_id'], name='review_property_created_idx'),
+        ]
+
     def clean(self):
         from django.core.exceptions import ValidationError
         if not (1 <= self.rating <= 5):
             raise ValidationError("Rating must be between 1 and 5")
 
+    def save(self, *args, **kwargs):
+        if not (1 <= self.rating <= 5):
+            raise ValidationError("Rating must be between 1 and 5")
+
+        with transaction.atomic():
+            if self._state.adding:
+                changes = [(self.rating, 1)]
+            else:
+                old_rating = Review.objects.filter(pk=self.pk).values_list('rating', flat=True).first()
+                changes = [(old_rating, -1), (self.rating, 1)] if old_rating != self.rating else []
+            super().save(*args, **kwargs)
+            self._apply_to_property(changes)
+
+    def _apply_to_property(self, changes):
+        changes = [(rating, delta) for rating, delta in changes if rating is not None]
+        if not changes:
+            return
+        # Lock the property row so concurrent reviews don't lose updates
+        prop = Property.objects.select_for_update().only(*Property.REVIEW_STATS_FIELDS).get(
+            pk=self.property_id
+        )
+        for rating, delta in changes:
+            prop.add_review_rating(rating, delta)
+        prop.save(update_fields=Property.REVIEW_STATS_FIELDS)
+
+EMAIL_STATUS = [('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')]
+
+class EmailNotification(models.Model):
+    """
+    Outbound email waiting for the batch dispatcher (see notifications.py).
+    dedupe_key is unique per recipient, kind and source event, so a replayed
+    event doesn't send the email twice. Sent and failed rows are pruned after
+    EMAIL_RETENTION.
+    """
+    recipient = models.EmailField()
+    kind = models.CharField(max_length=50)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    dedupe_key = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=10, choices=EMAIL_STATUS, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='email_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.recipient} ({self.status})"
+
 class Message(models.Model):
     message_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_index=True)
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
@@ -0,0 +1,190 @@
+# listings/notifications.py
+import hashlib
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailNotification
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_SCHEDULED_KEY = "emails:dispatch-scheduled"
+
+
+def dedupe_key(recipient, kind, event):
+    text = "\x1f".join([recipient.strip().lower(), kind, str(event)])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def content_event(subject, body):
+    """
+    Stand-in event for emails that aren't about one: the message text plus
+    the EMAIL_DEDUPE_WINDOW it was queued in. Repeats within the window are
+    collapsed, the same text later on is sent again.
+    """
+    window = int(time.time() // settings.EMAIL_DEDUPE_WINDOW)
+    digest = hashlib.sha256("\x1f".join([subject, body]).encode()).hexdigest()
+    return f"{window}:{digest}"
+
+
+def queue_email(recipient, subject, body, kind, event=None):
+    """
+    Store an email for the dispatcher and make sure a dispatch run is
+    scheduled. ``event`` names what the email is about (a booking id, a
+    tx_ref): each recipient gets one email of a kind per event, however often
+    the event is replayed. Returns False for such a duplicate.
+    """
+    if event is None:
+        event = content_event(subject, body)
+    try:
+        with transaction.atomic():
+            EmailNotification.objects.create(
+                recipient=recipient,
+                kind=kind,
+                subject=subject,
+                body=body,
+                dedupe_key=dedupe_key(recipient, kind, event),
+            )
+    except IntegrityError:
+        logger.info("Skipping duplicate %s email to %s", kind, recipient)
+        return False
+
+    transaction.on_commit(schedule_dispatch)
+    return True
+
+
+def schedule_dispatch(countdown=None):
+    """
+    Queue one dispatcher run for everything pending. The cache flag coalesces
+    bursts of notifications into a single run instead of one task each.
+    """
+    from .tasks import dispatch_pending_emails
+
+    countdown = settings.EMAIL_DISPATCH_DELAY if countdown is None else countdown
+    if cache.add(DISPATCH_SCHEDULED_KEY, 1, timeout=countdown + 60):
+        try:
+            dispatch_pending_emails.apply_async(countdown=countdown)
+        except Exception:
+            cache.delete(DISPATCH_SCHEDULED_KEY)
+            logger.exception("Failed to schedule the email dispatcher")
+
+
+class RateLimiter:
+    """Space calls evenly so no more than ``rate`` happen per second (0 = unlimited)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+def claim_batch(batch_size, exclude=()):
+    """
+    Mark up to ``batch_size`` queued rows as sending and return them. The row
+    locks are only held for this short transaction, not while the messages go
+    out; rows a dispatcher left in sending (it died mid-batch) can be claimed
+    again after EMAIL_DISPATCH_CLAIM_TIMEOUT seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.EMAIL_DISPATCH_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        batch = list(
+            EmailNotification.objects.select_for_update(skip_locked=True)
+            .filter(Q(status="pending") | Q(status="sending", claimed_at__lt=stale))
+            .exclude(pk__in=exclude)
+            .order_by("created_at")[:batch_size]
+        )
+        for notification in batch:
+            notification.status = "sending"
+            notification.claimed_at = now
+        EmailNotification.objects.bulk_update(batch, ["status", "claimed_at"])
+    return batch
+
+
+def dispatch_pending(batch_size=None, rate=None, max_batches=None, connection=None):
+    """
+    Send pending notifications over one SMTP connection, ``batch_size`` rows
+    at a time, at most ``rate`` messages per second. Each batch is claimed
+    first (see claim_batch), so several dispatchers can drain the queue side
+    by side and none holds row locks while it sends or waits on the rate
+    limit. Returns the number of messages sent.
+    """
+    batch_size = batch_size or settings.EMAIL_DISPATCH_BATCH_SIZE
+    rate = settings.EMAIL_DISPATCH_RATE if rate is None else rate
+    max_attempts = settings.EMAIL_DISPATCH_MAX_ATTEMPTS
+    limiter = RateLimiter(rate)
+
+    # Let new notifications schedule a follow-up run while this one works
+    cache.delete(DISPATCH_SCHEDULED_KEY)
+
+    connection = connection or get_connection(fail_silently=False)
+    sent = 0
+    batches = 0
+    failed_ids = set()  # retried by a later run, not again in this one
+    try:
+        connection.open()
+        while max_batches is None or batches < max_batches:
+            batch = claim_batch(batch_size, exclude=failed_ids)
+            if not batch:
+                break
+            batches += 1
+
+            connection_lost = False
+            for notification in batch:
+                # Anything not reached below goes back in the queue as it was
+                notification.status = "pending"
+            for notification in batch:
+                limiter.wait()
+                message = EmailMessage(
+                    subject=notification.subject,
+                    body=notification.body,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[notification.recipient],
+                    connection=connection,
+                )
+                notification.attempts += 1
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    failed_ids.add(notification.pk)
+                    notification.last_error = str(e)[:1000]
+                    if notification.attempts >= max_attempts:
+                        notification.status = "failed"
+                    logger.warning("Email %s to %s failed: %s",
+                                   notification.kind, notification.recipient, e)
+                    # The failure may have taken the connection down
+                    try:
+                        connection.close()
+                        connection.open()
+                    except Exception:
+                        logger.exception("Lost the SMTP connection; stopping this dispatch run")
+                        connection_lost = True
+                        break
+                    continue
+                notification.status = "sent"
+                notification.sent_at = timezone.now()
+                sent += 1
+
+            EmailNotification.objects.bulk_update(
+                batch, ["status", "attempts", "last_error", "sent_at"]
+            )
+            if connection_lost:
+                break
+    finally:
+        connection.close()
+    return sent
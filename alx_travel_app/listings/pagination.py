@@ -0,0 +1,212 @@
+# listings/pagination.py
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        # Keep full microsecond precision so ties are never skipped.
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset (seek) pagination over a composite ordering.
+
+    Unlike DRF's CursorPagination, which only remembers the first ordering
+    field plus an offset, the cursor here carries the value of every
+    ordering field of the boundary row. Each page is then a plain
+    ``WHERE (a, b) > (x, y) ORDER BY a, b LIMIT n`` so page N costs the
+    same as page 1 and no COUNT(*) is ever issued.
+
+    The last ordering field must be unique (usually ``pk``) and none of
+    the fields may be nullable.
+    """
+
+    ordering = ("-created_at", "-pk")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    # Optional alternative orderings selectable with ?ordering=<key>.
+    # Each must also end in a unique field and should have a matching index.
+    ordering_param = "ordering"
+    orderings = {}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor.reverse if self.cursor else False
+        order = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*order)
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self._seek_filter(order, self.cursor.position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        key = request.query_params.get(self.ordering_param)
+        if key in self.orderings:
+            return tuple(self.orderings[key])
+        return tuple(self.ordering)
+
+    def _seek_filter(self, ordering, position):
+        """
+        Build ``(f1, f2, ...) > (v1, v2, ...)`` respecting each field's direction.
+
+        The leading ``f1 >= v1`` conjunct is redundant but lets MySQL turn
+        the OR chain into a range scan on the leading index column.
+        """
+        if len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        seek = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            seek |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+
+        first = ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": position[0]}) & seek
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            # An empty reverse page: keep paging forward from where we were.
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            payload = json.loads(urlsafe_b64decode(padded.encode("ascii")))
+            reverse = bool(payload["r"])
+            position = list(payload["p"])
+            ordering = payload["o"]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor is only meaningful for the ordering it was issued under.
+        if ordering != ",".join(self.ordering) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=self._coerce_position(position))
+
+    def _coerce_position(self, position):
+        """
+        Convert each cursor value to its field's Python type, so a tampered
+        cursor is a 404 here rather than a ValidationError (500) in the query.
+        """
+        coerced = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            try:
+                if value is None:
+                    raise ValueError("ordering fields are not nullable")
+                try:
+                    model_field = self.model._meta.pk if name == "pk" else self.model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    # An annotation such as distance
+                    coerced.append(float(value))
+                    continue
+                coerced.append(model_field.to_python(value))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return coerced
+
+    def encode_cursor(self, cursor):
+        payload = json.dumps(
+            {"o": ",".join(self.ordering), "r": int(cursor.reverse), "p": cursor.position},
+            default=_encode_value,
+            separators=(",", ":"),
+        )
+        encoded = urlsafe_b64encode(payload.encode("ascii")).decode("ascii").rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                position.append(instance[name])
+            else:
+                position.append(getattr(instance, name))
+        return position
+
+
+def _reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+
+
+class PropertyPagination(KeysetPagination):
+    ordering = ("created_at", "pk")
+    orderings = {
+        "rating": ("rating", "created_at", "pk"),
+        "-rating": ("-rating", "-created_at", "-pk"),
+        "review_count": ("review_count", "created_at", "pk"),
+        "-review_count": ("-review_count", "-created_at", "-pk"),
+        # Only with ?lat=&lng=, which annotate distance (filters.filter_properties)
+        "distance": ("distance", "pk"),
+    }
+
+
+class BookingPagination(KeysetPagination):
+    ordering = ("created_at", "pk")
+
+
+class ReviewPagination(KeysetPagination):
+    ordering = ("-created_at", "-pk")
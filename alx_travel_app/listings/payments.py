@@ -0,0 +1,181 @@
+# listings/payments.py
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import Booking, Payment, PaymentEvent
+from .tasks import send_payment_confirmation_email
+
+logger = logging.getLogger(__name__)
+
+# Payment.status values
+PAYMENT_PENDING = "Pending"
+PAYMENT_COMPLETED = "Completed"
+PAYMENT_FAILED = "Failed"
+
+
+def booking_id_from_tx_ref(tx_ref):
+    return tx_ref.replace("chapa-", "")
+
+
+def get_or_create_payment(tx_ref):
+    """
+    Return the Payment for ``tx_ref``, creating a pending one from the
+    booking encoded in the reference if initiation never stored it.
+    Returns ``None`` when neither exists.
+    """
+    try:
+        return Payment.objects.select_related("booking__property", "booking__user").get(
+            transaction_id=tx_ref
+        )
+    except Payment.DoesNotExist:
+        pass
+
+    try:
+        booking = Booking.objects.select_related("property", "user").get(
+            booking_id=booking_id_from_tx_ref(tx_ref)
+        )
+    except (Booking.DoesNotExist, ValidationError):
+        # ValidationError: the reference doesn't embed a valid booking UUID
+        return None
+
+    logger.info("Creating fallback payment record for %s", tx_ref)
+    return Payment.objects.create(
+        booking=booking,
+        amount=booking.total_price,
+        transaction_id=tx_ref,
+        status=PAYMENT_PENDING,
+    )
+
+
+async def aget_or_create_payment(tx_ref):
+    """``get_or_create_payment`` for async views."""
+    try:
+        return await Payment.objects.select_related("booking__property", "booking__user").aget(
+            transaction_id=tx_ref
+        )
+    except Payment.DoesNotExist:
+        pass
+
+    try:
+        booking = await Booking.objects.select_related("property", "user").aget(
+            booking_id=booking_id_from_tx_ref(tx_ref)
+        )
+    except (Booking.DoesNotExist, ValidationError):
+        return None
+
+    logger.info("Creating fallback payment record for %s", tx_ref)
+    return await Payment.objects.acreate(
+        booking=booking,
+        amount=booking.total_price,
+        transaction_id=tx_ref,
+        status=PAYMENT_PENDING,
+    )
+
+
+# Settled payments never move again: a late "failed" webhook must not undo a
+# completed payment, nor a stray "success" revive a failed one.
+PAYMENT_TRANSITIONS = {
+    PAYMENT_PENDING: {PAYMENT_COMPLETED, PAYMENT_FAILED},
+}
+
+
+def apply_payment_status(payment, new_status):
+    """
+    Move a payment to ``new_status`` and run the side effects of that
+    transition exactly once: a completed payment confirms its booking and
+    queues the confirmation email after commit. Only the transitions in
+    PAYMENT_TRANSITIONS are applied; anything else is a no-op. Returns
+    True if the status changed.
+    """
+    with transaction.atomic():
+        # Re-read under lock so concurrent verifications can't both "complete" it
+        current = Payment.objects.select_for_update().only("status").get(pk=payment.pk)
+        payment.status = current.status
+        if new_status not in PAYMENT_TRANSITIONS.get(current.status, ()):
+            if new_status != current.status:
+                logger.warning(
+                    "Ignoring %s -> %s for payment %s", current.status, new_status, payment.transaction_id
+                )
+            return False
+        payment.status = new_status
+        payment.save(update_fields=["status"])
+
+        if new_status == PAYMENT_COMPLETED:
+            Booking.objects.filter(pk=payment.booking_id).update(status="confirmed")
+            transaction.on_commit(lambda: _queue_confirmation_email(payment))
+    return True
+
+
+def _queue_confirmation_email(payment):
+    booking = payment.booking
+    try:
+        send_payment_confirmation_email.delay(
+            to_email=booking.user.email,
+            property_name=booking.property.name,
+            start_date=str(booking.start_date),
+            end_date=str(booking.end_date),
+            amount=str(payment.amount),
+            tx_ref=payment.transaction_id,
+        )
+    except Exception:
+        logger.exception("Failed to queue confirmation email for %s", payment.transaction_id)
+
+
+# Chapa webhook status -> Payment.status
+WEBHOOK_STATUSES = {
+    "success": PAYMENT_COMPLETED,
+    "failed": PAYMENT_FAILED,
+    "cancelled": PAYMENT_FAILED,
+}
+
+
+def webhook_event_key(payload):
+    """
+    Idempotency key of a webhook delivery, or ``None`` when the payload
+    carries no reference to key it on.
+    """
+    reference = payload.get("reference") or payload.get("tx_ref")
+    if not reference:
+        return None
+    event = payload.get("event") or payload.get("type") or "charge"
+    return f"{event}:{reference}"[:150]
+
+
+def process_webhook_event(payload):
+    """
+    Record a verified webhook delivery and apply it to its Payment.
+
+    Returns ``"invalid"`` when the payload has no reference, ``"duplicate"``
+    for an already-recorded event, ``"unknown"`` when no payment or booking
+    matches ``tx_ref``, otherwise ``"processed"``. No outbound calls are made.
+    """
+    key = webhook_event_key(payload)
+    if key is None:
+        return "invalid"
+    if PaymentEvent.objects.filter(event_key=key).exists():
+        return "duplicate"
+
+    tx_ref = payload.get("tx_ref") or ""
+    chapa_status = str(payload.get("status") or "").lower()
+
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(
+                event_key=key,
+                tx_ref=tx_ref,
+                event=str(payload.get("event") or "")[:50],
+                status=chapa_status[:20],
+                payload=payload,
+            )
+            payment = get_or_create_payment(tx_ref) if tx_ref else None
+            if payment is None:
+                return "unknown"
+            new_status = WEBHOOK_STATUSES.get(chapa_status)
+            if new_status:
+                apply_payment_status(payment, new_status)
+    except IntegrityError:
+        # A concurrent delivery of the same event won the insert
+        return "duplicate"
+    return "processed"
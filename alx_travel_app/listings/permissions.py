@@ -21,7 +21,7 @@ class IsOwnerOrReadOnly(BasePermission):
             return True
 
         # Only allow edit/delete if the user is the owner
-        return obj.host == request.user
+        return obj.host_id == request.user.pk
 
 
 class IsHostOwnerOrReadOnly(BasePermission):
@@ -45,7 +45,7 @@ class IsHostOwnerOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return True
-        return obj.host == request.user
+        return obj.host_id == request.user.pk
 
 
 class IsBookingOwner(BasePermission):
@@ -54,4 +54,4 @@ class IsBookingOwner(BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
\ No newline at end of file
+        return obj.user_id == request.user.pk
\ No newline at end of file
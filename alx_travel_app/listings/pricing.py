@@ -0,0 +1,171 @@
+# listings/pricing.py
+import logging
+import re
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Friday and Saturday nights
+WEEKEND_NIGHTS = (4, 5)
+NAMED_STAYS = {"weekly": 7, "monthly": 28}
+BASIS_POINTS = 10000
+
+PERCENT_RE = re.compile(r"^(\d{1,3}(?:\.\d{1,2})?)\s*%\s*(?:off\b)?\s*(.*)$")
+AMOUNT_RE = re.compile(r"^(?:(?:kes|ksh|etb)\.?\s*)?(\d+(?:\.\d{1,2})?)\s*(?:kes|ksh|etb)?\s*off\b\s*(.*)$")
+NIGHTS_RE = re.compile(r"^(\d+)\s*\+\s*nights?$")
+
+
+class Discount:
+    """
+    Structured form of ``Property.discount``. The text is a list of rules
+    separated by ``;`` or ``,``:
+
+    - ``10%`` / ``10% off``: every night
+    - ``15% weekly``, ``25% monthly``, ``10% off 3+ nights``: stays of at
+      least 7, 28 or N nights
+    - ``20% off weekends`` / ``weekdays``: Friday and Saturday nights, or
+      the others
+    - ``KES 500 off``, optionally with a stay length (``1000 off weekly``):
+      a flat amount off the total
+
+    Rules don't stack: each night gets the best percentage that applies,
+    and the best flat amount that applies comes off the total. Percentages
+    are kept in basis points and amounts in cents.
+    """
+
+    def __init__(self):
+        self.stay_tiers = []  # (min_nights, basis points)
+        self.weekend_bp = 0
+        self.weekday_bp = 0
+        self.amount_tiers = []  # (min_nights, cents)
+
+    def stay_bp(self, nights):
+        return max((bp for min_nights, bp in self.stay_tiers if nights >= min_nights), default=0)
+
+    def amount_cents(self, nights):
+        return max((cents for min_nights, cents in self.amount_tiers if nights >= min_nights), default=0)
+
+
+def _min_nights(scope, rule):
+    if not scope:
+        return 1
+    if scope in NAMED_STAYS:
+        return NAMED_STAYS[scope]
+    match = NIGHTS_RE.match(scope)
+    if match:
+        return max(1, int(match.group(1)))
+    raise ValidationError(f"Unrecognised discount rule: {rule!r}")
+
+
+def parse_discount(text):
+    """Parse a discount string into a Discount; raises ValidationError on bad input."""
+    discount = Discount()
+    for rule in re.split(r"[;,]", (text or "").lower()):
+        rule = " ".join(rule.split())
+        if not rule:
+            continue
+        match = PERCENT_RE.match(rule)
+        if match:
+            bp = int(Decimal(match.group(1)) * 100)
+            if bp > BASIS_POINTS:
+                raise ValidationError(f"Discount above 100%: {rule!r}")
+            scope = re.sub(r"^(?:for|on)\s+", "", match.group(2))
+            if scope in ("weekend", "weekends"):
+                discount.weekend_bp = max(discount.weekend_bp, bp)
+            elif scope in ("weekday", "weekdays"):
+                discount.weekday_bp = max(discount.weekday_bp, bp)
+            else:
+                discount.stay_tiers.append((_min_nights(scope, rule), bp))
+            continue
+        match = AMOUNT_RE.match(rule)
+        if match:
+            cents = int(Decimal(match.group(1)) * 100)
+            scope = re.sub(r"^(?:for|on)\s+", "", match.group(2))
+            discount.amount_tiers.append((_min_nights(scope, rule), cents))
+            continue
+        raise ValidationError(f"Unrecognised discount rule: {rule!r}")
+    return discount
+
+
+@lru_cache(maxsize=1024)
+def compiled_discount(text):
+    """
+    Cached parse for pricing. Strings saved before rules were validated may
+    not parse; those price as if there were no discount.
+    """
+    try:
+        return parse_discount(text)
+    except ValidationError:
+        logger.warning("Ignoring unparseable discount %r", text)
+        return Discount()
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return (Decimal(int(cents)) / 100).quantize(Decimal("0.01"))
+
+
+def quote_properties(properties, check_in, check_out):
+    """
+    Quote one stay for many properties in a single vectorized pass.
+
+    ``properties`` are objects with ``pk``, ``pricepernight`` and
+    ``discount``. Nights only differ by weekend/weekday, so each property
+    needs two discounted night prices and the counts of each kind. Returns
+    ``{pk: quote}`` where a quote is::
+
+        {"check_in": ..., "check_out": ..., "nights": 3, "currency": "ETB",
+         "subtotal": Decimal, "discount": Decimal, "total": Decimal}
+    """
+    properties = list(properties)
+    nights = (check_out - check_in).days
+    if not properties or nights <= 0:
+        return {}
+
+    # Every full week holds two weekend nights; count the rest one by one
+    weekend_nights = len(WEEKEND_NIGHTS) * (nights // 7) + sum(
+        (check_in + timedelta(days=offset)).weekday() in WEEKEND_NIGHTS
+        for offset in range(nights - nights % 7, nights)
+    )
+    weekday_nights = nights - weekend_nights
+
+    rules = [compiled_discount(prop.discount or "") for prop in properties]
+    price = np.fromiter((to_cents(prop.pricepernight) for prop in properties), dtype=np.int64, count=len(rules))
+    stay_bp = np.fromiter((rule.stay_bp(nights) for rule in rules), dtype=np.int64, count=len(rules))
+    weekend_bp = np.maximum(stay_bp, np.fromiter((r.weekend_bp for r in rules), dtype=np.int64, count=len(rules)))
+    weekday_bp = np.maximum(stay_bp, np.fromiter((r.weekday_bp for r in rules), dtype=np.int64, count=len(rules)))
+    amount = np.fromiter((rule.amount_cents(nights) for rule in rules), dtype=np.int64, count=len(rules))
+
+    # Per-night prices rounded half up to the cent
+    half = BASIS_POINTS // 2
+    weekend_price = (price * (BASIS_POINTS - weekend_bp) + half) // BASIS_POINTS
+    weekday_price = (price * (BASIS_POINTS - weekday_bp) + half) // BASIS_POINTS
+    subtotal = price * nights
+    total = np.maximum(weekend_price * weekend_nights + weekday_price * weekday_nights - amount, 0)
+
+    return {
+        prop.pk: {
+            "check_in": check_in,
+            "check_out": check_out,
+            "nights": nights,
+            "currency": settings.DEFAULT_CURRENCY,
+            "subtotal": from_cents(sub),
+            "discount": from_cents(sub - tot),
+            "total": from_cents(tot),
+        }
+        for prop, sub, tot in zip(properties, subtotal.tolist(), total.tolist())
+    }
+
+
+def quote_stay(prop, check_in, check_out):
+    """Quote for a single property; the same arithmetic as the batch path."""
+    return quote_properties([prop], check_in, check_out)[prop.pk]
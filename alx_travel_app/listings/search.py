@@ -0,0 +1,86 @@
+# listings/search.py
+import re
+import unicodedata
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERM_LENGTH = 64
+MIN_TERM_LENGTH = 2
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "to", "with",
+})
+
+
+def normalize(text):
+    """Lowercase and strip accents so 'Café' and 'cafe' index the same."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text):
+    """Split text into distinct search terms, preserving first-seen order."""
+    terms = []
+    seen = set()
+    for token in TOKEN_RE.findall(normalize(text)):
+        token = token[:MAX_TERM_LENGTH]
+        if len(token) < MIN_TERM_LENGTH or token in STOP_WORDS or token in seen:
+            continue
+        seen.add(token)
+        terms.append(token)
+    return terms
+
+
+def normalize_categories(categories):
+    if not isinstance(categories, (list, tuple)):
+        return set()
+    return {normalize(str(c)).strip()[:50] for c in categories if str(c).strip()}
+
+
+def index_property(prop):
+    """
+    Sync the inverted index (SearchTerm) and category index (PropertyCategory)
+    for one property. Only changed rows are written.
+    """
+    from .models import PropertyCategory, SearchTerm
+
+    wanted_terms = set(tokenize(f"{prop.name} {prop.description}"))
+    current_terms = set(SearchTerm.objects.filter(property=prop).values_list("term", flat=True))
+    if current_terms - wanted_terms:
+        SearchTerm.objects.filter(property=prop, term__in=current_terms - wanted_terms).delete()
+    if wanted_terms - current_terms:
+        SearchTerm.objects.bulk_create(
+            [SearchTerm(property=prop, term=term) for term in sorted(wanted_terms - current_terms)]
+        )
+
+    wanted_categories = normalize_categories(prop.category)
+    current_categories = set(
+        PropertyCategory.objects.filter(property=prop).values_list("name", flat=True)
+    )
+    if current_categories - wanted_categories:
+        PropertyCategory.objects.filter(
+            property=prop, name__in=current_categories - wanted_categories
+        ).delete()
+    if wanted_categories - current_categories:
+        PropertyCategory.objects.bulk_create([
+            PropertyCategory(property=prop, name=name)
+            for name in sorted(wanted_categories - current_categories)
+        ])
+
+
+def filter_text(queryset, query):
+    """
+    Restrict a Property queryset to listings matching every term in ``query``.
+
+    Each term is an indexed equality lookup on SearchTerm; the last term is
+    matched as a prefix (still an index range scan) to support type-ahead.
+    """
+    from .models import SearchTerm
+
+    terms = tokenize(query)
+    for i, term in enumerate(terms):
+        if i == len(terms) - 1:
+            matches = SearchTerm.objects.filter(term__startswith=term)
+        else:
+            matches = SearchTerm.objects.filter(term=term)
+        queryset = queryset.filter(property_id__in=matches.values("property_id"))
+    return queryset
@@ -3,6 +3,12 @@ from rest_framework import serializers
 from .models import Property, Booking, Payment, User, Review
 from django.contrib.auth import get_user_model
 from rest_framework.validators import UniqueValidator
+from .availability import ACTIVE_BOOKING_STATUSES, is_available, stay_length_error
+from .exceptions import BookingConflict
+from .images import srcset
+from .pricing import parse_discount
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 
 User = get_user_model()
 
@@ -37,9 +43,44 @@ class RegisterSerializer(serializers.ModelSerializer):
 #         model = Property
 #         fields = '__all__'
 #         read_only_fields = ['host']
+class QuoteSerializer(serializers.Serializer):
+    # Room for MAX_STAY_NIGHTS (up to a few thousand) at the highest nightly price
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    nights = serializers.IntegerField()
+    currency = serializers.CharField()
+    subtotal = serializers.DecimalField(max_digits=16, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=16, decimal_places=2)
+    total = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class QuoteBatchSerializer(serializers.Serializer):
+    """Body of POST /api/properties/quotes/."""
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    properties = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate_properties(self, value):
+        if len(value) > settings.PRICING_QUOTE_BATCH_MAX:
+            raise serializers.ValidationError(f"At most {settings.PRICING_QUOTE_BATCH_MAX} properties per request.")
+        return value
+
+    def validate(self, attrs):
+        if attrs['check_in'] >= attrs['check_out']:
+            raise serializers.ValidationError("check_out must be after check_in.")
+        error = stay_length_error(attrs['check_in'], attrs['check_out'])
+        if error:
+            raise serializers.ValidationError(error)
+        return attrs
+
+
 class PropertySerializer(serializers.ModelSerializer):
     address = serializers.SerializerMethodField()
     offers = serializers.SerializerMethodField()
+    rating_histogram = serializers.ReadOnlyField()
+    image_srcset = serializers.SerializerMethodField()
+    distance = serializers.SerializerMethodField()
+    quote = serializers.SerializerMethodField()
 
     class Meta:
         model = Property
@@ -47,13 +88,21 @@ class PropertySerializer(serializers.ModelSerializer):
             "property_id",
             "name",
             "address",
+            "latitude",
+            "longitude",
+            "distance",
             "rating",
+            "review_count",
+            "rating_histogram",
             "category",
             "pricepernight",
             "offers",
             "image",
+            "image_srcset",
             "discount",
+            "quote",
         ]
+        read_only_fields = ["rating", "review_count"]
 
     def get_address(self, obj):
         return {
@@ -69,6 +118,33 @@ class PropertySerializer(serializers.ModelSerializer):
             "occupants": obj.occupants,
         }
 
+    def get_image_srcset(self, obj):
+        # Resized WebP/JPEG copies by width; empty until they've been generated
+        return srcset(obj.image_variants)
+
+    def get_distance(self, obj):
+        # Kilometres from ?lat=&lng=; only set on radius searches
+        return getattr(obj, "distance", None)
+
+    def get_quote(self, obj):
+        # Set by PropertyViewSet on list pages requested with check_in/check_out
+        quote = getattr(obj, "quote", None)
+        return QuoteSerializer(quote).data if quote else None
+
+    def validate_discount(self, value):
+        try:
+            parse_discount(value)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return value
+
+    def validate(self, attrs):
+        latitude = attrs.get("latitude", getattr(self.instance, "latitude", None))
+        longitude = attrs.get("longitude", getattr(self.instance, "longitude", None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("latitude and longitude must be set together.")
+        return attrs
+
 # class BookingSerializer(serializers.ModelSerializer):
 #     user = serializers.ReadOnlyField(source='user.id')
 
@@ -78,7 +154,7 @@ class PropertySerializer(serializers.ModelSerializer):
 #         read_only_fields = ['user', 'total_price', 'status']
 
 class BookingSerializer(serializers.ModelSerializer):
-    user = serializers.ReadOnlyField(source='user.user_id')
+    user = serializers.ReadOnlyField(source='user_id')
     property_name = serializers.ReadOnlyField(source='property.name')
     property_price = serializers.ReadOnlyField(source='property.pricepernight')
 
@@ -98,6 +174,44 @@ class BookingSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['user', 'total_price', 'status', 'created_at']
 
+    def validate(self, attrs):
+        prop = attrs.get('property', getattr(self.instance, 'property', None))
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+
+        if start_date and end_date:
+            if start_date >= end_date:
+                raise serializers.ValidationError("End date must be after start date.")
+            error = stay_length_error(start_date, end_date)
+            if error:
+                raise serializers.ValidationError(error)
+
+        booking_status = getattr(self.instance, 'status', 'pending')
+        if booking_status in ACTIVE_BOOKING_STATUSES and not is_available(
+            prop.pk, start_date, end_date,
+            exclude_booking=getattr(self.instance, 'pk', None),
+        ):
+            raise BookingConflict()
+        return attrs
+
+
+class BookingBatchItemSerializer(serializers.Serializer):
+    """
+    One entry of a batch booking request. The property is kept as a bare
+    UUID so a whole batch resolves its properties in a single query.
+    """
+    property = serializers.UUIDField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['start_date'] >= attrs['end_date']:
+            raise serializers.ValidationError("End date must be after start date.")
+        error = stay_length_error(attrs['start_date'], attrs['end_date'])
+        if error:
+            raise serializers.ValidationError(error)
+        return attrs
+
 
 # class BookingSerializer(serializers.ModelSerializer):
 #     user = serializers.PrimaryKeyRelatedField(
@@ -120,6 +234,7 @@ class InitiatePaymentSerializer(serializers.Serializer):
 class ReviewSerializer(serializers.ModelSerializer):
     name = serializers.CharField(source="user.first_name", read_only=True)
     avatar = serializers.SerializerMethodField()
+    avatar_srcset = serializers.SerializerMethodField()
     date = serializers.SerializerMethodField()
 
     class Meta:
@@ -129,15 +244,24 @@ class ReviewSerializer(serializers.ModelSerializer):
             "property",
             "name",
             "avatar",
+            "avatar_srcset",
             "rating",
             "comment",
             "date",
         ]
 
+    def validate_rating(self, value):
+        if not (1 <= value <= 5):
+            raise serializers.ValidationError("Rating must be between 1 and 5")
+        return value
+
     def get_avatar(self, obj):
         if hasattr(obj.user, "avatar") and obj.user.avatar:
             return obj.user.avatar.url
         return "/static/defaults/avatar.png"
 
+    def get_avatar_srcset(self, obj):
+        return srcset(getattr(obj.user, "avatar_variants", None))
+
     def get_date(self, obj):
         return obj.created_at.strftime("%B %Y")
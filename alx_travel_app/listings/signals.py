@@ -0,0 +1,66 @@
+# listings/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_changed
+from .availability import ACTIVE_BOOKING_STATUSES, stay_nights
+from .cache import invalidate_property
+from .calendar import calendar_changed
+from .images import schedule_variants
+from .models import Booking, Property, Review, User
+
+
+@receiver([post_save, post_delete], sender=Property)
+def property_changed(sender, instance, **kwargs):
+    invalidate_property(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=Booking)
+def property_child_changed(sender, instance, **kwargs):
+    invalidate_property(instance.property_id)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, origin=None, **kwargs):
+    # Runs for review.delete(), queryset deletes and cascades from a deleted
+    # user alike. A property being deleted takes its aggregates with it.
+    if isinstance(origin, Property) or getattr(origin, "model", None) is Property:
+        return
+    instance._apply_to_property([(instance.rating, -1)])
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    # Its BookedNight rows go with it (cascade), so free them in the calendar
+    if instance.status in ACTIVE_BOOKING_STATUSES:
+        calendar_changed(instance.property_id, freed=stay_nights(instance.start_date, instance.end_date))
+
+
+def image_field_saved(instance, field, update_fields):
+    # Partial saves (review stats, last_login) don't touch the image
+    if update_fields is not None and field not in update_fields:
+        return
+    if field in instance.get_deferred_fields():
+        return
+    schedule_variants(instance, field)
+
+
+@receiver(post_save, sender=Property)
+def property_image_saved(sender, instance, update_fields=None, **kwargs):
+    image_field_saved(instance, "image", update_fields)
+
+
+@receiver(post_save, sender=User)
+def user_avatar_saved(sender, instance, update_fields=None, **kwargs):
+    image_field_saved(instance, "avatar", update_fields)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    user_changed(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    user_changed(instance, deleted=True)
@@ -0,0 +1,111 @@
+# listings/smtp_stub.py
+import socketserver
+import threading
+import time
+
+
+class SMTPStubServer:
+    """
+    Minimal local SMTP sink for tests and benchmarks (plain SMTP, no TLS).
+
+    Accepts everything and keeps the recipients of each message in
+    ``messages``. ``connections`` counts TCP connections opened, and
+    ``connect_delay`` / ``message_delay`` (seconds) stand in for the TLS
+    handshake and per-message latency of a real provider.
+
+    Usage::
+
+        with SMTPStubServer(connect_delay=0.05) as stub:
+            connection = get_connection(
+                "django.core.mail.backends.smtp.EmailBackend",
+                host=stub.host, port=stub.port, use_tls=False,
+            )
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, connect_delay=0.0, message_delay=0.0):
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                with stub._lock:
+                    stub.connections += 1
+                if stub.connect_delay:
+                    time.sleep(stub.connect_delay)
+                self.reply("220 localhost SMTP stub")
+
+                recipients = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode("utf-8", "replace").strip()
+                    verb = command[:4].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250 localhost")
+                    elif verb == "MAIL":
+                        recipients = []
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        recipients.append(command.split(":", 1)[-1].strip().strip("<>"))
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        while True:
+                            data = self.rfile.readline()
+                            if not data:
+                                return
+                            if data.rstrip(b"\r\n") == b".":
+                                break
+                        if stub.message_delay:
+                            time.sleep(stub.message_delay)
+                        with stub._lock:
+                            stub.messages.append(recipients)
+                        self.reply("250 OK: queued")
+                    elif verb == "RSET":
+                        recipients = []
+                        self.reply("250 OK")
+                    elif verb == "NOOP":
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+        return Handler
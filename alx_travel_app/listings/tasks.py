@@ -1,37 +1,40 @@
 # listings/tasks.py
+import logging
+import random
+from datetime import timedelta
+
 from celery import shared_task
-from django.core.mail import send_mail
 from django.conf import settings
+from django.utils import timezone
+
+from .models import EmailNotification
+from .notifications import dispatch_pending, queue_email, schedule_dispatch
 
-@shared_task
-def send_email_task(recipient):
-    send_mail(
+logger = logging.getLogger(__name__)
+
+@shared_task(ignore_result=True)
+def send_email_task(recipient, booking_id=None):
+    queue_email(
+        recipient,
         subject="Booking Confirmed!",
-        message="Your payment was successful and your booking is confirmed.",
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[recipient],
-        fail_silently=False,
+        body="Your payment was successful and your booking is confirmed.",
+        kind="booking_confirmed",
+        event=booking_id,
     )
 
 
-@shared_task
-def send_booking_confirmation_email(to_email, property_name, start_date, end_date, total_price):
+@shared_task(ignore_result=True)
+def send_booking_confirmation_email(to_email, property_name, start_date, end_date, total_price, booking_id=None):
     subject = 'Booking Confirmation'
     message = (
         f"Your booking for {property_name} from {start_date} to {end_date} "
         f"has been submitted. Total Price: KES {total_price}."
     )
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [to_email],
-        fail_silently=False,
-    )
+    queue_email(to_email, subject, message, kind="booking_submitted", event=booking_id)
 
 
-@shared_task
-def send_payment_confirmation_email(to_email, property_name, start_date, end_date, amount):
+@shared_task(ignore_result=True)
+def send_payment_confirmation_email(to_email, property_name, start_date, end_date, amount, tx_ref=None):
     subject = 'Payment Confirmation Successful'
     message = (
         f"Dear Customer,\n\n"
@@ -41,11 +44,130 @@ def send_payment_confirmation_email(to_email, property_name, start_date, end_dat
         f"Thank you for booking with us!\n"
         f"— ALX Travel App Team"
     )
+    queue_email(to_email, subject, message, kind="payment_confirmed", event=tx_ref)
+
+
+@shared_task(ignore_result=True)
+def dispatch_pending_emails():
+    """Drain the notification queue over one SMTP connection."""
+    sent = dispatch_pending()
+    # Messages that failed this run stay pending; come back for them later
+    if EmailNotification.objects.filter(status="pending").exists():
+        schedule_dispatch(countdown=settings.EMAIL_DISPATCH_RETRY_DELAY)
+    return sent
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=settings.CHAPA_VERIFY_MAX_RETRIES)
+def verify_payment_task(self, tx_ref):
+    """
+    Confirm a payment with Chapa outside the request cycle.
+
+    While Chapa still reports the transaction as pending (or can't be
+    reached) the task re-schedules itself with exponential backoff plus
+    jitter; once retries are exhausted the payment is marked failed.
+    """
+    from .chapa import verify_payment
+    from .payments import (
+        PAYMENT_COMPLETED, PAYMENT_FAILED, PAYMENT_PENDING, apply_payment_status, get_or_create_payment,
+    )
+
+    payment = get_or_create_payment(tx_ref)
+    if payment is None:
+        logger.warning("verify_payment_task: no payment or booking for %s", tx_ref)
+        return None
+    if payment.status != PAYMENT_PENDING:
+        return payment.status
+
+    try:
+        chapa_response = verify_payment(tx_ref)
+        status_chapa = (chapa_response.get("data") or {}).get("status")
+    except Exception:
+        logger.exception("verify_payment_task: Chapa verify call failed for %s", tx_ref)
+        status_chapa = None
+
+    if status_chapa == "success":
+        apply_payment_status(payment, PAYMENT_COMPLETED)
+        return payment.status
+    if status_chapa == "failed":
+        apply_payment_status(payment, PAYMENT_FAILED)
+        return payment.status
+
+    if self.request.retries >= self.max_retries:
+        logger.warning("verify_payment_task: giving up on %s after %s attempts", tx_ref, self.request.retries + 1)
+        apply_payment_status(payment, PAYMENT_FAILED)
+        return payment.status
+
+    delay = min(
+        settings.CHAPA_VERIFY_BACKOFF * (2 ** self.request.retries),
+        settings.CHAPA_VERIFY_MAX_BACKOFF,
+    )
+    raise self.retry(countdown=delay + random.uniform(0, delay / 2))
+
+
+def _delete_in_chunks(queryset, order_by, batch_size):
+    """Delete ``queryset`` ``batch_size`` rows at a time; returns the number deleted."""
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by(order_by).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += queryset.model.objects.filter(pk__in=ids).delete()[0]
+
+
+@shared_task(ignore_result=True)
+def prune_task_results():
+    """
+    Delete stored task results older than CELERY_RESULT_RETENTION, a chunk
+    at a time so no single DELETE holds locks on a large range.
+    """
+    from django_celery_results.models import GroupResult, TaskResult
+
+    cutoff = timezone.now() - timedelta(seconds=settings.CELERY_RESULT_RETENTION)
+    deleted = 0
+    for model in (TaskResult, GroupResult):
+        deleted += _delete_in_chunks(
+            model.objects.filter(date_done__lt=cutoff), "date_done", settings.CELERY_RESULT_PRUNE_BATCH
+        )
+    if deleted:
+        logger.info("Pruned %s stored task results", deleted)
+    return deleted
+
+
+@shared_task(ignore_result=True)
+def prune_email_notifications():
+    """
+    Delete sent and failed notifications older than EMAIL_RETENTION, in
+    chunks like prune_task_results. Pending rows are kept however old.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.EMAIL_RETENTION)
+    deleted = _delete_in_chunks(
+        EmailNotification.objects.filter(status__in=("sent", "failed"), created_at__lt=cutoff),
+        "created_at",
+        settings.EMAIL_PRUNE_BATCH,
+    )
+    if deleted:
+        logger.info("Pruned %s email notifications", deleted)
+    return deleted
+
+
+@shared_task(ignore_result=True)
+def generate_image_variants(model_label, pk, field):
+    """Build resized WebP/JPEG copies of an uploaded image and record them on the row."""
+    from django.apps import apps
+
+    from .images import build_variants, needs_variants, save_variants, VARIANT_FIELDS
 
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [to_email],
-        fail_silently=False
-    )
\ No newline at end of file
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only(field, VARIANT_FIELDS[(model_label, field)]).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field)
+    if not needs_variants(field_file, getattr(instance, VARIANT_FIELDS[(model_label, field)])):
+        return
+    try:
+        variants = build_variants(field_file.name)
+    except (OSError, ValueError):
+        # Missing file or not an image Pillow can read; nothing to retry
+        logger.exception("Could not build image variants for %s %s", model_label, pk)
+        return
+    save_variants(model_label, pk, field, variants)
@@ -1,3 +1,1249 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from base64 import urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
 
-# Create your tests here.
+from alx_travel_app.celery import app as celery_app
+from alx_travel_app.workers import process_memory_kb, warm_process, warm_thread_pool
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .authentication import auth_cache, user_cache
+from .availability import BookingUnavailable
+from .chapa import AsyncChapaClient, ChapaClient, ChapaUnavailable, CircuitBreaker, _reset_client, webhook_signature
+from .chapa_stub import ChapaStubServer
+from .geo import encode as geohash_encode
+from .models import (
+    BookedNight, Booking, EmailNotification, Payment, PaymentEvent, Property, PropertyCategory, Review, SearchTerm,
+    User,
+)
+from .notifications import dispatch_pending, queue_email
+from .pricing import parse_discount, quote_stay
+from .serializers import PropertySerializer
+from .smtp_stub import SMTPStubServer
+from .tasks import (
+    generate_image_variants, prune_email_notifications, prune_task_results, send_payment_confirmation_email,
+    verify_payment_task,
+)
+from .views import AsyncInitiatePaymentView, AsyncSuccessPaymentView
+
+
+
+def setUpModule():
+    # Every request and task logs a JSON line through the root handlers; keep
+    # them out of the test output. Tests that check a record use assertLogs.
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    silent = logging.NullHandler()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(silent)
+
+    def restore():
+        root.removeHandler(silent)
+        for handler in handlers:
+            root.addHandler(handler)
+
+    unittest.addModuleCleanup(restore)
+
+
+@contextmanager
+def eager_tasks():
+    """Run Celery tasks in-process instead of publishing them, so no broker is needed."""
+    previous = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    try:
+        yield
+    finally:
+        celery_app.conf.task_always_eager = previous
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Each list endpoint must run a fixed number of SQL queries per page,
+    however many rows exist. A failure here usually means a serializer
+    started reading a relation the view's queryset doesn't eager-load.
+    """
+
+    SIZES = (10, 100, 1000)
+    PAGE_SIZE = 100  # the paginator's max, so a per-row query would show up
+
+    BUDGETS = {
+        "properties": 1,  # page
+        "bookings": 1,    # page joined with property
+        "reviews": 1,     # page joined with user
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        cls.guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        cls.reviewed = Property.objects.create(
+            host=cls.host, name="Reviewed", description="Reviewed place", pricepernight=Decimal("50.00")
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.rows = 0
+        cache.clear()
+
+    def grow_to(self, size):
+        """Add properties, bookings and reviews until each has ``size`` rows."""
+        count = size - self.rows
+        properties = Property.objects.bulk_create([
+            Property(host=self.host, name=f"Property {self.rows + i}", description="Generated",
+                     pricepernight=Decimal("100.00"))
+            for i in range(count)
+        ])
+        start = date(2030, 1, 1)
+        Booking.objects.bulk_create([
+            Booking(property=prop, user=self.guest, start_date=start, end_date=start + timedelta(days=2),
+                    total_price=Decimal("200.00"))
+            for prop in properties
+        ])
+        reviewers = User.objects.bulk_create([
+            User(email=f"reviewer{self.rows + i}@example.com", first_name="Reviewer", last_name=str(i),
+                 password="!")
+            for i in range(count)
+        ])
+        Review.objects.bulk_create([
+            Review(property=self.reviewed, user=reviewer, rating=4, comment="Nice")
+            for reviewer in reviewers
+        ])
+        self.rows = size
+
+    def assert_constant_queries(self, name, url, authenticate=None):
+        self.client.force_authenticate(user=authenticate)
+        for size in self.SIZES:
+            with self.subTest(endpoint=name, rows=size):
+                self.grow_to(size)
+                cache.clear()
+                with self.assertNumQueries(self.BUDGETS[name]):
+                    response = self.client.get(url, {"page_size": self.PAGE_SIZE})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data["results"]), min(size + (name == "properties"), self.PAGE_SIZE))
+
+    def test_property_list_query_budget(self):
+        self.assert_constant_queries("properties", "/api/properties/")
+
+    def test_booking_list_query_budget(self):
+        self.assert_constant_queries("bookings", "/api/bookings/", authenticate=self.guest)
+
+    def test_review_list_query_budget(self):
+        self.assert_constant_queries("reviews", f"/api/properties/{self.reviewed.pk}/reviews/")
+
+
+class AvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        cls.booked = Property.objects.create(host=host, name="Booked", description="x", pricepernight=Decimal("10.00"))
+        Property.objects.create(host=host, name="Free", description="x", pricepernight=Decimal("10.00"))
+
+    def setUp(self):
+        cache.clear()
+
+    def available(self, check_in, check_out):
+        response = self.client.get("/api/properties/", {"check_in": check_in, "check_out": check_out})
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row["name"] for row in response.json()["results"])
+
+    def test_stays_overlapping_an_active_booking_are_excluded(self):
+        booking = Booking.objects.create(property=self.booked, user=self.guest,
+                                         start_date=date(2030, 3, 10), end_date=date(2030, 3, 13))
+        self.assertEqual(booking.booked_nights.count(), 3)
+
+        self.assertEqual(self.available("2030-03-12", "2030-03-20"), ["Free"])
+        self.assertEqual(self.available("2030-03-01", "2030-03-11"), ["Free"])
+        # Check-out day is free: back-to-back stays don't overlap
+        self.assertEqual(self.available("2030-03-13", "2030-03-15"), ["Booked", "Free"])
+        self.assertEqual(self.available("2030-03-05", "2030-03-10"), ["Booked", "Free"])
+
+        booking.status = "canceled"
+        with self.captureOnCommitCallbacks(execute=True):  # drops the cached list pages
+            booking.save()
+        self.assertFalse(booking.booked_nights.exists())
+        self.assertEqual(self.available("2030-03-12", "2030-03-20"), ["Booked", "Free"])
+
+    def test_moving_a_booking_updates_its_nights(self):
+        booking = Booking.objects.create(property=self.booked, user=self.guest,
+                                         start_date=date(2030, 3, 10), end_date=date(2030, 3, 13))
+        booking.start_date, booking.end_date = date(2030, 3, 12), date(2030, 3, 14)
+        booking.save()
+        self.assertEqual(sorted(booking.booked_nights.values_list("night", flat=True)),
+                         [date(2030, 3, 12), date(2030, 3, 13)])
+        self.assertEqual(self.available("2030-03-10", "2030-03-12"), ["Booked", "Free"])
+
+    def test_bad_stay_params(self):
+        for params in ({"check_in": "2030-03-10"}, {"check_in": "2030-03-10", "check_out": "2030-03-10"},
+                       {"check_in": "10/03/2030", "check_out": "2030-03-12"},
+                       {"check_in": "2030-01-01", "check_out": "2090-01-01"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/properties/", params).status_code, 400)
+
+    @override_settings(MAX_STAY_NIGHTS=30)
+    def test_stays_longer_than_the_limit_are_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.guest)
+        stay = {"property": str(self.booked.pk), "start_date": "2030-03-01"}
+        response = client.post("/api/bookings/", {**stay, "end_date": "2030-04-01"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("30 nights", str(response.data))
+        self.assertFalse(BookedNight.objects.exists())
+        self.assertEqual(client.post("/api/bookings/", {**stay, "end_date": "2030-03-31"}, format="json").status_code, 201)
+
+
+class PropertySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        for name, description, city, price, bed, category in [
+            ("Ocean Villa", "Quiet beach house with a pool", "Mombasa", "120.00", 3, ["Beach", "Pool"]),
+            ("City Loft", "Café downstairs, close to the station", "Nairobi", "80.00", 1, ["City"]),
+            ("Beach Hut", "Simple hut on the sand", "Mombasa", "40.00", 1, ["Beach"]),
+        ]:
+            Property.objects.create(host=host, name=name, description=description, city=city,
+                                    pricepernight=Decimal(price), bed=bed, category=category)
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, **params):
+        response = self.client.get("/api/properties/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row["name"] for row in response.json()["results"])
+
+    def test_filters(self):
+        self.assertEqual(self.names(city="Mombasa"), ["Beach Hut", "Ocean Villa"])
+        self.assertEqual(self.names(min_price="50", max_price="100"), ["City Loft"])
+        self.assertEqual(self.names(min_bed="2"), ["Ocean Villa"])
+        self.assertEqual(self.names(category="beach"), ["Beach Hut", "Ocean Villa"])
+        self.assertEqual(self.names(category="Beach,pool"), ["Ocean Villa"])
+        self.assertEqual(self.client.get("/api/properties/", {"min_price": "cheap"}).status_code, 400)
+
+    def test_text_search(self):
+        self.assertEqual(self.names(q="beach"), ["Beach Hut", "Ocean Villa"])
+        self.assertEqual(self.names(q="cafe"), ["City Loft"])
+        # The last term matches as a prefix
+        self.assertEqual(self.names(q="beach po"), ["Ocean Villa"])
+        self.assertEqual(self.names(q="the"), ["Beach Hut", "City Loft", "Ocean Villa"])
+
+        loft = Property.objects.get(name="City Loft")
+        loft.description = "Rooftop terrace"
+        loft.save(update_fields=["description"])
+        cache.clear()
+        self.assertEqual(self.names(q="cafe"), [])
+        self.assertEqual(self.names(q="rooftop"), ["City Loft"])
+
+    def test_migration_backfills_the_index(self):
+        backfill = import_module("listings.migrations.0014_backfill_search_index").backfill_search_index
+        SearchTerm.objects.all().delete()
+        PropertyCategory.objects.all().delete()
+        backfill(django_apps, None)
+        self.assertEqual(self.names(q="beach", category="pool"), ["Ocean Villa"])
+
+
+class PropertyCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        self.guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.prop = Property.objects.create(host=self.host, name="Cached", description="x",
+                                                pricepernight=Decimal("10.00"))
+        self.detail = f"/api/properties/{self.prop.pk}/"
+
+    def get(self, url, **extra):
+        response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_anonymous_responses_are_cached_until_the_property_changes(self):
+        self.assertEqual(self.get("/api/properties/")["X-Cache"], "MISS")
+        self.assertEqual(self.get(self.detail)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get("/api/properties/")["X-Cache"], "HIT")
+            self.assertEqual(self.get(self.detail)["X-Cache"], "HIT")
+        # Parameter order doesn't split the cache
+        self.get("/api/properties/?city=X&bed=1")
+        self.assertEqual(self.get("/api/properties/?bed=1&city=X")["X-Cache"], "HIT")
+
+        self.prop.name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.prop.save()
+        self.assertEqual(self.get(self.detail).json()["name"], "Renamed")
+        self.assertEqual(self.get("/api/properties/").json()["results"][0]["name"], "Renamed")
+
+    def test_reviews_and_bookings_invalidate_the_property(self):
+        self.get(self.detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(property=self.prop, user=self.guest, rating=4, comment="x")
+        response = self.get(self.detail)
+        self.assertEqual((response["X-Cache"], response.json()["review_count"]), ("MISS", 1))
+
+        self.get(self.detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(property=self.prop, user=self.guest,
+                                   start_date=date(2030, 1, 1), end_date=date(2030, 1, 2))
+        self.assertEqual(self.get(self.detail)["X-Cache"], "MISS")
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.get("/api/properties/")
+        self.client.force_login(self.guest)
+        self.assertNotIn("X-Cache", self.get("/api/properties/"))
+
+
+class BookingConflictTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        cls.prop = Property.objects.create(host=host, name="Hot", description="x", pricepernight=Decimal("10.00"))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.guest)
+
+    def book(self, start, end):
+        return self.client.post("/api/bookings/", {"property": str(self.prop.pk), "start_date": start,
+                                                   "end_date": end}, format="json")
+
+    def test_overlapping_booking_is_a_conflict(self):
+        response = self.book("2030-06-01", "2030-06-05")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["total_price"], "40.00")
+
+        response = self.book("2030-06-04", "2030-06-06")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["detail"], "Property is not available for the selected dates.")
+        self.assertEqual(self.book("2030-06-05", "2030-06-06").status_code, 201)
+
+        # Model-level check, for writers that skip the serializer
+        with self.assertRaises(BookingUnavailable):
+            Booking.objects.create(property=self.prop, user=self.guest,
+                                   start_date=date(2030, 6, 2), end_date=date(2030, 6, 3))
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_cancelling_frees_the_nights(self):
+        booking_id = self.book("2030-06-01", "2030-06-05").json()["booking_id"]
+        booking = Booking.objects.get(pk=booking_id)
+        booking.status = "canceled"
+        booking.save()
+        self.assertFalse(BookedNight.objects.filter(booking=booking).exists())
+        self.assertEqual(self.book("2030-06-02", "2030-06-04").status_code, 201)
+
+        # A canceled booking can't come back over someone else's nights
+        booking.status = "pending"
+        with self.assertRaises(BookingUnavailable):
+            booking.save()
+
+    def test_moving_onto_booked_nights_is_a_conflict(self):
+        first = self.book("2030-06-01", "2030-06-03").json()["booking_id"]
+        self.book("2030-06-03", "2030-06-05")
+        response = self.client.patch(f"/api/bookings/{first}/", {"end_date": "2030-06-04"}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(BookedNight.objects.filter(booking_id=first).count(), 2)
+
+
+class BatchBookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        cls.first = Property.objects.create(host=host, name="First", description="x", pricepernight=Decimal("10.00"))
+        cls.second = Property.objects.create(host=host, name="Second", description="x", pricepernight=Decimal("20.00"))
+        Booking.objects.create(property=cls.second, user=cls.guest,
+                               start_date=date(2030, 7, 1), end_date=date(2030, 7, 3))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.guest)
+
+    def item(self, prop, start, end):
+        return {"property": str(prop.pk), "start_date": start, "end_date": end}
+
+    def post(self, body):
+        return self.client.post("/api/bookings/batch/", body, format="json")
+
+    def statuses(self, response):
+        return [result["status"] for result in response.json()["results"]]
+
+    def test_all_items_are_created_together(self):
+        response = self.post([self.item(self.first, "2030-07-01", "2030-07-03"),
+                              self.item(self.second, "2030-07-03", "2030-07-04")])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([r["booking"]["total_price"] for r in response.json()["results"]], ["20.00", "20.00"])
+        self.assertEqual(BookedNight.objects.filter(property=self.first).count(), 2)
+
+    def test_one_conflict_creates_nothing(self):
+        before = Booking.objects.count()
+        response = self.post([self.item(self.first, "2030-07-01", "2030-07-03"),
+                              self.item(self.second, "2030-07-02", "2030-07-04")])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.statuses(response), ["skipped", "conflict"])
+        self.assertEqual(Booking.objects.count(), before)
+        self.assertFalse(BookedNight.objects.filter(property=self.first).exists())
+
+        # Items overlapping each other conflict too
+        response = self.post([self.item(self.first, "2030-07-01", "2030-07-03"),
+                              self.item(self.first, "2030-07-02", "2030-07-04")])
+        self.assertEqual(self.statuses(response), ["skipped", "conflict"])
+
+        response = self.post([self.item(self.first, "2030-07-01", "2030-07-03"),
+                              {"property": str(self.first.pk), "start_date": "2030-07-05"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.statuses(response), ["skipped", "invalid"])
+        self.assertEqual(Booking.objects.count(), before)
+
+    def test_partial_batch_keeps_the_bookable_items(self):
+        response = self.post({"partial": True, "bookings": [
+            self.item(self.first, "2030-07-01", "2030-07-03"),
+            self.item(self.second, "2030-07-02", "2030-07-04"),
+        ]})
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), ["created", "conflict"])
+        self.assertEqual(BookedNight.objects.filter(property=self.first).count(), 2)
+
+    @override_settings(BOOKING_BATCH_MAX=2)
+    def test_batch_size_limit(self):
+        items = [self.item(self.first, f"2030-08-0{i}", f"2030-08-0{i + 1}") for i in range(1, 4)]
+        response = self.post(items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "At most 2 bookings per batch."})
+        self.assertEqual(self.post(items[:2]).status_code, 201)
+        self.assertEqual(self.post([]).status_code, 400)
+
+    @override_settings(MAX_STAY_NIGHTS=10, BOOKING_BATCH_MAX_NIGHTS=15)
+    def test_stay_and_night_limits(self):
+        response = self.post([self.item(self.first, "2030-09-01", "2030-09-12")])
+        self.assertEqual(self.statuses(response), ["invalid"])
+
+        response = self.post([self.item(self.first, "2030-09-01", "2030-09-09"),
+                              self.item(self.second, "2030-09-01", "2030-09-09")])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "At most 15 nights per batch, across all bookings."})
+        self.assertFalse(BookedNight.objects.filter(night__gte=date(2030, 9, 1)).exists())
+
+
+class ReviewAggregateTests(TestCase):
+    def setUp(self):
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        self.prop = Property.objects.create(host=host, name="Rated", description="x", pricepernight=Decimal("10.00"))
+        self.reviewers = [
+            User.objects.create_user(f"reviewer{i}@example.com", "Reviewer", str(i), "password123") for i in range(3)
+        ]
+
+    def review(self, reviewer, rating):
+        return Review.objects.create(property=self.prop, user=reviewer, rating=rating, comment="x")
+
+    def assert_stats(self, rating, count, histogram):
+        self.prop.refresh_from_db()
+        self.assertEqual((self.prop.rating, self.prop.review_count), (Decimal(rating), count))
+        self.assertEqual(self.prop.rating_histogram, {**dict.fromkeys("12345", 0), **histogram})
+        self.assertEqual(self.prop.rating_sum, sum(int(star) * n for star, n in histogram.items()))
+
+    def test_create_update_and_delete(self):
+        first = self.review(self.reviewers[0], 5)
+        self.review(self.reviewers[1], 4)
+        self.review(self.reviewers[2], 4)
+        self.assert_stats("4.33", 3, {"5": 1, "4": 2})
+
+        first.rating = 1
+        first.save()
+        self.assert_stats("3.00", 3, {"1": 1, "4": 2})
+
+        first.delete()
+        self.assert_stats("4.00", 2, {"4": 2})
+        Review.objects.filter(user=self.reviewers[1]).delete()
+        self.assert_stats("4.00", 1, {"4": 1})
+
+    def test_deleting_the_reviewer_cascades_into_the_aggregates(self):
+        self.review(self.reviewers[0], 2)
+        self.review(self.reviewers[1], 5)
+        self.reviewers[0].delete()
+        self.assert_stats("5.00", 1, {"5": 1})
+
+    def test_deleting_the_property_skips_the_aggregates(self):
+        self.review(self.reviewers[0], 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.prop.delete()
+        self.assertFalse(Review.objects.exists())
+        # No quoting assumed: MySQL uses backticks
+        self.assertFalse([q for q in queries if q["sql"].startswith("UPDATE") and "listings_property" in q["sql"].split()[1]])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        cls.properties = Property.objects.bulk_create([
+            Property(host=host, name=f"Property {i}", description="x", pricepernight=Decimal("10.00"),
+                     rating=Decimal(i % 3))
+            for i in range(7)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_pages_forward_and_back_without_gaps(self):
+        for ordering in (None, "-rating"):
+            with self.subTest(ordering=ordering):
+                params = {"page_size": 3, **({"ordering": ordering} if ordering else {})}
+                body = self.page("/api/properties/", params)
+                pages = [[row["property_id"] for row in body["results"]]]
+                while body["next"]:
+                    body = self.page(body["next"])
+                    pages.append([row["property_id"] for row in body["results"]])
+                seen = [pk for page in pages for pk in page]
+                self.assertEqual(sorted(seen), sorted(str(p.pk) for p in self.properties))
+                self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+                body = self.page(body["previous"])
+                self.assertEqual([row["property_id"] for row in body["results"]], pages[1])
+
+    def cursor(self, payload):
+        return urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+    def test_tampered_cursor_is_not_found(self):
+        pk = str(self.properties[0].pk)
+        for payload in (
+            {"o": "created_at,pk", "r": 0, "p": ["not-a-date", pk]},
+            {"o": "created_at,pk", "r": 0, "p": ["2026-01-01T00:00:00+00:00", "not-a-uuid"]},
+            {"o": "created_at,pk", "r": 0, "p": [None, pk]},
+            {"o": "created_at,pk", "r": 0, "p": ["2026-01-01T00:00:00+00:00"]},
+            {"o": "rating,created_at,pk", "r": 0, "p": ["high", "2026-01-01T00:00:00+00:00", pk]},
+            {"o": "-created_at,-pk", "r": 0, "p": ["2026-01-01T00:00:00+00:00", pk]},
+        ):
+            with self.subTest(payload=payload):
+                params = {"cursor": self.cursor(payload)}
+                if payload["o"].startswith("rating"):
+                    params["ordering"] = "rating"
+                self.assertEqual(self.client.get("/api/properties/", params).status_code, 404)
+        self.assertEqual(self.client.get("/api/properties/", {"cursor": "%%%"}).status_code, 404)
+
+
+class ChapaClientTests(SimpleTestCase):
+    """ChapaClient against a local stub server (see chapa_stub.py)."""
+
+    def setUp(self):
+        self.stub = ChapaStubServer().start()
+        self.addCleanup(self.stub.stop)
+
+    def make_client(self, **kwargs):
+        options = {"read_timeout": 1.0, "max_retries": 2, "backoff": 0.01}
+        options.update(kwargs)
+        client = ChapaClient("test-key", self.stub.base_url, **options)
+        self.addCleanup(client.session.close)
+        return client
+
+    def test_initiate_and_verify(self):
+        client = self.make_client()
+        response = client.initiate_payment({"tx_ref": "chapa-1", "amount": "10"})
+        self.assertEqual(response["status"], "success")
+        self.assertIn("chapa-1", response["data"]["checkout_url"])
+        self.assertEqual(client.verify_payment("chapa-1")["data"]["status"], "success")
+        self.assertEqual(client.stats["initialize"]["calls"], 1)
+        self.assertEqual(client.stats["verify"]["calls"], 1)
+
+    def test_verify_retries_server_errors(self):
+        self.stub.fail_next = 2
+        client = self.make_client()
+        self.assertEqual(client.verify_payment("chapa-1")["data"]["status"], "success")
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(client.stats["verify"]["errors"], 2)
+
+    def test_initiate_is_not_retried(self):
+        self.stub.fail_next = 1
+        client = self.make_client()
+        with self.assertRaises(ChapaUnavailable):
+            client.initiate_payment({"tx_ref": "chapa-1"})
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_read_timeout(self):
+        self.stub.delay = 0.5
+        client = self.make_client(read_timeout=0.1, max_retries=0)
+        with self.assertRaises(ChapaUnavailable):
+            client.verify_payment("chapa-1")
+
+    def test_circuit_breaker_fails_fast(self):
+        self.stub.fail_next = 10
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        client = self.make_client(max_retries=0, breaker=breaker)
+        for _ in range(2):
+            with self.assertRaises(ChapaUnavailable):
+                client.verify_payment("chapa-1")
+        self.assertEqual(breaker.state, "open")
+
+        with self.assertRaises(ChapaUnavailable):
+            client.verify_payment("chapa-1")
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_circuit_breaker_recovers_after_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        client = self.make_client(max_retries=0, breaker=breaker)
+        self.stub.fail_next = 1
+        with self.assertRaises(ChapaUnavailable):
+            client.verify_payment("chapa-1")
+        self.assertEqual(client.verify_payment("chapa-1")["data"]["status"], "success")
+        self.assertEqual(breaker.state, "closed")
+
+
+class AsyncPaymentViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        prop = Property.objects.create(host=host, name="Villa", description="Villa", pricepernight=Decimal("80.00"))
+        start = date.today() + timedelta(days=30)
+        cls.booking = Booking.objects.create(property=prop, user=guest, start_date=start, end_date=start + timedelta(days=2))
+
+    def setUp(self):
+        self.stub = ChapaStubServer().start()
+        self.addCleanup(self.stub.stop)
+        self.factory = AsyncRequestFactory()
+
+    async def test_initiate_then_status(self):
+        request = self.factory.post("/api/payment/initiate/", {"booking_id": str(self.booking.pk)},
+                                    content_type="application/json")
+        with override_settings(CHAPA_BASE_URL=self.stub.base_url):
+            response = await AsyncInitiatePaymentView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        tx_ref = response.data["transaction_id"]
+        self.assertIn(tx_ref, response.data["checkout_url"])
+        self.assertTrue(await Payment.objects.filter(transaction_id=tx_ref, status="Pending").aexists())
+
+        response = await AsyncSuccessPaymentView.as_view()(self.factory.get("/api/payment/success/", {"tx_ref": tx_ref}))
+        self.assertEqual(response.status_code, 202)
+
+    async def test_calls_wait_on_chapa_concurrently(self):
+        self.stub.delay = 0.3
+        client = AsyncChapaClient("test-key", self.stub.base_url, read_timeout=2.0)
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.initiate_payment({"tx_ref": f"chapa-{i}"}) for i in range(10)))
+        elapsed = time.perf_counter() - started
+        await client.aclose()
+        self.assertTrue(all(response["status"] == "success" for response in responses))
+        # Ten calls in series would take 3 s
+        self.assertLess(elapsed, 1.5)
+
+
+class VerifyPaymentTaskTests(TestCase):
+    def setUp(self):
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        prop = Property.objects.create(host=host, name="Villa", description="Villa", pricepernight=Decimal("80.00"))
+        self.booking = Booking.objects.create(property=prop, user=guest,
+                                              start_date=date(2030, 5, 1), end_date=date(2030, 5, 3))
+        self.tx_ref = f"chapa-{self.booking.pk}"
+
+        self.stub = ChapaStubServer().start()
+        self.addCleanup(self.stub.stop)
+        # The process-wide client is built from settings on first use
+        self.enterContext(override_settings(CHAPA_BASE_URL=self.stub.base_url, CHAPA_MAX_RETRIES=0))
+        _reset_client()
+        self.addCleanup(_reset_client)
+        # The confirmation email is queued through .delay() on commit
+        self.enterContext(eager_tasks())
+
+    def verify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = verify_payment_task.apply(args=[self.tx_ref]).get()
+        self.booking.refresh_from_db()
+        return result
+
+    def test_success_confirms_the_booking(self):
+        self.assertEqual(self.verify(), "Completed")
+        payment = Payment.objects.get(transaction_id=self.tx_ref)
+        self.assertEqual((payment.status, payment.amount, self.booking.status), ("Completed", Decimal("160.00"), "confirmed"))
+        self.assertTrue(EmailNotification.objects.filter(kind="payment_confirmed", recipient="guest@example.com").exists())
+
+        # Settled payments aren't checked again
+        calls = len(self.stub.requests)
+        self.assertEqual(self.verify(), "Completed")
+        self.assertEqual(len(self.stub.requests), calls)
+
+    def test_failure_leaves_the_booking_pending(self):
+        self.stub.verify_status = "failed"
+        self.assertEqual(self.verify(), "Failed")
+        self.assertEqual(self.booking.status, "pending")
+        self.assertFalse(EmailNotification.objects.exists())
+
+    def test_pending_retries_until_exhausted(self):
+        self.stub.verify_status = "pending"
+        self.assertEqual(self.verify(), "Failed")
+        # Eager retries run straight away: the first attempt plus each retry
+        self.assertEqual(len(self.stub.requests), verify_payment_task.max_retries + 1)
+
+    def test_outage_is_retried(self):
+        self.stub.fail_next = 1
+        self.assertEqual(self.verify(), "Completed")
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_unknown_reference(self):
+        self.tx_ref = "chapa-not-a-booking"
+        self.assertIsNone(self.verify())
+        self.assertFalse(self.stub.requests)
+
+
+@override_settings(CHAPA_WEBHOOK_SECRET="whsec")
+class ChapaWebhookTests(TestCase):
+    def setUp(self):
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        prop = Property.objects.create(host=host, name="Villa", description="Villa", pricepernight=Decimal("80.00"))
+        self.booking = Booking.objects.create(property=prop, user=guest,
+                                              start_date=date(2030, 5, 1), end_date=date(2030, 5, 3))
+        self.tx_ref = f"chapa-{self.booking.pk}"
+        self.enterContext(eager_tasks())
+
+    def deliver(self, payload, header="HTTP_CHAPA_SIGNATURE", signature=None):
+        body = json.dumps(payload).encode()
+        signature = webhook_signature(body, "whsec") if signature is None else signature
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/payment/webhook/", body, content_type="application/json",
+                                        **{header: signature})
+        self.booking.refresh_from_db()
+        return response
+
+    def event(self, status, event="charge.success", reference="ref-1"):
+        return {"event": event, "tx_ref": self.tx_ref, "reference": reference, "status": status}
+
+    def payment_status(self):
+        return Payment.objects.get(transaction_id=self.tx_ref).status
+
+    def test_signature(self):
+        payload = self.event("success")
+        self.assertEqual(self.deliver(payload, signature="").status_code, 401)
+        self.assertEqual(self.deliver(payload, signature="0" * 64).status_code, 401)
+        self.assertEqual(self.deliver(payload, signature=webhook_signature(b"{}", "whsec")).status_code, 401)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+        response = self.deliver(payload, header="HTTP_X_CHAPA_SIGNATURE")
+        self.assertEqual(response.json(), {"status": "processed"})
+        response = self.deliver(self.event("success", reference="ref-2"))
+        self.assertEqual(response.json(), {"status": "processed"})
+
+    def test_replays_are_applied_once(self):
+        self.assertEqual(self.deliver(self.event("success")).json(), {"status": "processed"})
+        self.assertEqual((self.payment_status(), self.booking.status), ("Completed", "confirmed"))
+        self.assertEqual(EmailNotification.objects.filter(kind="payment_confirmed").count(), 1)
+
+        self.assertEqual(self.deliver(self.event("success")).json(), {"status": "duplicate"})
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        self.assertEqual(EmailNotification.objects.filter(kind="payment_confirmed").count(), 1)
+
+    def test_status_mapping(self):
+        for chapa_status, expected in (("success", "Completed"), ("failed", "Failed"), ("cancelled", "Failed"),
+                                       ("pending", "Pending")):
+            with self.subTest(status=chapa_status):
+                Payment.objects.filter(transaction_id=self.tx_ref).delete()
+                self.deliver(self.event(chapa_status, event=f"charge.{chapa_status}", reference=chapa_status))
+                self.assertEqual(self.payment_status(), expected)
+
+    def test_settled_payments_stay_settled(self):
+        self.deliver(self.event("success"))
+        self.deliver(self.event("failed", event="charge.failed"))
+        self.assertEqual((self.payment_status(), self.booking.status), ("Completed", "confirmed"))
+
+        Payment.objects.filter(transaction_id=self.tx_ref).update(status="Failed")
+        Booking.objects.filter(pk=self.booking.pk).update(status="pending")
+        self.deliver(self.event("success", reference="ref-2"))
+        self.assertEqual((self.payment_status(), self.booking.status), ("Failed", "pending"))
+
+    def test_payloads_without_a_reference_are_rejected(self):
+        response = self.deliver({"event": "charge.success", "status": "success"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+        self.assertEqual(self.deliver({"tx_ref": "chapa-nothing", "status": "success"}).json(), {"status": "unknown"})
+
+
+class EmailDispatcherTests(TestCase):
+    def setUp(self):
+        self.stub = SMTPStubServer().start()
+        self.addCleanup(self.stub.stop)
+
+    def connection(self):
+        return get_connection(
+            "django.core.mail.backends.smtp.EmailBackend",
+            host=self.stub.host, port=self.stub.port, use_tls=False, use_ssl=False,
+            username="", password="",
+        )
+
+    def test_duplicates_are_queued_once(self):
+        self.assertTrue(queue_email("guest@example.com", "Hi", "Body", kind="test"))
+        self.assertFalse(queue_email("Guest@example.com ", "Hi", "Body", kind="test"))
+        self.assertTrue(queue_email("guest@example.com", "Hi", "Other body", kind="test"))
+        self.assertEqual(EmailNotification.objects.count(), 2)
+
+    @override_settings(EMAIL_DEDUPE_WINDOW=1)
+    def test_same_text_is_sent_again_after_the_window(self):
+        self.assertTrue(queue_email("guest@example.com", "Hi", "Body", kind="test"))
+        time.sleep(1.1)
+        self.assertTrue(queue_email("guest@example.com", "Hi", "Body", kind="test"))
+
+    def test_duplicates_are_keyed_on_the_source_event(self):
+        details = dict(to_email="guest@example.com", property_name="Cabin",
+                       start_date="2030-01-01", end_date="2030-01-03", amount="100.00")
+        send_payment_confirmation_email(**details, tx_ref="chapa-1")
+        send_payment_confirmation_email(**details, tx_ref="chapa-1")  # replayed webhook
+        send_payment_confirmation_email(**details, tx_ref="chapa-2")  # same stay booked again
+        self.assertEqual(EmailNotification.objects.filter(kind="payment_confirmed").count(), 2)
+
+    def test_prune_keeps_recent_and_pending_rows(self):
+        for status, age in [("sent", 60), ("failed", 60), ("pending", 60), ("sent", 0)]:
+            notification = EmailNotification.objects.create(
+                recipient=f"{status}{age}@example.com", kind="test", subject="Hi", body="Body",
+                dedupe_key=f"{status}{age}", status=status,
+            )
+            EmailNotification.objects.filter(pk=notification.pk).update(
+                created_at=timezone.now() - timedelta(days=age))
+
+        with override_settings(EMAIL_PRUNE_BATCH=1):
+            self.assertEqual(prune_email_notifications(), 2)
+        self.assertEqual(sorted(EmailNotification.objects.values_list("dedupe_key", flat=True)), ["pending60", "sent0"])
+
+    def test_sends_outside_the_claim_transaction(self):
+        queue_email("guest@example.com", "Hi", "Body", kind="test")
+        smtp = self.connection()
+        send = smtp.send_messages
+        seen = []
+
+        def send_messages(messages):
+            seen.append((len(connection.savepoint_ids),
+                         EmailNotification.objects.get(recipient="guest@example.com").status))
+            return send(messages)
+
+        smtp.send_messages = send_messages
+        depth = len(connection.savepoint_ids)
+        self.assertEqual(dispatch_pending(rate=0, connection=smtp), 1)
+        # No atomic block (and so no row lock) open, and the row is marked as taken
+        self.assertEqual(seen, [(depth, "sending")])
+        self.assertEqual(EmailNotification.objects.get().status, "sent")
+
+    def test_batches_share_one_connection(self):
+        for i in range(7):
+            queue_email(f"guest{i}@example.com", "Hi", "Body", kind="test")
+
+        sent = dispatch_pending(batch_size=3, rate=0, connection=self.connection())
+
+        self.assertEqual(sent, 7)
+        self.assertEqual(self.stub.connections, 1)
+        self.assertEqual(len(self.stub.messages), 7)
+        self.assertFalse(EmailNotification.objects.filter(status="pending").exists())
+        self.assertEqual(dispatch_pending(rate=0, connection=self.connection()), 0)
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, seed=7):
+        call_command("seed", users=10, properties=4, bookings=3, seed=seed, anchor=date(2030, 1, 1),
+                     stdout=io.StringIO())
+        return {
+            "users": list(User.objects.filter(email__startswith=f"seed{seed}.").order_by("pk")
+                          .values_list("pk", "email", "role", "created_at")),
+            "properties": list(Property.objects.order_by("pk").values_list(
+                "pk", "host_id", "name", "pricepernight", "latitude", "longitude", "review_count")),
+            "bookings": list(Booking.objects.order_by("pk").values_list(
+                "pk", "property_id", "user_id", "start_date", "end_date", "total_price", "status")),
+            "nights": BookedNight.objects.count(),
+            "payments": list(Payment.objects.order_by("pk").values_list("pk", "amount", "status")),
+            "reviews": list(Review.objects.order_by("pk").values_list("pk", "rating", "comment")),
+        }
+
+    def test_counts_and_same_seed_same_data(self):
+        first = self.seed()
+        self.assertEqual((len(first["users"]), len(first["properties"])), (10, 4))
+        self.assertEqual(User.objects.filter(email__startswith="seed7.", role="host").count(), 1)
+        self.assertTrue(first["bookings"])
+        active = sum((end - start).days for _, _, _, start, end, _, status in first["bookings"] if status != "canceled")
+        self.assertEqual(first["nights"], active)
+
+        User.objects.filter(email__startswith="seed7.").delete()
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.seed(), first)
+        # Reruns skip existing rows instead of duplicating them
+        self.assertEqual(self.seed(), first)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def test_smoke_run_against_the_live_server(self):
+        self.enterContext(eager_tasks())
+        call_command("seed", users=4, properties=3, bookings=2, seed=3, stdout=io.StringIO())
+        out = io.StringIO()
+        # No Chapa stub here, so the mix leaves out the payment endpoints
+        call_command(
+            "loadtest", url=self.live_server_url, concurrency=2, duration=0.5, warmup=0, seed_users=3,
+            mix="properties_list=3,property_detail=2,property_reviews=1,bookings_list=1,booking_create=1,signin=1",
+            chapa_port=0, label="smoke", stdout=out, stderr=io.StringIO(),
+        )
+        report = json.loads(out.getvalue())
+
+        self.assertEqual((report["label"], report["concurrency"]), ("smoke", 2))
+        self.assertGreater(report["requests"], 0)
+        self.assertEqual(report["errors"], 0, report["endpoints"])
+        listing = report["endpoints"]["properties_list"]
+        self.assertEqual(listing["status"], {"200": listing["requests"]})
+        self.assertLessEqual(listing["latency_ms"]["p50"], listing["latency_ms"]["max"])
+
+
+class PruneTaskResultsTests(TestCase):
+    @override_settings(CELERY_RESULT_RETENTION=3600, CELERY_RESULT_PRUNE_BATCH=2)
+    def test_only_expired_results_are_deleted_in_chunks(self):
+        from django_celery_results.models import TaskResult
+
+        for i in range(7):
+            TaskResult.objects.create(task_id=f"task-{i}", status="SUCCESS")
+        # date_done is auto_now; age five of them past the retention
+        TaskResult.objects.filter(task_id__in=[f"task-{i}" for i in range(5)]).update(
+            date_done=timezone.now() - timedelta(hours=2))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(prune_task_results(), 5)
+        deletes = [q for q in queries if q["sql"].startswith("DELETE") and "django_celery_results_taskresult" in q["sql"]]
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(sorted(TaskResult.objects.values_list("task_id", flat=True)), ["task-5", "task-6"])
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANT_WIDTHS=[320, 640, 1280]))
+        self.host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+
+    def variant_jobs(self, callbacks):
+        return [c for c in callbacks if c.__qualname__ == "schedule_variants.<locals>.enqueue"]
+
+    def upload(self, width, height):
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), "teal").save(buffer, "JPEG")
+        return SimpleUploadedFile("room.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_builds_variants_up_to_original_width(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            prop = Property.objects.create(host=self.host, name="Pictured", description="x",
+                                           pricepernight=Decimal("10.00"), image=self.upload(800, 600))
+        self.assertEqual(len(self.variant_jobs(callbacks)), 1)
+
+        generate_image_variants("listings.Property", str(prop.pk), "image")
+        prop.refresh_from_db()
+
+        self.assertEqual(prop.image_variants["source"], prop.image.name)
+        srcset = PropertySerializer(prop).data["image_srcset"]
+        self.assertEqual(set(srcset), {"webp", "jpeg"})
+        self.assertEqual(list(srcset["webp"]), ["320w", "640w"])
+        with Image.open(prop.image.storage.path(prop.image_variants["webp"]["320"])) as img:
+            self.assertEqual(img.size, (320, 240))
+
+    def test_stats_only_save_does_not_queue_work(self):
+        prop = Property.objects.create(host=self.host, name="Plain", description="x",
+                                       pricepernight=Decimal("10.00"))
+        with self.captureOnCommitCallbacks() as callbacks:
+            Review.objects.create(property=prop, user=self.host, rating=5, comment="Great")
+        self.assertFalse(self.variant_jobs(callbacks))
+
+
+class GeoSearchTests(TestCase):
+    # (name, latitude, longitude): km from central Nairobi
+    PLACES = [
+        ("Westlands", -1.2676, 36.8108),   # ~2
+        ("Karen", -1.3190, 36.7076),       # ~13
+        ("Thika", -1.0333, 37.0693),       # ~40
+        ("Mombasa", -4.0435, 39.6682),     # ~440
+        ("Fiji", -17.7134, 178.0650),      # other side of the world
+        ("Unmapped", None, None),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        for name, latitude, longitude in cls.PLACES:
+            Property.objects.create(host=host, name=name, description="x", pricepernight=Decimal("10.00"),
+                                    latitude=latitude, longitude=longitude)
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, **params):
+        response = self.client.get("/api/properties/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["name"] for row in response.json()["results"]], response.json()
+
+    def test_radius_search_pages_by_distance(self):
+        page, body = self.names(lat=-1.2864, lng=36.8172, radius=50, ordering="distance", page_size=2)
+        self.assertEqual(page, ["Westlands", "Karen"])
+        self.assertLess(body["results"][0]["distance"], 3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(body["next"])
+        self.assertEqual([row["name"] for row in response.json()["results"]], ["Thika"])
+        # Measured and paged by the database: one query, no per-row CASE
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("CASE", queries[0]["sql"])
+
+    def test_partial_save_skips_coordinates(self):
+        prop = Property.objects.only("pk", "review_count").get(name="Karen")
+        # Savepoint, UPDATE, release: no deferred-field loads
+        with self.assertNumQueries(3):
+            prop.review_count = 1
+            prop.save(update_fields=["review_count"])
+        prop = Property.objects.only("pk", "latitude").get(name="Karen")
+        prop.latitude = -1.2676
+        prop.save(update_fields=["latitude"])
+        self.assertEqual(Property.objects.get(name="Karen").geohash, geohash_encode(-1.2676, 36.7076))
+
+    def test_bounding_box(self):
+        page, _ = self.names(bbox="36.6,-1.4,37.0,-1.2")
+        self.assertEqual(sorted(page), ["Karen", "Westlands"])
+        # Crossing the antimeridian
+        page, _ = self.names(bbox="170,-20,-170,-10")
+        self.assertEqual(page, ["Fiji"])
+        response = self.client.get("/api/properties/", {"ordering": "distance"})
+        self.assertEqual(response.status_code, 400)
+
+
+class PricingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        cls.prop = Property.objects.create(
+            host=host, name="Deal", description="x", pricepernight=Decimal("100.00"),
+            discount="10% weekly; 50% off weekends; KES 20 off 3+ nights",
+        )
+        cls.plain = Property.objects.create(host=host, name="Plain", description="x", pricepernight=Decimal("99.99"))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_discount_rules_apply_to_quotes_and_bookings(self):
+        # Monday to Monday: 5 weekday nights at 10% off, Friday and Saturday at 50% off, then 20 off
+        quote = quote_stay(self.prop, date(2026, 11, 2), date(2026, 11, 9))
+        self.assertEqual((quote["subtotal"], quote["discount"], quote["total"]),
+                         (Decimal("700.00"), Decimal("170.00"), Decimal("530.00")))
+        self.assertEqual(quote_stay(self.prop, date(2026, 11, 2), date(2026, 11, 4))["total"], Decimal("200.00"))
+
+        booking = Booking.objects.create(property=self.prop, user=self.guest,
+                                         start_date=date(2026, 11, 2), end_date=date(2026, 11, 9))
+        self.assertEqual(booking.total_price, Decimal("530.00"))
+        with self.assertRaises(ValidationError):
+            parse_discount("free on tuesdays")
+
+    def test_list_and_batch_quotes(self):
+        response = self.client.get("/api/properties/", {"check_in": "2026-12-01", "check_out": "2026-12-03"})
+        quotes = {row["name"]: row["quote"]["total"] for row in response.json()["results"]}
+        self.assertEqual(quotes, {"Deal": "200.00", "Plain": "199.98"})
+
+        missing = "00000000-0000-0000-0000-000000000000"
+        response = self.client.post("/api/properties/quotes/", {
+            "check_in": "2026-12-01", "check_out": "2026-12-03", "properties": [str(self.plain.pk), missing],
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([q["total"] for q in response.json()["quotes"]], ["199.98"])
+        self.assertEqual(response.json()["missing"], [missing])
+
+    def test_long_stays_are_rejected_before_pricing(self):
+        stay = {"check_in": "2030-01-01", "check_out": "9999-12-31"}
+        self.assertEqual(self.client.get(f"/api/properties/{self.prop.pk}/quote/", stay).status_code, 400)
+        self.assertEqual(self.client.get("/api/properties/", stay).status_code, 400)
+        response = self.client.post("/api/properties/quotes/", {**stay, "properties": [str(self.prop.pk)]},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(f"/api/properties/{self.prop.pk}/quote/",
+                                   {"check_in": "2030-01-01", "check_out": "2031-01-01"})
+        self.assertEqual((response.status_code, response.json()["nights"]), (200, 365))
+
+
+class CalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest = User.objects.create_user("guest@example.com", "Guest", "User", "password123")
+        host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        self.prop = Property.objects.create(host=host, name="Booked", description="x", pricepernight=Decimal("10.00"))
+        self.url = f"/api/properties/{self.prop.pk}/calendar/"
+
+    def months(self):
+        response = self.client.get(self.url, {"from": "2026-12", "months": 2})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["months"]
+
+    def test_bitmap_is_cached_and_updated_in_place(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(property=self.prop, user=self.guest,
+                                             start_date=date(2026, 12, 30), end_date=date(2027, 1, 2))
+        december, january = self.months()
+        self.assertEqual(december["nights"], "0" * 29 + "11")
+        self.assertEqual((january["month"], january["booked"], january["nights"][:3]), ("2027-01", 1, "100"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = "canceled"
+            booking.save()
+        # Only the property lookup: the bitmaps come from the cache, already updated
+        with self.assertNumQueries(1):
+            december, january = self.months()
+        self.assertEqual(december["booked"] + january["booked"], 0)
+
+    def test_range_stops_at_the_last_representable_month(self):
+        response = self.client.get(self.url, {"from": "9999-11", "months": 6})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([(m["month"], len(m["nights"])) for m in response.json()["months"]],
+                         [("9999-11", 30), ("9999-12", 31)])
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        auth_cache.clear()
+        user_cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.host = User.objects.create_user("host@example.com", "Host", "User", "password123", role="host")
+        response = self.client.post("/api/signin/", {"email": "host@example.com", "password": "password123"})
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {response.json()['access']}"}
+
+    def create_property(self):
+        return self.client.post("/api/properties/", {"name": "Token", "description": "x", "pricepernight": "10.00"},
+                                content_type="application/json", **self.auth)
+
+    def test_token_claims_replace_the_user_query(self):
+        # The bookings page only; no SELECT on the user table
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/bookings/", **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.create_property()
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Property.objects.get(name="Token").host_id, self.host.pk)
+
+        self.host.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.host.save()
+        # 403 rather than 401: SessionAuthentication comes first and sends no WWW-Authenticate
+        self.assertEqual(self.client.get("/api/bookings/", **self.auth).status_code, 403)
+
+    def test_deactivation_and_deletion_apply_before_commit(self):
+        self.host.is_active = False
+        self.host.save()
+        self.assertEqual(self.client.get("/api/bookings/", **self.auth).status_code, 403)
+
+        self.host.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.host.save()
+        self.assertEqual(self.client.get("/api/bookings/", **self.auth).status_code, 200)
+
+        self.host.delete()
+        self.assertEqual(self.client.get("/api/bookings/", **self.auth).status_code, 403)
+
+    def test_changes_that_skip_signals_are_read_from_the_database(self):
+        User.objects.filter(pk=self.host.pk).update(is_active=False)
+        auth_cache.clear()  # the cached state expired or was evicted
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/bookings/", **self.auth).status_code, 403)
+
+    def test_demoted_host_loses_host_rights(self):
+        self.host.role = "guest"
+        self.host.save()
+        # The token still says host
+        self.assertEqual(self.create_property().status_code, 403)
+
+        self.host.role = "host"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.host.save()
+        self.assertEqual(self.create_property().status_code, 201)
+
+    def test_bearer_requests_skip_the_session_middleware(self):
+        self.client.force_login(self.host)
+        # A session cookie alongside the token costs nothing on /api/
+        with self.assertNumQueries(1):
+            self.client.get("/api/bookings/", **self.auth)
+        # Admin keeps the full stack
+        self.assertEqual(self.client.get("/admin/", **self.auth).status_code, 302)
+
+
+class RequestTimingTests(TestCase):
+    def test_server_timing_header_and_metrics(self):
+        with self.assertLogs("alx_travel_app.requests", "INFO") as logs:
+            response = self.client.get("/api/properties/")
+        record = logs.records[-1]
+        self.assertEqual((record.getMessage(), record.route, record.queries),
+                         ("GET /api/properties/ 200", "api/properties/$", 1))
+        self.assertRegex(response["Server-Timing"], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="1 queries"$')
+
+        # Closed unless a token is configured (tests run with DEBUG off)
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with override_settings(METRICS_TOKEN="scrape"):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape").content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="api/properties/$",status="200"}', body)
+        self.assertIn("http_request_db_queries_bucket", body)
+
+
+class WorkerWarmupTests(SimpleTestCase):
+    def test_warm_process(self):
+        warm_process()
+        memory = process_memory_kb()
+        if memory is not None:  # Linux only
+            self.assertGreater(memory["rss"], memory["uss"])
+
+    def test_warm_thread_pool_runs_once_per_thread(self):
+        seen = set()
+        with ThreadPoolExecutor(3) as executor:
+            warm_thread_pool(executor, 3, lambda: seen.add(threading.get_ident()))
+        self.assertEqual(len(seen), 3)
+
+
+class MediaServingTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, MEDIA_SERVE_MODE="stream"))
+        self.name = "derivatives/properties/room.0123456789abcdef.320w.webp"
+        os.makedirs(os.path.join(media_root, "derivatives", "properties"))
+        with open(os.path.join(media_root, self.name), "wb") as f:
+            f.write(bytes(range(256)) * 4)
+
+    def test_range_and_conditional_requests(self):
+        response = self.client.get(f"/media/{self.name}", HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+
+        response = self.client.get(f"/media/{self.name}", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(f"/media/{self.name}", HTTP_RANGE="bytes=2000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, 404)
+
+    @override_settings(MEDIA_SERVE_MODE="x-accel", MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/")
+    def test_x_accel_hands_off_to_proxy(self):
+        response = self.client.get(f"/media/{self.name}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(response.content, b"")
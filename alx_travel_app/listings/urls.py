@@ -1,7 +1,8 @@
 # listings/urls.py
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PropertyViewSet, BookingViewSet, CustomTokenObtainPairView, InitiatePaymentView, VerifyPaymentView, SuccessPaymentView, RegisterView, PropertyReviewListView, ReviewCreateView
+from .views import PropertyViewSet, BookingViewSet, CustomTokenObtainPairView, InitiatePaymentView, VerifyPaymentView, SuccessPaymentView, AsyncInitiatePaymentView, AsyncVerifyPaymentView, AsyncSuccessPaymentView, ChapaWebhookView, RegisterView, PropertyReviewListView, ReviewCreateView
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView
@@ -12,15 +13,22 @@ router = DefaultRouter()
 router.register(r"properties", PropertyViewSet, basename="property")
 router.register(r"bookings", BookingViewSet, basename="booking")
 
+if settings.PAYMENT_VIEWS_ASYNC:
+    payment_views = (AsyncInitiatePaymentView, AsyncVerifyPaymentView, AsyncSuccessPaymentView)
+else:
+    payment_views = (InitiatePaymentView, VerifyPaymentView, SuccessPaymentView)
+initiate_view, verify_view, success_view = (view.as_view() for view in payment_views)
+
 urlpatterns = [
     path("", include(router.urls)),
     path('signup/', RegisterView.as_view(), name='signup'),
     # path('signin/', TokenObtainPairView.as_view(), name='signin'),
     path('signin/', CustomTokenObtainPairView.as_view(), name='signin'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('payment/initiate/', InitiatePaymentView.as_view(), name='initiate-payment'),
-    path('payment/verify/', VerifyPaymentView.as_view(), name='verify-payment'),
-    path('payment/success/', SuccessPaymentView.as_view(), name='success-payment'),
+    path('payment/initiate/', initiate_view, name='initiate-payment'),
+    path('payment/verify/', verify_view, name='verify-payment'),
+    path('payment/success/', success_view, name='success-payment'),
+    path('payment/webhook/', ChapaWebhookView.as_view(), name='chapa-webhook'),
     path("properties/<uuid:property_id>/reviews/", PropertyReviewListView.as_view()),
     path("reviews/add/", ReviewCreateView.as_view()),
 ]
\ No newline at end of file
@@ -1,19 +1,33 @@
 # listings/views.py
 
 import logging
-import time
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Property, Booking, Payment, Review
-from .serializers import InitiatePaymentSerializer, PropertySerializer, BookingSerializer, RegisterSerializer, ReviewSerializer
-from .chapa import initiate_payment, verify_payment
-from .tasks import send_payment_confirmation_email, send_booking_confirmation_email
+from .serializers import InitiatePaymentSerializer, PropertySerializer, BookingSerializer, BookingBatchItemSerializer, RegisterSerializer, ReviewSerializer, QuoteSerializer, QuoteBatchSerializer
+from .chapa import ChapaError, ChapaUnavailable, ainitiate_payment, initiate_payment, is_valid_webhook_signature
+from .availability import BookingUnavailable, parse_stay
+from .bookings import BATCH_CONFLICT, BATCH_CREATED, BATCH_INVALID, BATCH_SKIPPED, create_bookings_batch
+from .exceptions import BookingConflict
+from .calendar import month_calendar, parse_calendar_range
+from .filters import filter_properties
+from .pricing import quote_properties
+from .cache import CachedPropertyReadMixin
+from .pagination import BookingPagination, PropertyPagination, ReviewPagination
+from .payments import (
+    PAYMENT_COMPLETED, PAYMENT_FAILED, PAYMENT_PENDING, aget_or_create_payment, get_or_create_payment,
+    process_webhook_event,
+)
+from .tasks import verify_payment_task
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework import status
-from django.core.mail import send_mail
+from django.urls import reverse
 from rest_framework import generics
 from rest_framework.permissions import AllowAny
 from django.contrib.auth import get_user_model
@@ -40,6 +54,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['email'] = user.email
         token['first_name'] = user.first_name
         token['last_name'] = user.last_name
+        token['role'] = user.role
         return token
 
     def validate(self, attrs):
@@ -58,20 +73,90 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 
 
-class PropertyViewSet(viewsets.ModelViewSet):
+class PropertyViewSet(CachedPropertyReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Property instances.
 
     Provides standard CRUD actions (list, retrieve, create, update, delete)
     for the Property model.
+
+    The list accepts the filters documented in ``filters.filter_properties``:
+    location, price range, bed/shower minimums, category, full-text ``q``,
+    ``check_in``/``check_out`` availability, a ``bbox`` viewport and a
+    ``lat``/``lng``/``radius`` search that can be ordered by distance.
+    With ``check_in``/``check_out`` every result carries a price ``quote``.
+
+    Anonymous list and detail reads are served from the cache
+    (see ``cache.CachedPropertyReadMixin``).
     """
 
     queryset = Property.objects.all()
     serializer_class = PropertySerializer
     permission_classes = [IsHostOwnerOrReadOnly]
+    pagination_class = PropertyPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = filter_properties(queryset, self.request.query_params)
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        stay = parse_stay(self.request.query_params)
+        if page is not None and stay:
+            # One vectorized pricing pass for the whole page
+            quotes = quote_properties(page, *stay)
+            for prop in page:
+                prop.quote = quotes[prop.pk]
+        return page
 
     def perform_create(self, serializer):
-        serializer.save(host=self.request.user)
+        serializer.save(host_id=self.request.user.pk)
+
+    @action(detail=True, methods=["get"], permission_classes=[AllowAny])
+    def quote(self, request, pk=None):
+        """Price a stay: ``?check_in=YYYY-MM-DD&check_out=YYYY-MM-DD``."""
+        stay = parse_stay(request.query_params)
+        if not stay:
+            return Response({"detail": "Both check_in and check_out are required."}, status=400)
+        prop = self.get_object()
+        return Response(QuoteSerializer(quote_properties([prop], *stay)[prop.pk]).data)
+
+    @action(detail=True, methods=["get"], permission_classes=[AllowAny])
+    def calendar(self, request, pk=None):
+        """
+        Booked and free nights by month: ``?from=YYYY-MM&months=12``.
+        Served from cached per-year bitmaps, never from Booking rows.
+        """
+        start, months = parse_calendar_range(request.query_params)
+        prop = self.get_object()
+        return Response({
+            "property": prop.pk,
+            "from": start,
+            "months": month_calendar(prop.pk, start, months),
+        })
+
+    @action(detail=False, methods=["post"], url_path="quotes", permission_classes=[AllowAny])
+    def quotes(self, request):
+        """
+        Price one stay for up to PRICING_QUOTE_BATCH_MAX properties.
+
+        Body: ``{"check_in", "check_out", "properties": [ids]}``. Unknown ids
+        are listed under ``missing``.
+        """
+        serializer = QuoteBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        properties = Property.objects.filter(pk__in=data["properties"]).only("pk", "pricepernight", "discount")
+        quotes = quote_properties(properties, data["check_in"], data["check_out"])
+        return Response({
+            "quotes": [
+                {"property": pk, **QuoteSerializer(quotes[pk]).data}
+                for pk in dict.fromkeys(data["properties"]) if pk in quotes
+            ],
+            "missing": [pk for pk in dict.fromkeys(data["properties"]) if pk not in quotes],
+        })
 
 def get_guest_user():
     guest, created = User.objects.get_or_create(
@@ -89,11 +174,13 @@ class BookingViewSet(viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     # permission_classes = [IsAuthenticated, IsBookingOwner]
     permission_classes = [AllowAny]
+    pagination_class = BookingPagination
 
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated:
-            return Booking.objects.filter(user=user)
+            # BookingSerializer reads property.name/pricepernight on every row
+            return Booking.objects.filter(user_id=user.pk).select_related("property")
         # Guests shouldn’t see all bookings, return empty queryset
         return Booking.objects.none()
 
@@ -101,7 +188,82 @@ class BookingViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not user.is_authenticated:
             user = get_guest_user()
-        serializer.save(user=user)
+        try:
+            serializer.save(user_id=user.pk)
+        except BookingUnavailable:
+            # Lost the race to a concurrent booking after validation passed
+            raise BookingConflict()
+
+    def perform_update(self, serializer):
+        try:
+            serializer.save()
+        except BookingUnavailable:
+            raise BookingConflict()
+
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request):
+        """
+        Create up to BOOKING_BATCH_MAX bookings, with BOOKING_BATCH_MAX_NIGHTS
+        nights between them, in one transaction.
+
+        Body: a list of ``{property, start_date, end_date}`` objects, or
+        ``{"bookings": [...], "partial": false}``. The batch is all-or-nothing:
+        201 when every item was booked, otherwise nothing is created and the
+        response is 409 (some item conflicts) or 400, with a per-item
+        ``status`` of conflict, invalid or skipped. With ``"partial": true``
+        the bookable items are created anyway and a mixed outcome is a 207.
+        """
+        partial = False
+        items = request.data
+        if isinstance(request.data, dict):
+            items = request.data.get("bookings")
+            partial = request.data.get("partial") is True
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Expected a non-empty list of bookings."}, status=400)
+        if len(items) > settings.BOOKING_BATCH_MAX:
+            return Response({"error": f"At most {settings.BOOKING_BATCH_MAX} bookings per batch."}, status=400)
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            item_serializer = BookingBatchItemSerializer(data=item)
+            if item_serializer.is_valid():
+                valid.append((index, item_serializer.validated_data))
+            else:
+                results[index] = {"index": index, "status": BATCH_INVALID, "errors": item_serializer.errors}
+
+        nights = sum((data["end_date"] - data["start_date"]).days for _, data in valid)
+        if nights > settings.BOOKING_BATCH_MAX_NIGHTS:
+            return Response(
+                {"error": f"At most {settings.BOOKING_BATCH_MAX_NIGHTS} nights per batch, across all bookings."},
+                status=400,
+            )
+
+        if not partial and len(valid) < len(items):
+            # Don't lock anything for a batch that can't go through whole
+            for index, _ in valid:
+                results[index] = {"index": index, "status": BATCH_SKIPPED}
+            valid = []
+
+        user = request.user if request.user.is_authenticated else get_guest_user()
+        if valid:
+            batch_results, _ = create_bookings_batch(user, [data for _, data in valid], partial=partial)
+            for (index, _), result in zip(valid, batch_results):
+                result["index"] = index
+                if "booking" in result:
+                    result["booking"] = BookingSerializer(result["booking"]).data
+                results[index] = result
+
+        statuses = {result["status"] for result in results}
+        if statuses == {BATCH_CREATED}:
+            response_status = status.HTTP_201_CREATED
+        elif BATCH_CREATED in statuses:
+            response_status = status.HTTP_207_MULTI_STATUS
+        elif BATCH_CONFLICT in statuses:
+            response_status = status.HTTP_409_CONFLICT
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({"results": results}, status=response_status)
 
     # def get_queryset(self):
     #     # Only show bookings owned by the authenticated user
@@ -120,141 +282,191 @@ class BookingViewSet(viewsets.ModelViewSet):
         #     total_price=str(booking.total_price)
         # )
 
+def chapa_payment_request(booking):
+    """tx_ref, amount and the Chapa initialize payload for ``booking`` (with its user loaded)."""
+    amount = str(booking.total_price)
+    tx_ref = f"chapa-{booking.booking_id}"
+
+    # Use localhost test URLs or settings with fallback
+    base_callback_url = getattr(settings, "CHAPA_CALLBACK_URL", "http://127.0.0.1:8000/api/payment/verify/")
+    base_return_url = getattr(settings, "CHAPA_RETURN_URL", "http://127.0.0.1:8000/api/payment/success/")
+    return_url = f"{base_return_url}?tx_ref={tx_ref}" 
+    callback_url = f"{base_callback_url}?tx_ref={tx_ref}"
+
+    chapa_data = {
+        "amount": amount,
+        "currency": settings.DEFAULT_CURRENCY,
+        "email": booking.user.email,
+        "first_name": booking.user.first_name,
+        "last_name": booking.user.last_name,
+        "tx_ref": tx_ref,
+        "callback_url": callback_url,
+        "return_url": return_url,
+        "customization[title]": "Property Booking",
+    }
+    return tx_ref, amount, chapa_data
+
+
+def chapa_error_response(error, tx_ref):
+    if isinstance(error, ChapaUnavailable):
+        logger.warning("Chapa unavailable: %s", error, extra={"tx_ref": tx_ref})
+        return Response({"error": "Payment provider is unavailable. Please try again shortly."},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    logger.error("Chapa error: %s", error, extra={"tx_ref": tx_ref})
+    return Response({"error": "Payment initiation failed"}, status=status.HTTP_502_BAD_GATEWAY)
+
+
+def chapa_declined_response(chapa_response, tx_ref):
+    logger.warning("Chapa declined payment initiation", extra={"tx_ref": tx_ref, "response": chapa_response})
+    return Response({
+        "error": "Payment initiation failed",
+        "details": chapa_response
+    }, status=400)
+
+
+def checkout_response(chapa_response, tx_ref):
+    logger.info("Payment record created", extra={"tx_ref": tx_ref})
+    return Response({
+        "checkout_url": chapa_response["data"]["checkout_url"],
+        "transaction_id": tx_ref
+    }, status=200)
+
+
 class InitiatePaymentView(APIView):
     def post(self, request):
         serializer = InitiatePaymentSerializer(data=request.data)
         if not serializer.is_valid():
-            print("❌ Invalid data:", serializer.errors)
+            logger.info("Invalid payment initiation request", extra={"errors": serializer.errors})
             return Response(serializer.errors, status=400)
 
         booking_id = serializer.validated_data["booking_id"]
-        print(f"🔰 Initiating payment for booking_id: {booking_id}")
+        logger.info("Initiating payment", extra={"booking_id": str(booking_id)})
 
         try:
-            booking = Booking.objects.get(booking_id=booking_id)
+            booking = Booking.objects.select_related("user").get(booking_id=booking_id)
         except Booking.DoesNotExist:
-            print("❌ Booking not found")
+            logger.info("Payment initiation for unknown booking", extra={"booking_id": str(booking_id)})
             return Response({"error": "Booking not found"}, status=404)
 
-        amount = str(booking.total_price)
-        tx_ref = f"chapa-{booking.booking_id}"
-        email = booking.user.email
-        first_name = booking.user.first_name
-        last_name = booking.user.last_name
-
-        # Use localhost test URLs or settings with fallback
-        base_callback_url = getattr(settings, "CHAPA_CALLBACK_URL", "http://127.0.0.1:8000/api/payment/verify/")
-        base_return_url = getattr(settings, "CHAPA_RETURN_URL", "http://127.0.0.1:8000/api/payment/success/")
-        return_url = f"{base_return_url}?tx_ref={tx_ref}" 
-        callback_url = f"{base_callback_url}?tx_ref={tx_ref}"
-
-        chapa_data = {
-            "amount": amount,
-            "currency": settings.DEFAULT_CURRENCY,
-            "email": email,
-            "first_name": first_name,
-            "last_name": last_name,
-            "tx_ref": tx_ref,
-            "callback_url": callback_url,
-            "return_url": return_url,
-            "customization[title]": "Property Booking",
-        }
+        tx_ref, amount, chapa_data = chapa_payment_request(booking)
 
-        print(f"📤 Sending payment data to Chapa: {chapa_data}")
-        chapa_response = initiate_payment(chapa_data)
-        print(f"📥 Chapa response: {chapa_response}")
+        # chapa_data carries the guest's name and email; log the reference only
+        logger.info("Sending payment to Chapa", extra={"tx_ref": tx_ref, "amount": amount})
+        try:
+            chapa_response = initiate_payment(chapa_data)
+        except ChapaError as e:
+            return chapa_error_response(e, tx_ref)
+        logger.info("Chapa initialize answered", extra={"tx_ref": tx_ref, "chapa_status": chapa_response.get("status")})
 
-        if chapa_response.get("status") == "success":
-            Payment.objects.create(
-                booking=booking,
-                amount=amount,
-                transaction_id=tx_ref,
-                status="Pending",
-            )
-            print("✅ Payment record created, redirecting user")
-            return Response({
-                "checkout_url": chapa_response["data"]["checkout_url"],
-                "transaction_id": tx_ref
-            }, status=200)
-        else:
-            print("❌ Chapa failed to initiate payment")
-            return Response({
-                "error": "Payment initiation failed",
-                "details": chapa_response
-            }, status=400)
+        if chapa_response.get("status") != "success":
+            return chapa_declined_response(chapa_response, tx_ref)
+        Payment.objects.create(
+            booking=booking,
+            amount=amount,
+            transaction_id=tx_ref,
+            status=PAYMENT_PENDING,
+        )
+        return checkout_response(chapa_response, tx_ref)
+
+
+def verification_queued_response(request, tx_ref, payment):
+    return Response({
+        "message": "Payment verification in progress.",
+        "transaction_id": tx_ref,
+        "status": payment.status,
+        "status_url": payment_status_url(request, tx_ref),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def verification_unavailable_response(request, tx_ref):
+    logger.exception("Failed to queue payment verification", extra={"tx_ref": tx_ref})
+    return Response({
+        "error": "Payment verification is temporarily unavailable. Please retry.",
+        "status_url": payment_status_url(request, tx_ref),
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def payment_status_url(request, tx_ref):
+    return request.build_absolute_uri(f"{reverse('success-payment')}?tx_ref={tx_ref}")
+
+
+def callback_tx_ref(request):
+    query = request.query_params
+    logger.info("Chapa callback", extra={"params": dict(query.items())})
+    return query.get("tx_ref") or query.get("trx_ref") or query.get("transaction_id")
+
+
+def queue_verification(tx_ref):
+    # Give Chapa a moment to finalize the transaction before the first check
+    verify_payment_task.apply_async(args=[tx_ref], countdown=settings.CHAPA_VERIFY_INITIAL_DELAY)
+    logger.info("Payment verification queued", extra={"tx_ref": tx_ref})
 
 
 class VerifyPaymentView(APIView):
-    def get(self, request):
-        query = request.query_params
-        print("🔁 Chapa returned with query params:", dict(query))
+    """
+    Chapa callback. Verification runs in ``verify_payment_task`` so this
+    returns 202 right away with a URL the client can poll for the outcome.
+    """
 
-        tx_ref = query.get("tx_ref") or query.get("trx_ref") or query.get("transaction_id")
+    def get(self, request):
+        tx_ref = callback_tx_ref(request)
         if not tx_ref:
-            print("❌ Missing tx_ref")
+            logger.info("Chapa callback without tx_ref")
             return Response({"error": "Missing transaction_id or tx_ref"}, status=400)
 
-        time.sleep(2)  # Give Chapa time to finalize the transaction
+        payment = get_or_create_payment(tx_ref)
+        if payment is None:
+            logger.info("Chapa callback for unknown booking", extra={"tx_ref": tx_ref})
+            return Response({"error": f"No booking found for tx_ref {tx_ref}"}, status=404)
 
-        try:
-            payment = Payment.objects.get(transaction_id=tx_ref)
-            print(f"✅ Found payment: {payment}")
-        except Payment.DoesNotExist:
-            print(f"⚠️ Payment not found for {tx_ref}, trying to create...")
-            booking_id = tx_ref.replace("chapa-", "")
+        if payment.status == PAYMENT_PENDING:
             try:
-                booking = Booking.objects.get(booking_id=booking_id)
-                payment = Payment.objects.create(
-                    booking=booking,
-                    amount=booking.total_price,
-                    transaction_id=tx_ref,
-                    status="Pending"
-                )
-                print("✅ Fallback payment record created")
-            except Booking.DoesNotExist:
-                print("❌ Booking not found for tx_ref")
-                return Response({"error": f"No booking found for tx_ref {tx_ref}"}, status=404)
-
-        chapa_response = verify_payment(tx_ref)
-        print(f"🧾 Chapa verify response: {chapa_response}")
-
-        status_chapa = chapa_response.get("data", {}).get("status")
-
-        if status_chapa == "success":
-            payment.status = "Completed"
-            payment.save()
-            print("✅ Payment marked as Completed")
+                queue_verification(tx_ref)
+            except Exception:
+                return verification_unavailable_response(request, tx_ref)
+        return verification_queued_response(request, tx_ref, payment)
+
+
+def payment_status_response(payment, tx_ref):
+    if payment.status == PAYMENT_FAILED:
+        return Response({
+            "message": "Payment failed",
+            "status": payment.status
+        }, status=400)
+
+    if payment.status != PAYMENT_COMPLETED:
+        return Response({
+            "message": "Payment received but not yet verified. Please check again shortly.",
+            "status": payment.status
+        }, status=202)
+
+    booking = payment.booking
+    return Response({
+        "message": "🎉 Payment Successful and Booking Confirmed!",
+        "payment": {
+            "transaction_id": tx_ref,
+            "amount": str(payment.amount),
+            "status": payment.status
+        },
+        "booking": {
+            "property": booking.property.name,
+            "start_date": str(booking.start_date),
+            "end_date": str(booking.end_date),
+            "user": booking.user.email
+        }
+    }, status=status.HTTP_200_OK)
+
+
+def payment_not_found_response(tx_ref):
+    return Response({"error": f"No payment found with transaction ID: {tx_ref}"}, status=404)
 
-            try:
-                send_payment_confirmation_email.delay(
-                    to_email=payment.booking.user.email,
-                    property_name=payment.booking.property.name,
-                    start_date=str(payment.booking.start_date),
-                    end_date=str(payment.booking.end_date),
-                    amount=payment.amount
-                )
-                print("📧 Email task dispatched")
-            except Exception as e:
-                print(f"⚠️ Failed to send email: {e}")
-
-            return Response({
-                "message": "✅ Payment verified and booking confirmed.",
-                "booking": {
-                    "property": payment.booking.property.name,
-                    "start_date": str(payment.booking.start_date),
-                    "end_date": str(payment.booking.end_date),
-                    "amount": str(payment.amount)
-                },
-                "email_sent": True
-            }, status=200)
-        else:
-            payment.status = "Failed"
-            payment.save()
-            print("❌ Payment verification failed")
-            return Response({"message": "Payment failed"}, status=400)
-            
 
 class SuccessPaymentView(APIView):
+    """
+    Return URL and status endpoint. Reports the stored payment state only;
+    verification itself happens in the background task.
+    """
+
     def get(self, request):
         tx_ref = request.query_params.get("tx_ref")
 
@@ -264,57 +476,126 @@ class SuccessPaymentView(APIView):
         try:
             payment = Payment.objects.select_related("booking__property", "booking__user").get(transaction_id=tx_ref)
         except Payment.DoesNotExist:
-            return Response({"error": f"No payment found with transaction ID: {tx_ref}"}, status=404)
-
-        # 🔁 Try verify again if still pending
-        if payment.status == "Pending":
-            print(f"🔁 Re-verifying payment {tx_ref} as it's still pending.")
-            chapa_response = verify_payment(tx_ref)
-            status_chapa = chapa_response.get("data", {}).get("status")
-            if status_chapa == "success":
-                payment.status = "Completed"
-                payment.save()
-                try:
-                    send_payment_confirmation_email.delay(
-                        to_email=payment.booking.user.email,
-                        property_name=payment.booking.property.name,
-                        start_date=str(payment.booking.start_date),
-                        end_date=str(payment.booking.end_date),
-                        amount=payment.amount
-                    )
-                except Exception as e:
-                    print(f"⚠️ Failed to send email from return_url: {e}")
-
-        if payment.status != "Completed":
-            return Response({
-                "message": "Payment received but not yet verified. Please check again shortly.",
-                "status": payment.status
-            }, status=202)
-
-        booking = payment.booking
-        return Response({
-            "message": "🎉 Payment Successful and Booking Confirmed!",
-            "payment": {
-                "transaction_id": tx_ref,
-                "amount": str(payment.amount),
-                "status": payment.status
-            },
-            "booking": {
-                "property": booking.property.name,
-                "start_date": str(booking.start_date),
-                "end_date": str(booking.end_date),
-                "user": booking.user.email
-            }
-        }, status=status.HTTP_200_OK)
+            return payment_not_found_response(tx_ref)
+        return payment_status_response(payment, tx_ref)
+
+
+# Async versions of the payment views, served at /api/payment/ when
+# PAYMENT_VIEWS_ASYNC is on (the default under asgi.py). Chapa calls go
+# through the httpx client and the ORM through its async API, so a request
+# waiting on Chapa doesn't hold a thread. Authentication and permission
+# checks still run in a worker thread (adrf).
+
+class AsyncInitiatePaymentView(AsyncAPIView):
+    async def post(self, request):
+        serializer = InitiatePaymentSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.info("Invalid payment initiation request", extra={"errors": serializer.errors})
+            return Response(serializer.errors, status=400)
+
+        booking_id = serializer.validated_data["booking_id"]
+        logger.info("Initiating payment", extra={"booking_id": str(booking_id)})
+
+        try:
+            booking = await Booking.objects.select_related("user").aget(booking_id=booking_id)
+        except Booking.DoesNotExist:
+            logger.info("Payment initiation for unknown booking", extra={"booking_id": str(booking_id)})
+            return Response({"error": "Booking not found"}, status=404)
+
+        tx_ref, amount, chapa_data = chapa_payment_request(booking)
+
+        logger.info("Sending payment to Chapa", extra={"tx_ref": tx_ref, "amount": amount})
+        try:
+            chapa_response = await ainitiate_payment(chapa_data)
+        except ChapaError as e:
+            return chapa_error_response(e, tx_ref)
+        logger.info("Chapa initialize answered", extra={"tx_ref": tx_ref, "chapa_status": chapa_response.get("status")})
+
+        if chapa_response.get("status") != "success":
+            return chapa_declined_response(chapa_response, tx_ref)
+        await Payment.objects.acreate(
+            booking=booking,
+            amount=amount,
+            transaction_id=tx_ref,
+            status=PAYMENT_PENDING,
+        )
+        return checkout_response(chapa_response, tx_ref)
+
+
+class AsyncVerifyPaymentView(AsyncAPIView):
+    async def get(self, request):
+        tx_ref = callback_tx_ref(request)
+        if not tx_ref:
+            logger.info("Chapa callback without tx_ref")
+            return Response({"error": "Missing transaction_id or tx_ref"}, status=400)
+
+        payment = await aget_or_create_payment(tx_ref)
+        if payment is None:
+            logger.info("Chapa callback for unknown booking", extra={"tx_ref": tx_ref})
+            return Response({"error": f"No booking found for tx_ref {tx_ref}"}, status=404)
+
+        if payment.status == PAYMENT_PENDING:
+            try:
+                # Publishing to the broker is blocking I/O
+                await sync_to_async(queue_verification)(tx_ref)
+            except Exception:
+                return verification_unavailable_response(request, tx_ref)
+        return verification_queued_response(request, tx_ref, payment)
+
+
+class AsyncSuccessPaymentView(AsyncAPIView):
+    async def get(self, request):
+        tx_ref = request.query_params.get("tx_ref")
+
+        if not tx_ref:
+            return Response({"error": "Missing transaction reference (tx_ref)."}, status=400)
+
+        try:
+            payment = await Payment.objects.select_related("booking__property", "booking__user").aget(
+                transaction_id=tx_ref
+            )
+        except Payment.DoesNotExist:
+            return payment_not_found_response(tx_ref)
+        return payment_status_response(payment, tx_ref)
+
+
+class ChapaWebhookView(APIView):
+    """
+    Receives Chapa webhooks. The HMAC-SHA256 signature of the raw body is
+    checked against CHAPA_WEBHOOK_SECRET, then the event is recorded once
+    and applied to the payment and booking without calling Chapa back.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        body = request.body
+        signature = request.headers.get("X-Chapa-Signature") or request.headers.get("Chapa-Signature")
+        if not is_valid_webhook_signature(body, signature, settings.CHAPA_WEBHOOK_SECRET):
+            logger.warning("Rejected Chapa webhook with an invalid signature")
+            return Response({"error": "Invalid signature"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        payload = request.data
+        if not isinstance(payload, dict):
+            return Response({"error": "Expected a JSON object"}, status=400)
+
+        result = process_webhook_event(payload)
+        if result == "invalid":
+            return Response({"error": "reference or tx_ref is required"}, status=400)
+        return Response({"status": result}, status=status.HTTP_200_OK)
 
 
 class PropertyReviewListView(generics.ListAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [AllowAny]
+    pagination_class = ReviewPagination
 
     def get_queryset(self):
         property_id = self.kwargs["property_id"]
-        return Review.objects.filter(property_id=property_id).order_by("-created_at")
+        # Ordering is applied by ReviewPagination ("-created_at", "-pk");
+        # ReviewSerializer reads user.first_name/avatar on every row
+        return Review.objects.filter(property_id=property_id).select_related("user")
 
 
 class ReviewCreateView(generics.CreateAPIView):